@@ -1,13 +1,20 @@
 import logging
 import logging
+import os
+import functools
+import contextvars
 import json
+import time
 import uuid
+import shutil
+import hashlib
+import threading
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple, Callable
 
 from alibabacloud_oos20190601.client import Client as oos20190601Client
 from alibabacloud_ecs20140526.client import Client as ecs20140526Client
-from alibaba_cloud_ops_mcp_server.tools.oss_tools import create_client as create_oss_client
+from alibaba_cloud_ops_mcp_server.tools.oss_tools import create_client as create_oss_client, compute_file_crc64
 import alibabacloud_oss_v2 as oss
 
 logger = logging.getLogger(__name__)
@@ -22,6 +29,21 @@ from alibaba_cloud_ops_mcp_server.settings import settings
 logger = logging.getLogger(__name__)
 
 
+def run_in_current_context(func: Callable) -> Callable:
+    """
+    Wrap func so that it runs in a copy of the caller's context when called from a worker thread.
+    ThreadPoolExecutor threads do not inherit context variables, including fastmcp's current HTTP request,
+    so without this get_credentials_from_header() returns None inside the pool.
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # A context can only be entered by one thread at a time, give every call its own copy
+        return context.copy().run(func, *args, **kwargs)
+    return wrapper
+
+
 def get_credentials_from_header():
     credentials = None
     try:
@@ -114,6 +136,9 @@ def ensure_code_deploy_dirs():
     return code_deploy_dir, code_deploy_dir, release_dir
 
 
+_application_info_lock = threading.Lock()
+
+
 def load_application_info() -> Dict[str, Any]:
     """
     Load deployment information from the .application.json file
@@ -141,11 +166,13 @@ def save_application_info(info: Dict[str, Any]):
     try:
         json_file.parent.mkdir(parents=True, exist_ok=True)
 
-        existing_info = load_application_info()
-        existing_info.update(info)
+        # Deploy phases may save concurrently, serialize the read-modify-write
+        with _application_info_lock:
+            existing_info = load_application_info()
+            existing_info.update(info)
 
-        with open(json_file, 'w', encoding='utf-8') as f:
-            json.dump(existing_info, f, ensure_ascii=False, indent=2)
+            with open(json_file, 'w', encoding='utf-8') as f:
+                json.dump(existing_info, f, ensure_ascii=False, indent=2)
         logger.info(f"[_save_application_info] Saved application info to {json_file}")
     except Exception as e:
         logger.error(f"[_save_application_info] Failed to save application info: {e}")
@@ -161,6 +188,153 @@ def get_release_path(filename: str) -> Path:
     return release_dir / filename
 
 
+def get_manifest_path(artifact_hash: str) -> Path:
+    """
+    Get the per-file manifest path of a release artifact
+    (the .code_deploy/manifests directory under the project root directory)
+    """
+    manifest_dir = _get_code_deploy_base_dir() / 'manifests'
+    manifest_dir.mkdir(parents=True, exist_ok=True)
+    return manifest_dir / f'{artifact_hash}.json'
+
+
+def get_delta_path(filename: str) -> Path:
+    """
+    Get the file path in the delta directory, which holds patch archives for delta deployments
+    (the .code_deploy/delta directory under the project root directory)
+    """
+    delta_dir = _get_code_deploy_base_dir() / 'delta'
+    delta_dir.mkdir(parents=True, exist_ok=True)
+    return delta_dir / filename
+
+
+def get_build_cache_path() -> Path:
+    """
+    Get the build cache file, which maps source tree fingerprints to packaged artifacts
+    (the .code_deploy/build_cache.json file under the project root directory)
+    """
+    code_deploy_dir = _get_code_deploy_base_dir()
+    code_deploy_dir.mkdir(parents=True, exist_ok=True)
+    return code_deploy_dir / 'build_cache.json'
+
+
+# Linux ioctl request number for FICLONE (copy-on-write clone, supported by btrfs/xfs)
+FICLONE = 0x40049409
+
+
+def _is_same_content(src: Path, dst: Path) -> bool:
+    """
+    Check whether dst is a separate file that already holds the same content as src, by size and hash
+    """
+    if not dst.exists() or os.path.samefile(src, dst):
+        return False
+    if src.stat().st_size != dst.stat().st_size:
+        return False
+    return compute_file_crc64(str(src)) == compute_file_crc64(str(dst))
+
+
+def _reflink_file(src: Path, dst: Path) -> bool:
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        with open(src, 'rb') as src_f, open(dst, 'wb') as dst_f:
+            fcntl.ioctl(dst_f.fileno(), FICLONE, src_f.fileno())
+        shutil.copystat(src, dst)
+        return True
+    except OSError:
+        dst.unlink(missing_ok=True)
+        return False
+
+
+def _hardlink_file(src: Path, dst: Path) -> bool:
+    try:
+        os.link(src, dst)
+        return True
+    except OSError:
+        return False
+
+
+def stage_release_file(file_path: Path) -> Tuple[Path, str]:
+    """
+    Stage a deployment artifact into the release directory without copying data where possible.
+
+    Tries, in order: reuse an identical file already in place, reflink, and finally a full copy. A hardlink is
+    only used when the source already lives in the release directory, a build output outside of it may be
+    rewritten in place later and must not alias the staged release.
+    The file is staged under a temporary name and renamed so a half-written artifact is never visible.
+    A staged copy gets the staging time as its mtime, which is what prune_release_dir orders retention by.
+    Files already in the release directory keep theirs, it is the time they were packaged there.
+
+    Returns:
+        (release_path, method): method is one of 'existing', 'reflink', 'hardlink', 'copy'
+    """
+    src = Path(file_path).resolve()
+    release_path = get_release_path(src.name).resolve()
+
+    if src == release_path:
+        return release_path, 'existing'
+
+    if _is_same_content(src, release_path):
+        os.utime(release_path)
+        return release_path, 'existing'
+
+    tmp_path = release_path.with_name(f'.{release_path.name}.staging')
+    tmp_path.unlink(missing_ok=True)
+
+    if _reflink_file(src, tmp_path):
+        method = 'reflink'
+    elif release_path.parent in src.parents and _hardlink_file(src, tmp_path):
+        method = 'hardlink'
+    else:
+        shutil.copy2(src, tmp_path)
+        method = 'copy'
+
+    if method != 'hardlink':
+        os.utime(tmp_path)
+    os.replace(tmp_path, release_path)
+    logger.info(f"[stage_release_file] Staged {src} to {release_path} via {method}")
+    return release_path, method
+
+
+def prune_release_dir(keep: int, exclude: Optional[Path] = None) -> list:
+    """
+    Remove old artifacts from the release directory, keeping the `keep` most recently staged files
+    (by mtime, which stage_release_file and packaging set to the staging time).
+    A keep value <= 0 disables pruning. The excluded file (the current artifact) is never removed.
+    """
+    if keep <= 0:
+        return []
+    release_dir = _get_code_deploy_base_dir() / 'release'
+    if not release_dir.is_dir():
+        return []
+
+    exclude_resolved = Path(exclude).resolve() if exclude else None
+    releases = []
+    with os.scandir(release_dir) as it:
+        for entry in it:
+            if entry.name.startswith('.') or not entry.is_file(follow_symlinks=False):
+                continue
+            if exclude_resolved and Path(entry.path).resolve() == exclude_resolved:
+                continue
+            releases.append((entry.stat(follow_symlinks=False).st_mtime, entry.path))
+
+    releases.sort(reverse=True)
+    # The excluded file counts towards the retention budget
+    keep_others = keep - 1 if exclude_resolved else keep
+    removed = []
+    for _, path in releases[max(keep_others, 0):]:
+        try:
+            os.remove(path)
+            removed.append(path)
+        except OSError as e:
+            logger.warning(f"[prune_release_dir] Failed to remove {path}: {e}")
+    if removed:
+        logger.info(f"[prune_release_dir] Removed old releases: {removed}")
+    return removed
+
+
 def create_client(region_id: str) -> oos20190601Client:
     config = create_config()
     config.endpoint = f'oos.{region_id}.aliyuncs.com'
@@ -197,25 +371,84 @@ def find_bucket_by_tag(client: oss.Client, tag_key: str, tag_value: str) -> Opti
     return buckets[0] if buckets else None
 
 
-def get_or_create_bucket_for_code_deploy(application_name: str) -> str:
+# Region of the default code deploy bucket
+CODE_DEPLOY_BUCKET_REGION = 'cn-hangzhou'
+# Seconds a validated code deploy bucket is trusted in-process before it is validated again
+CODE_DEPLOY_BUCKET_CACHE_TTL = 300
+# In-process cache of code deploy buckets: account key (suffixed with the region outside the default
+# region) -> (bucket_name, validated_at)
+_code_deploy_bucket_cache: Dict[str, Tuple[str, float]] = {}
+
+
+def _code_deploy_account_key() -> str:
+    """
+    Identify the account the code deploy bucket belongs to, without storing the AccessKeyId itself
+    """
+    credentials = get_credentials_from_header()
+    if credentials and credentials.get('AccessKeyId'):
+        return hashlib.sha256(credentials['AccessKeyId'].encode('utf-8')).hexdigest()[:16]
+    return 'default'
+
+
+def _is_code_deploy_bucket_valid(client: oss.Client, bucket_name: str) -> bool:
+    try:
+        client.get_bucket_info(oss.GetBucketInfoRequest(bucket=bucket_name))
+        return True
+    except Exception as e:
+        logger.info(f"[code_deploy] Cached bucket {bucket_name} is no longer usable: {e}")
+        return False
+
+
+def _remember_code_deploy_bucket(account_key: str, bucket_name: str):
+    _code_deploy_bucket_cache[account_key] = (bucket_name, time.time())
+    buckets = load_application_info().get('code_deploy_buckets', {})
+    if buckets.get(account_key) != bucket_name:
+        buckets[account_key] = bucket_name
+        save_application_info({'code_deploy_buckets': buckets})
+
+
+def get_or_create_bucket_for_code_deploy(application_name: str, region_id: str = CODE_DEPLOY_BUCKET_REGION) -> str:
     """
-    Obtain or create an OSS bucket for code deployment
+    Obtain or create an OSS bucket for code deployment in the given region
 
-    1. If a bucket_name is provided, check if it exists. If not, create it and tag it.
+    1. Reuse the bucket cached in-process or persisted in .code_deploy/application.json for the
+       current account and region, after validating it with GetBucketInfo.
 
-    2. If not provided, search for an existing bucket using the tag (key: app_management, value: code_deploy).
+    2. Otherwise, search for an existing bucket using the tag (key: app_management, value: code_deploy,
+       or code_deploy-{region_id} outside the default region).
 
     3. If found, use it. If not found, create a new bucket and tag it.
 
-    4. New bucket naming convention: app-{application_name}-code-deploy-{uuid}
+    4. New bucket naming convention: code-deploy-{uuid}
     """
     tag_key = 'app_management'
     tag_value = 'code_deploy'
-    client = create_oss_client(region_id='cn-hangzhou')
+    account_key = _code_deploy_account_key()
+    if region_id != CODE_DEPLOY_BUCKET_REGION:
+        tag_value = f'code_deploy-{region_id}'
+        account_key = f'{account_key}:{region_id}'
+    client = create_oss_client(region_id=region_id)
+
+    cached = _code_deploy_bucket_cache.get(account_key)
+    if cached and time.time() - cached[1] < CODE_DEPLOY_BUCKET_CACHE_TTL:
+        logger.info(f"[code_deploy] Using cached bucket: {cached[0]}")
+        return cached[0]
+
+    candidates = [cached[0]] if cached else []
+    persisted = load_application_info().get('code_deploy_buckets', {}).get(account_key)
+    if persisted and persisted not in candidates:
+        candidates.append(persisted)
+    for candidate in candidates:
+        if _is_code_deploy_bucket_valid(client, candidate):
+            logger.info(f"[code_deploy] Reusing validated bucket: {candidate}")
+            _remember_code_deploy_bucket(account_key, candidate)
+            return candidate
+    _code_deploy_bucket_cache.pop(account_key, None)
 
     found_bucket = find_bucket_by_tag(client, tag_key, tag_value)
     if found_bucket:
         logger.info(f"[code_deploy] Found existing bucket by tag: {found_bucket}")
+        _remember_code_deploy_bucket(account_key, found_bucket)
         return found_bucket
 
     bucket_name = f'code-deploy-{str(uuid.uuid4())[:8]}'
@@ -230,6 +463,7 @@ def get_or_create_bucket_for_code_deploy(application_name: str) -> str:
         ))
         put_bucket_tagging(client, bucket_name, {tag_key: tag_value})
         logger.info(f"[code_deploy] Created new bucket: {bucket_name}")
+        _remember_code_deploy_bucket(account_key, bucket_name)
         return bucket_name
     except oss.exceptions.OperationError as e:
         logger.info(f"[code_deploy] OperationError Failed to create bucket: {e}")
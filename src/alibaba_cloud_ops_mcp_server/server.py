@@ -178,7 +178,7 @@ def _register_tools_with_filter(mcp: FastMCP, visible_tools_set: set, visible_to
     "--code-deploy",
     is_flag=True,
     default=False,
-    help="Enable code deploy mode, only load 6 specific tools: OOS_CodeDeploy, OOS_GetDeployStatus, OOS_GetLastDeploymentInfo, LOCAL_ListDirectory, LOCAL_RunShellScript, LOCAL_AnalyzeDeployStack",
+    help="Enable code deploy mode, only load the code deploy tools: OOS_CodeDeploy, OOS_CodeDeployMultiTarget, OOS_GetDeployStatus, OOS_WaitForDeployment, OOS_GetLastDeploymentInfo, LOCAL_ListDirectory, LOCAL_RunShellScript, LOCAL_AnalyzeDeployStack, LOCAL_StartJob, LOCAL_GetJobStatus, LOCAL_TailJobOutput, LOCAL_WaitForJob, LOCAL_CancelJob, LOCAL_PackageArtifact",
 )
 @click.option(
     "--extra-config",
@@ -205,7 +205,7 @@ def main(transport: str, port: int, host: str, services: str, headers_credential
             应用部署场景：
             你可以使用该MCP帮助用户完成项目的分析和部署
             当进入该场景时，请只使用以下列表中的Tool
-            【 OOS_CodeDeploy OOS_GetLastDeploymentInfo OOS_GetDeployStatus LOCAL_ListDirectory LOCAL_RunShellScript LOCAL_AnalyzeDeployStack】
+            【 OOS_CodeDeploy OOS_CodeDeployMultiTarget OOS_GetLastDeploymentInfo OOS_GetDeployStatus OOS_WaitForDeployment LOCAL_ListDirectory LOCAL_RunShellScript LOCAL_AnalyzeDeployStack LOCAL_StartJob LOCAL_GetJobStatus LOCAL_TailJobOutput LOCAL_WaitForJob LOCAL_CancelJob LOCAL_PackageArtifact】
             注意：不要擅自决定部署的目标ecs，需要用户提供，若未提供务必询问用户，不允许直接调用DescribeInstances查找ECS实例，必须使用由用户提供的ECS实例
 
             不要创建部署脚本文件，直接使用 mcp tool: Code Deploy 进行构建
@@ -220,6 +220,9 @@ def main(transport: str, port: int, host: str, services: str, headers_credential
 
                 步骤 2：构建或压缩文件，并记录文件路径
                 - 在本地执行构建命令，生成部署产物（tar.gz、zip 等压缩包）
+                - 耗时较长的构建（mvn package、npm run build 等）使用 LOCAL_StartJob 在后台执行，通过 LOCAL_WaitForJob 等待结果，可同时构建多个产物
+                - 打包产物优先使用 LOCAL_PackageArtifact（自动忽略 .git、node_modules 等目录，多线程压缩，产物直接写入 .code_deploy/release），不要用 tar 命令手动打包
+                - 重复部署时，构建前先调用 LOCAL_PackageArtifact(check_only=True, fingerprint_directory=项目根目录)，cached 为 true 时源码未变化，跳过构建直接使用返回的 artifact_path
                 - 记录文件路径，留待后续CodeDeploy使用
 
                 步骤 3：调用CodeDeploy进行部署
@@ -255,7 +258,8 @@ def main(transport: str, port: int, host: str, services: str, headers_credential
                    - Python 程序示例：
                      "tar -xzf app.tar.gz && nohup python app.py > /root/app.log 2>&1 &"
                    说明：使用 nohup 命令可以让程序在后台运行，即使终端关闭也不会终止；> 重定向标准输出到日志文件；2>&1 将标准错误也重定向到同一文件；& 符号让命令在后台执行。
-                4. 应用和应用分组会自动检查是否存在，如果存在则跳过创建，避免重复创建错误。''',
+                4. 应用和应用分组会自动检查是否存在，如果存在则跳过创建，避免重复创建错误。
+                5. 部署发起后调用 OOS_WaitForDeployment 等待部署结束，不要反复调用 OOS_GetDeployStatus 轮询。''',
         port=port,
         host=host,
         stateless_http=True
@@ -271,15 +275,23 @@ def main(transport: str, port: int, host: str, services: str, headers_credential
         visible_tools = None
     
     if code_deploy:
-        # Code deploy mode: only load 6 specific tools
+        # Code deploy mode: only load the code deploy tools (OOS deploy and LOCAL build/packaging tools)
         code_deploy_tools = {
             'OOS_CodeDeploy',
+            'OOS_CodeDeployMultiTarget',
             'OOS_GetDeployStatus',
+            'OOS_WaitForDeployment',
             'OOS_GetLastDeploymentInfo',
             'ECS_DescribeInstances',
             'LOCAL_ListDirectory',
             'LOCAL_RunShellScript',
-            'LOCAL_AnalyzeDeployStack'
+            'LOCAL_AnalyzeDeployStack',
+            'LOCAL_StartJob',
+            'LOCAL_GetJobStatus',
+            'LOCAL_TailJobOutput',
+            'LOCAL_WaitForJob',
+            'LOCAL_CancelJob',
+            'LOCAL_PackageArtifact'
         }
         
         # Load from application_management_tools
@@ -1,9 +1,27 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
     headers_credential_only: bool = False
     env: str = "domestic"
+    # OSS upload tuning, files at or above the threshold use parallel multipart upload
+    oss_multipart_threshold: int = 64 * 1024 * 1024
+    oss_part_size: int = 8 * 1024 * 1024
+    oss_parallel_num: int = 4
+    oss_checkpoint_dir: Optional[str] = None
+    oss_client_pool_size: int = 16
+    # Connections in the shared OSS HTTP pool, never fewer than the OSS_SyncDirectory fan-out needs
+    oss_max_connections: int = 0
+    # Number of artifacts kept in .code_deploy/release, <= 0 disables pruning
+    code_deploy_release_retention: int = 5
+    # Maximum archive members recorded when analyzing a deployment artifact
+    code_deploy_archive_max_members: int = 100000
+    # Background local jobs: concurrently running jobs, spill file size before rotation and rotated files kept
+    local_job_max_concurrency: int = 2
+    local_job_spill_bytes: int = 8 * 1024 * 1024
+    local_job_spill_files: int = 3
 
 
 settings = Settings()
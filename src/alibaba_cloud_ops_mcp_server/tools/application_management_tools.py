@@ -1,15 +1,24 @@
 import re
+import io
+import math
+import hashlib
+import asyncio
 import logging
 import tarfile
 import zipfile
 import tempfile
+import shlex
 import shutil
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 
 from alibaba_cloud_ops_mcp_server.tools.api_tools import _tools_api_call
 from pathlib import Path
 import alibabacloud_oss_v2 as oss
-from pydantic import Field
-from typing import Optional, Tuple, List, Dict, Set
+from pydantic import BaseModel, Field
+from fastmcp import Context
+from typing import Optional, Tuple, List, Dict, Set, Callable, Any, Literal, Union
 import json
 import time
 from alibabacloud_oos20190601.client import Client as oos20190601Client
@@ -27,8 +36,15 @@ from alibaba_cloud_ops_mcp_server.alibabacloud.utils import (
     put_bucket_tagging,
     find_bucket_by_tag,
     get_or_create_bucket_for_code_deploy,
+    CODE_DEPLOY_BUCKET_REGION,
     set_project_path,
+    stage_release_file,
+    prune_release_dir,
+    get_manifest_path,
+    get_delta_path,
+    run_in_current_context,
 )
+from alibaba_cloud_ops_mcp_server.settings import settings
 
 logger = logging.getLogger(__name__)
 
@@ -37,28 +53,171 @@ DEPLOYING_STATUSES = ['Deploying', 'Releasing']
 SUCCESS_STATUSES = ['Deployed', 'Released']
 FAILED_STATUSES = ['DeployFailed', 'ReleaseFailed']
 END_STATUSES = SUCCESS_STATUSES + FAILED_STATUSES
+DEFAULT_MULTI_TARGET_PARALLEL = 4
+MAX_MULTI_TARGET_PARALLEL = 16
+CANARY_POLL_INTERVAL = 10
+# Regional artifacts reach the other regions through OSS cross-region replication from the primary bucket;
+# a region whose copy does not arrive within the timeout gets a direct upload instead
+ARTIFACT_REPLICATION_TIMEOUT = 300
+ARTIFACT_REPLICATION_POLL_INTERVAL = 5
+DEFAULT_WORKING_DIR = '/root'
+DEFAULT_BATCH_NUMBER = 2
+MAX_WAIT_FOR_DEPLOYMENT_TIMEOUT = 3600
+MAX_WAIT_REPORTED_INSTANCES = 50
+# Archive members under these directories are never start command candidates, they are counted but not kept
+ARCHIVE_IGNORED_DIRS = {'node_modules', '.git', '__pycache__', '.venv', 'venv', 'site-packages'}
+# Languages whose start command only needs the first matching member; no more members are kept after it and the scan
+# stops as soon as the archive is known to have more than one top-level entry
+ARCHIVE_EARLY_STOP_RULES = {
+    'java': lambda name: name.endswith('.jar'),
+    'docker': lambda name: name == 'dockerfile',
+}
+ARCHIVE_ANALYSIS_CACHE_SIZE = 16
+# Languages whose start command needs native binaries; candidate members have their first bytes sniffed
+ARCHIVE_SNIFF_LANGUAGES = {'golang'}
+ARCHIVE_SNIFF_BYTES = 128
+ARCHIVE_MAX_SNIFFED_MEMBERS = 256
+ELF_MAGIC = b'\x7fELF'
+# Dependency lockfiles per language in priority order; their content hash keys the dependency layer on the instance
+DEPENDENCY_LOCKFILES = {
+    'nodejs': ['package-lock.json', 'yarn.lock', 'pnpm-lock.yaml'],
+    'python': ['poetry.lock', 'requirements.txt'],
+}
+# Layers live under a per-application directory so pruning one application never removes another's layers
+DEPENDENCY_LAYER_DIR = '/root/.code_deploy_deps'
+DEPENDENCY_LAYER_RETENTION = 3
+PYTHON_LAYER_INSTALL_COMMANDS = {
+    'poetry.lock': '"$DEPS/bin/pip" install -q poetry && VIRTUAL_ENV="$DEPS" "$DEPS/bin/poetry" install --no-root',
+    'requirements.txt': '"$DEPS/bin/pip" install -r requirements.txt',
+}
+# Extension-less names that are never Go binaries
+NON_BINARY_NAMES = {
+    'readme', 'license', 'makefile', 'dockerfile', 'changelog',
+    'contributing', 'authors', 'version', 'manifest', 'config',
+    'gitignore', 'dockerignore', 'editorconfig', 'env'
+}
+_JAVA_START = "[ -f {path} ] && nohup java -jar {path} > /root/app.log 2>&1 &"
+_PYTHON_START = "{install_dependencies}[ -f {path} ] && nohup {python} {path} > /root/app.log 2>&1 &"
+_NODE_START = "[ -f {path} ] && nohup node {path} > /root/app.log 2>&1 &"
+_BINARY_START = "[ -f {path} ] && chmod +x {path} && nohup ./{path} > /root/app.log 2>&1 &"
+# Start command rules per language, evaluated in order against the archive index; the first matching rule wins.
+#   names:      basenames in priority order (shallowest member first for each name)
+#   prefixes:   basename prefixes in priority order
+#   extension:  first member with the extension, optionally filtered by name_contains
+#   binary:     restrict names/prefixes/any match to extension-less executable candidates
+#   requires:   basename that must exist in the archive
+#   default:    path used when nothing else matched (may reference {artifact_stem})
+# Commands may reference {install_dependencies} and {python}, see _dependency_layer_context.
+START_COMMAND_RULES: Dict[str, List[Dict[str, Any]]] = {
+    'java': [
+        {'extension': '.jar', 'command': _JAVA_START},
+        {'default': 'app.jar', 'command': _JAVA_START},
+    ],
+    'python': [
+        {'names': ['main.py', 'app.py', 'run.py', 'server.py', 'application.py'], 'command': _PYTHON_START},
+        {'extension': '.py', 'command': _PYTHON_START},
+        {'default': 'app.py', 'command': _PYTHON_START},
+    ],
+    'nodejs': [
+        # 即使有 start 脚本，也先执行 npm install 确保依赖已安装
+        {'requires': 'package.json', 'extension': '.sh', 'name_contains': 'start',
+         'command': "command -v npm >/dev/null 2>&1 && [ -f package.json ] && {install_dependencies} && [ -f {path} ] && "
+                    "chmod +x {path} && nohup ./{path} > /root/app.log 2>&1 &"},
+        {'requires': 'package.json',
+         'command': "command -v npm >/dev/null 2>&1 && [ -f package.json ] && {install_dependencies} && "
+                    "nohup npm start > /root/app.log 2>&1 &"},
+        {'names': ['index.js', 'app.js', 'server.js', 'main.js'], 'command': _NODE_START},
+        {'extension': '.js', 'command': _NODE_START},
+    ],
+    'golang': [
+        {'names': ['app', 'main', 'server', 'application'], 'binary': True, 'command': _BINARY_START},
+        {'prefixes': ['app', 'main', 'server', 'application'], 'binary': True, 'command': _BINARY_START},
+        {'binary': True, 'command': _BINARY_START},
+        {'default': '{artifact_stem}', 'command': _BINARY_START},
+    ],
+    'docker': [
+        {'requires': 'dockerfile',
+         'command': "command -v docker >/dev/null 2>&1 && "
+                    "docker stop {container} 2>/dev/null || true && docker rm {container} 2>/dev/null || true && "
+                    "[ -f Dockerfile ] && docker build -t {image}:latest . && "
+                    "docker run -d --name {container} {port_mapping}{image}:latest"},
+    ],
+}
+ECS_DESCRIBE_INSTANCES_BATCH_SIZE = 100
+ECS_TAG_RESOURCES_BATCH_SIZE = 50
+# Delta deploys fall back to the full artifact when the patch is larger than this share of it
+DELTA_MAX_PATCH_RATIO = 0.5
+DELTA_DELETED_LIST = '.code_deploy_delta_deleted'
+# Cloud Assistant check of the revision markers on the target instances before a patch is shipped
+DELTA_MARKER_CHECK_TIMEOUT = 60
+DELTA_MARKER_CHECK_INTERVAL = 2
+CLOUD_ASSISTANT_BATCH_SIZE = 100
+CLOUD_ASSISTANT_RUNNING_STATUSES = {'Pending', 'Scheduled', 'Running', 'Stopping'}
 
 tools = []
 
+# Archive analysis results keyed by (file crc64, deploy language)
+_archive_analysis_cache: "OrderedDict[Tuple[str, Optional[str]], Dict]" = OrderedDict()
+_archive_analysis_lock = threading.Lock()
+
 
 def _append_tool(func):
     tools.append(func)
     return func
 
 
+class DeploymentStrategy(BaseModel):
+    """部署策略：分批方式、暂停策略、最大不可用实例数以及启动后的健康检查"""
+    batch_number: Optional[int] = Field(default=None, ge=1, description='Number of batches the instances are split into. Takes precedence over batch_percentage.')
+    batch_percentage: Optional[int] = Field(default=None, ge=1, le=100, description='Percentage of instances deployed per batch, e.g. 25 deploys in 4 waves')
+    max_unavailable: Optional[int] = Field(default=None, ge=1, description='Maximum number of instances being deployed (out of service) at the same time. Caps the batch size.')
+    pause_policy: Literal['Automatic', 'FirstBatchPause', 'EveryBatchPause'] = Field(default='Automatic', description='Whether to pause between batches: Automatic (no pause), FirstBatchPause (pause after the first batch), EveryBatchPause (pause after every batch)')
+    failure_policy: Literal['FailurePause', 'Automatic'] = Field(default='FailurePause', description='FailurePause stops the rollout when a batch fails, Automatic continues with the next batch')
+    health_check_path: Optional[str] = Field(default=None, description='HTTP path probed on 127.0.0.1:<port> after the start command, e.g. /health. A failing probe fails the batch, which pauses the rollout under FailurePause.')
+    health_check_timeout: int = Field(default=60, ge=1, description='Seconds to wait for the health check to succeed')
+    working_dir: str = Field(default=DEFAULT_WORKING_DIR, description='Working directory of the deploy hooks on the instances')
+
+    @property
+    def is_batched(self) -> bool:
+        return bool(self.batch_number or self.batch_percentage or self.max_unavailable)
+
+    def resolve_batch_number(self, instance_count: int) -> int:
+        """根据实例数计算批次数，max_unavailable 会增加批次数以限制单批实例数"""
+        if self.batch_number:
+            batch_number = self.batch_number
+        elif self.batch_percentage:
+            batch_size = max(1, math.ceil(instance_count * self.batch_percentage / 100))
+            batch_number = math.ceil(instance_count / batch_size)
+        else:
+            batch_number = DEFAULT_BATCH_NUMBER
+        if self.max_unavailable:
+            batch_number = max(batch_number, math.ceil(instance_count / self.max_unavailable))
+        return max(1, min(batch_number, max(instance_count, 1)))
+
+
+def _resolve_deployment_strategy(deployment_strategy: Union[DeploymentStrategy, Dict, None]) -> DeploymentStrategy:
+    if isinstance(deployment_strategy, DeploymentStrategy):
+        return deployment_strategy
+    if isinstance(deployment_strategy, dict):
+        return DeploymentStrategy.model_validate(deployment_strategy)
+    return DeploymentStrategy()
+
+
 @_append_tool
 def OOS_CodeDeploy(
         name: str = Field(description='name of the application'),
         deploy_region_id: str = Field(description='Region ID for deployment'),
         application_group_name: str = Field(description='name of the application group'),
         object_name: str = Field(description='OSS object name'),
-        file_path: str = Field(description='Local file path to upload. If the file is not in .code_deploy/release directory, it will be copied there.'),
+        file_path: str = Field(description='Local file path to upload. If the file is not in .code_deploy/release directory, it will be staged there (reflinked when possible, otherwise copied).'),
         deploy_language: str = Field(description='Deploy language, like:docker, java, python, nodejs, golang'),
         port: int = Field(description='Application listening port'),
         project_path: Optional[str] = Field(description='Root path of the project. The .code_deploy directory will be created in this path. If not provided, will try to infer from file_path or use current working directory.'),
         application_start: Optional[str] = Field(default=None, description='**OPTIONAL - DO NOT PROVIDE UNLESS USER EXPLICITLY REQUIRES IT** Application start command script. In normal cases, you should NOT provide this parameter. The system will automatically generate the start command using rule engine based on deployment file analysis and deploy_language. Only provide this parameter when: (1) User explicitly specifies a custom start command, or (2) User provides specific instructions about the start command. The auto-generated command includes defensive checks for file/path existence and proper archive extraction. If you must provide a custom command, ensure it includes defensive checks like "[ -f file ] && command" and handles archive extraction properly.'),
         application_stop: Optional[str] = Field( default=None, description='**OPTIONAL - DO NOT PROVIDE UNLESS USER EXPLICITLY REQUIRES IT** Application stop command script. In normal cases, you should NOT provide this parameter. The system will automatically generate the stop command using rule engine based on deploy_language. Only provide this parameter when: (1) User explicitly specifies a custom stop command, or (2) User provides specific instructions about the stop command. The auto-generated command includes defensive checks and proper process termination.'),
-        instance_ids: list = Field(description='AlibabaCloud ECS instance ID List. If empty or not provided, user will be prompted to create ECS instances.', default=None)
+        instance_ids: list = Field(description='AlibabaCloud ECS instance ID List. If empty or not provided, user will be prompted to create ECS instances.', default=None),
+        deployment_strategy: Optional[DeploymentStrategy] = Field(default=None, description='Optional rollout strategy for existing application groups: batch_number or batch_percentage, pause_policy, failure_policy, max_unavailable, health_check_path/health_check_timeout and working_dir. By default all instances are deployed at once with FailurePause.'),
+        delta: bool = Field(default=False, description='Delta deploy: when every instance still runs the last successfully deployed revision of this application group (checked through Cloud Assistant before deploying), only a patch archive with the files changed since then is deployed and applied over the previous extraction. Otherwise the full artifact is deployed. The full artifact is always uploaded next to the patch. Only used with archive artifacts and auto-generated start commands.'),
 ):
     """
     将应用部署到阿里云ECS实例。使用阿里云OOS（运维编排服务）的CodeDeploy功能实现自动化部署。
@@ -77,6 +236,7 @@ def OOS_CodeDeploy(
     - 自动生成的命令包含所有必要的防御性检查（文件存在性、路径存在性等）
     - 自动生成的命令正确处理压缩包解压、目录切换、后台运行、日志重定向等
     - 对于 Node.js 应用，自动生成的命令会先执行 `npm install` 安装依赖
+    - 产物中包含依赖锁文件（package-lock.json、requirements.txt、poetry.lock 等）时，依赖按锁文件哈希缓存在实例上，锁文件未变化的部署直接复用
     
     **只有在以下情况下才需要手动提供这两个参数：**
     1. 用户明确指定了自定义的启动/停止命令
@@ -109,42 +269,12 @@ def OOS_CodeDeploy(
     - 应用和应用分组会自动检查，已存在则跳过创建
     - 未提供ECS实例ID时，工具会返回创建引导链接
     - 部署信息自动保存到 `.code_deploy/.application.json`
+    - delta=True 时先通过云助手确认所有实例仍是上次部署成功的版本，再按文件清单（`.code_deploy/manifests`）只部署变化文件的补丁包，否则部署完整产物；部署成功（OOS_WaitForDeployment 或下次部署时确认）后才作为下次增量的基线
     - project_path未提供时，会从file_path推断或使用当前目录
     - 部署完成后，以markdown格式展示service_link供用户跳转
     """
-    # Set project path if provided
-    if project_path:
-        set_project_path(project_path)
-        logger.info(f"[code_deploy] Project path set to: {project_path}")
-    else:
-        # Try to infer project path from file_path
-        file_path_obj = Path(file_path)
-        if not file_path_obj.is_absolute():
-            file_path_obj = Path.cwd() / file_path_obj
-        file_path_resolved = file_path_obj.resolve()
-        
-        # Try to find project root by looking for common project files
-        current_dir = file_path_resolved.parent
-        project_root = None
-        project_indicators = ['package.json', 'pom.xml', 'requirements.txt', 'go.mod', 'Cargo.toml', '.git']
-        
-        # Search up to 5 levels for project root
-        for _ in range(5):
-            if any((current_dir / indicator).exists() for indicator in project_indicators):
-                project_root = current_dir
-                break
-            parent = current_dir.parent
-            if parent == current_dir:  # Reached filesystem root
-                break
-            current_dir = parent
-        
-        if project_root:
-            set_project_path(str(project_root))
-            logger.info(f"[code_deploy] Inferred project path from file_path: {project_root}")
-        else:
-            # Use the directory containing the file as project root
-            set_project_path(str(file_path_resolved.parent))
-            logger.info(f"[code_deploy] Using file directory as project path: {file_path_resolved.parent}")
+    _resolve_project_path(project_path, file_path)
+    strategy = _resolve_deployment_strategy(deployment_strategy)
     
     # Check ECS instance ID
     if not instance_ids:
@@ -179,9 +309,53 @@ def OOS_CodeDeploy(
             '''
         }
     
-    # 校验 ECS 实例是否存在
+    ensure_code_deploy_dirs()
+
+    file_path = _stage_deploy_artifact(file_path)
+
+    region_id_oss = CODE_DEPLOY_BUCKET_REGION
+    is_internal_oss = True if deploy_region_id.lower() == 'cn-hangzhou' else False
+    client = create_client(region_id=APPLICATION_MANAGEMENT_REGION_ID)
+
+    # 相互独立的前置阶段并发执行：实例校验、启动命令生成、Bucket 选择 -> 产物上传、应用/应用分组检查
     logger.info(f"[code_deploy] Validating ECS instances: {instance_ids}")
-    all_exist, missing_instance_ids = _check_ecs_instances_exist(deploy_region_id, instance_ids)
+    need_generate_commands = not application_start or not application_stop
+    use_delta = delta is True and not application_start
+    if need_generate_commands:
+        logger.info(f"[code_deploy] Attempting to auto-generate commands using rule engine. "
+                   f"Provided: start={application_start is not None}, stop={application_stop is not None}")
+
+    def _validate_instances(results):
+        instances = _describe_instances_by_ids(deploy_region_id, instance_ids)
+        return instances, _check_ecs_instances_exist(deploy_region_id, instance_ids, instances)
+
+    phases = {
+        'validate_instances': (_validate_instances, []),
+        'discover_bucket': (lambda results: get_or_create_bucket_for_code_deploy(name), []),
+        'upload_artifact': (lambda results: _upload_artifact_if_changed(
+            results['discover_bucket'], object_name, file_path, region_id_oss), ['discover_bucket']),
+        'check_application': (lambda results: _check_application_exists(client, name), []),
+        'check_application_group': (lambda results: _check_application_group_exists(
+            client, name, application_group_name), []),
+        'previous_execution': (lambda results: _get_application_group_execution_id(
+            client, name, application_group_name), []),
+    }
+    if need_generate_commands:
+        phases['generate_commands'] = (lambda results: _generate_start_stop_commands_by_rules(
+            file_path, deploy_language, name, port), [])
+    if use_delta:
+        phases['prepare_delta'] = (lambda results: _prepare_delta_deploy(
+            client, name, application_group_name, file_path, object_name, deploy_region_id, instance_ids,
+            strategy.working_dir), [])
+        phases['upload_patch'] = (lambda results: _upload_artifact_if_changed(
+            results['discover_bucket'], results['prepare_delta']['patch_object_name'],
+            results['prepare_delta']['patch_path'], region_id_oss, record=False
+        ) if results['prepare_delta']['enabled'] else None, ['discover_bucket', 'prepare_delta'])
+    results, errors, phase_timings = _run_phase_graph(phases)
+    logger.info(f"[code_deploy] Pre-deploy phase timings: {phase_timings}")
+
+    # 按原有的校验顺序处理各阶段结果
+    instances, (all_exist, missing_instance_ids) = _get_phase_result(results, errors, 'validate_instances')
     if not all_exist:
         return {
             'error': 'ECS_INSTANCE_NOT_FOUND',
@@ -208,40 +382,9 @@ def OOS_CodeDeploy(
             '''
         }
 
-    ensure_code_deploy_dirs()
-
-    # Process file path: if file is not in release directory, copy it to release directory
-    file_path_obj = Path(file_path)
-    if not file_path_obj.is_absolute():
-        file_path_obj = Path.cwd() / file_path_obj
-
-    # Check if file exists
-    if not file_path_obj.exists():
-        raise FileNotFoundError(f"File does not exist: {file_path_obj}")
+    if need_generate_commands:
+        generated_start, generated_stop = _get_phase_result(results, errors, 'generate_commands')
 
-    # Normalize path (resolve Windows path case and separator issues)
-    file_path_resolved = file_path_obj.resolve()
-    release_path = get_release_path(file_path_obj.name)
-    release_path_resolved = release_path.resolve()
-
-    # If file is not in release directory, copy it there (using Path object comparison, cross-platform compatible)
-    if file_path_resolved != release_path_resolved:
-        import shutil
-        shutil.copy2(file_path_resolved, release_path_resolved)
-        logger.info(f"[code_deploy] Copied file from {file_path_resolved} to {release_path_resolved}")
-        file_path = str(release_path_resolved)
-    else:
-        logger.info(f"[code_deploy] File already in release directory: {file_path}")
-    
-    # 如果未提供启动/停止命令，尝试通过规则引擎生成
-    if not application_start or not application_stop:
-        logger.info(f"[code_deploy] Attempting to auto-generate commands using rule engine. "
-                   f"Provided: start={application_start is not None}, stop={application_stop is not None}")
-        
-        generated_start, generated_stop = _generate_start_stop_commands_by_rules(
-            file_path, deploy_language, name, port
-        )
-        
         if not application_start and generated_start:
             application_start = generated_start
             logger.info(f"[code_deploy] Auto-generated start command successfully")
@@ -271,15 +414,15 @@ def OOS_CodeDeploy(
                     - Node.js: `[ -f app.tar.gz ] && tar -xzf app.tar.gz && [ -f app/package.json ] && nohup npm start > /root/app.log 2>&1 &`
                 '''
             }
-        
+
         if not application_stop and generated_stop:
             application_stop = generated_stop
             logger.info(f"[code_deploy] Auto-generated stop command successfully")
-    
+
+    application_start = _append_health_check(application_start, port, strategy)
+    dependency_layer = _get_dependency_layer(file_path, deploy_language) if need_generate_commands else None
     logger.info(f"[code_deploy] Deployment commands ready - start: {bool(application_start)}, stop: {bool(application_stop)}")
-    
-    region_id_oss = 'cn-hangzhou'
-    is_internal_oss = True if deploy_region_id.lower() == 'cn-hangzhou' else False
+
     # Log input parameters
     logger.info(f"[code_deploy] Input parameters: name={name}, deploy_region_id={deploy_region_id}, "
                 f"application_group_name={application_group_name}, instance_ids={instance_ids}, "
@@ -289,7 +432,7 @@ def OOS_CodeDeploy(
 
     # Upload file to OSS
     try:
-        bucket_name = get_or_create_bucket_for_code_deploy(name)
+        bucket_name = _get_phase_result(results, errors, 'discover_bucket')
         logger.info(f"[code_deploy] Auto selected/created bucket: {bucket_name}")
     except oss.exceptions.OperationError as e:
         oss_console_link = 'https://oss.console.aliyun.com/'
@@ -307,19 +450,31 @@ def OOS_CodeDeploy(
             '''
         }
 
-    put_object_resp = oss_tools.OSS_PutObject(
-        BucketName=bucket_name,
-        ObjectKey=object_name,
-        FilePath=file_path,
-        RegionId=region_id_oss,
-        ContentType="application/octet-stream",
-    )
-    version_id = put_object_resp.get('version_id')
-    logger.info(f"[code_deploy] Put Object Response: {put_object_resp}")
-
-    client = create_client(region_id=APPLICATION_MANAGEMENT_REGION_ID)
-
-    if not _check_application_exists(client, name):
+    version_id, artifact_uploaded = _get_phase_result(results, errors, 'upload_artifact')
+
+    revision_object_name, revision_version_id = object_name, version_id
+    delta_summary = None
+    if use_delta:
+        delta_plan = _get_phase_result(results, errors, 'prepare_delta')
+        if delta_plan['enabled']:
+            try:
+                patch_version_id, _ = _get_phase_result(results, errors, 'upload_patch')
+                extract_cmd = _create_delta_extract_command(delta_plan, file_path)
+                delta_start, _ = _generate_start_stop_commands_by_rules(
+                    file_path, deploy_language, name, port, extract_cmd
+                )
+                if not delta_start:
+                    raise ValueError('failed to generate the delta start command')
+                application_start = _append_health_check(delta_start, port, strategy)
+                revision_object_name, revision_version_id = delta_plan['patch_object_name'], patch_version_id
+            except Exception as e:
+                logger.warning(f"[code_deploy] Delta deploy unavailable, deploying the full artifact: {e}")
+                delta_plan = dict(delta_plan, enabled=False, reason=f'patch_failed: {e}')
+        delta_summary = {key: value for key, value in delta_plan.items() if key not in ('patch_path', 'patch_object_name')}
+        logger.info(f"[code_deploy] Delta deploy: {delta_summary}")
+
+    deploy_started = time.monotonic()
+    if not _get_phase_result(results, errors, 'check_application'):
         logger.info(f"[code_deploy] Application '{name}' does not exist, creating it...")
         alarm_config = oos_20190601_models.CreateApplicationRequestAlarmConfig()
         create_application_request = oos_20190601_models.CreateApplicationRequest(
@@ -332,19 +487,23 @@ def OOS_CodeDeploy(
     else:
         logger.info(f"[code_deploy] Application '{name}' already exists, skipping creation")
 
-    if not _check_application_group_exists(client, name, application_group_name):
+    if not _get_phase_result(results, errors, 'check_application_group'):
         deploy_request = _handle_new_application_group(client, name, application_group_name,
                                                        deploy_region_id, region_id_oss, bucket_name,
-                                                       object_name, version_id, is_internal_oss,
+                                                       revision_object_name, revision_version_id, is_internal_oss,
                                                        port, instance_ids, application_start,
-                                                       application_stop, deploy_language)
+                                                       application_stop, deploy_language, instances, strategy)
     else:
         deploy_request = _handle_existing_application_group(name, application_group_name,
                                                             deploy_region_id, region_id_oss, bucket_name,
-                                                            object_name, version_id, application_start,
-                                                            application_stop, instance_ids)
+                                                            revision_object_name, revision_version_id,
+                                                            application_start, application_stop, instance_ids,
+                                                            instances, strategy)
 
     response = client.deploy_application_group(deploy_request)
+    phase_timings['deploy'] = round(time.monotonic() - deploy_started, 3)
+    _record_delta_pending(name, application_group_name, file_path,
+                          _get_phase_result(results, errors, 'previous_execution'))
     logger.info(f"[code_deploy] Response: {json.dumps(str(response), ensure_ascii=False)}")
 
     # Save deployment info to .application.json
@@ -355,6 +514,7 @@ def OOS_CodeDeploy(
             'deploy_region_id': deploy_region_id,
             'port': port,
             'instance_ids': instance_ids,
+            'dependency_layer': dependency_layer,
             'deploy_time': time.strftime('%Y-%m-%d %H:%M:%S')
         }
     }
@@ -373,6 +533,10 @@ def OOS_CodeDeploy(
         'port': port,
         'deploy_region_id': deploy_region_id,
         'bucket_name': bucket_name,
+        'artifact_uploaded': artifact_uploaded,
+        'dependency_layer': dependency_layer,
+        'delta': delta_summary,
+        'phase_timings': phase_timings,
         'oss_bucket_link': f'https://oss.console.aliyun.com/bucket/oss-cn-hangzhou/{bucket_name}/object',
         'security_group_instructions': f'''
             ## Deployment Successful!
@@ -400,6 +564,130 @@ def OOS_CodeDeploy(
     }
 
 
+@_append_tool
+async def OOS_CodeDeployMultiTarget(
+        name: str = Field(description='name of the application'),
+        targets: List[Dict] = Field(description='Deployment targets, each item like {"region_id": "cn-hangzhou", "application_group_name": "group-1", "instance_ids": ["i-xxx"]}. The first target is the canary when canary is enabled.'),
+        object_name: str = Field(description='OSS object name'),
+        file_path: str = Field(description='Local file path to upload. If the file is not in .code_deploy/release directory, it will be staged there.'),
+        deploy_language: str = Field(description='Deploy language, like:docker, java, python, nodejs, golang'),
+        port: int = Field(description='Application listening port'),
+        project_path: Optional[str] = Field(default=None, description='Root path of the project. The .code_deploy directory will be created in this path. If not provided, will try to infer from file_path.'),
+        application_start: Optional[str] = Field(default=None, description='**OPTIONAL - DO NOT PROVIDE UNLESS USER EXPLICITLY REQUIRES IT** Application start command script, auto-generated by the rule engine when omitted (same as OOS_CodeDeploy).'),
+        application_stop: Optional[str] = Field(default=None, description='**OPTIONAL - DO NOT PROVIDE UNLESS USER EXPLICITLY REQUIRES IT** Application stop command script, auto-generated by the rule engine when omitted (same as OOS_CodeDeploy).'),
+        max_parallel: int = Field(default=DEFAULT_MULTI_TARGET_PARALLEL, description=f'Maximum number of targets deployed concurrently (1-{MAX_MULTI_TARGET_PARALLEL})'),
+        canary: bool = Field(default=False, description='Deploy the first target alone and wait until it finishes before rolling out the others. The others are skipped if the canary fails.'),
+        canary_timeout: int = Field(default=1800, description='Seconds to wait for the canary target to finish'),
+        regional_artifacts: bool = Field(default=True, description='Keep a copy of the artifact in a code deploy bucket in each target region so instances download it over the OSS internal endpoint. The artifact is uploaded from this machine once and copied to the other regions by OSS cross-region replication, with a direct upload as fallback. When false, all targets download the single cn-hangzhou copy.'),
+        deployment_strategy: Optional[DeploymentStrategy] = Field(default=None, description='Optional rollout strategy for existing application groups: batch_number or batch_percentage, pause_policy, failure_policy, max_unavailable, health_check_path/health_check_timeout and working_dir. By default all instances are deployed at once with FailurePause.'),
+        ctx: Context = None,
+):
+    """
+    将同一个部署产物并发部署到多个地域、多个应用分组。
+
+    - 产物只从本地上传一次，其他地域通过 OSS 跨地域复制同步（失败或超时时回退为直接上传，内容未变化时跳过），目标实例通过同地域 OSS 内网下载
+    - 启动/停止命令只生成一次，所有目标共用，规则与 OOS_CodeDeploy 相同
+    - 按 max_parallel 并发部署；开启 canary 时先部署第一个目标，成功后再部署其余目标，等待期间通过进度通知推送金丝雀状态
+    - 返回每个目标的部署状态以及汇总信息，可用 OOS_GetDeployStatus 跟踪各应用分组的后续状态
+    """
+    logger.info(f"[code_deploy_multi] Input parameters: name={name}, targets={targets}, object_name={object_name}, "
+                f"max_parallel={max_parallel}, canary={canary}, regional_artifacts={regional_artifacts}")
+    targets = _normalize_deploy_targets(targets)
+    strategy = _resolve_deployment_strategy(deployment_strategy)
+    max_parallel = max(1, min(max_parallel, MAX_MULTI_TARGET_PARALLEL))
+
+    _resolve_project_path(project_path, file_path)
+    ensure_code_deploy_dirs()
+    # 阻塞调用放到线程中执行，避免长时间占用事件循环（asyncio.to_thread 会带上当前请求上下文）
+    file_path = await asyncio.to_thread(_stage_deploy_artifact, file_path)
+
+    if not application_start or not application_stop:
+        generated_start, generated_stop = await asyncio.to_thread(
+            _generate_start_stop_commands_by_rules, file_path, deploy_language, name, port
+        )
+        application_start = application_start or generated_start
+        application_stop = application_stop or generated_stop
+        if not application_start:
+            return {
+                'error': 'START_COMMAND_REQUIRED',
+                'message': '无法通过规则引擎自动生成启动命令，请手动提供 application_start 参数并再次调用OOS_CodeDeployMultiTarget',
+                'file_path': file_path,
+                'deploy_language': deploy_language,
+            }
+    application_start = _append_health_check(application_start, port, strategy)
+
+    # 本地只上传一次，其他产物地域通过跨地域复制同步
+    if regional_artifacts:
+        artifact_regions = sorted({target['region_id'] for target in targets})
+    else:
+        artifact_regions = [CODE_DEPLOY_BUCKET_REGION]
+    artifacts = await asyncio.to_thread(_upload_regional_artifacts, name, object_name, file_path, artifact_regions)
+
+    client = create_client(region_id=APPLICATION_MANAGEMENT_REGION_ID)
+
+    def ensure_application():
+        if not _check_application_exists(client, name):
+            logger.info(f"[code_deploy_multi] Application '{name}' does not exist, creating it...")
+            client.create_application(oos_20190601_models.CreateApplicationRequest(
+                region_id=APPLICATION_MANAGEMENT_REGION_ID,
+                name=name,
+                alarm_config=oos_20190601_models.CreateApplicationRequestAlarmConfig()
+            ))
+    await asyncio.to_thread(ensure_application)
+
+    def deploy(target):
+        artifact_region = target['region_id'] if regional_artifacts else CODE_DEPLOY_BUCKET_REGION
+        return _deploy_target(client, name, target, artifacts[artifact_region], object_name,
+                              deploy_language, port, application_start, application_stop, strategy)
+
+    results = []
+    remaining = targets
+    if canary and len(targets) > 1:
+        canary_result = await asyncio.to_thread(deploy, targets[0])
+        if canary_result['status'] == 'Deploying':
+            canary_result['status'] = await _wait_for_application_group(
+                client, name, targets[0]['application_group_name'],
+                canary_result.pop('previous_execution_id', None), canary_timeout, ctx
+            )
+        results.append(canary_result)
+        remaining = targets[1:]
+        if canary_result['status'] not in SUCCESS_STATUSES:
+            logger.warning(f"[code_deploy_multi] Canary target finished with {canary_result['status']}, "
+                           f"skipping {len(remaining)} remaining targets")
+            results.extend(_target_summary(target, 'Skipped', error='CANARY_NOT_SUCCEEDED') for target in remaining)
+            remaining = []
+
+    def deploy_all(targets_to_deploy):
+        with ThreadPoolExecutor(max_workers=min(max_parallel, len(targets_to_deploy))) as executor:
+            return list(executor.map(run_in_current_context(deploy), targets_to_deploy))
+
+    if remaining:
+        results.extend(await asyncio.to_thread(deploy_all, remaining))
+    for result in results:
+        result.pop('previous_execution_id', None)
+
+    summary = {}
+    for result in results:
+        summary[result['status']] = summary.get(result['status'], 0) + 1
+    save_application_info({
+        'last_multi_target_deployment': {
+            'application_name': name,
+            'targets': [{key: result.get(key) for key in ('region_id', 'application_group_name', 'instance_ids', 'status')}
+                        for result in results],
+            'deploy_time': time.strftime('%Y-%m-%d %H:%M:%S')
+        }
+    })
+    response = {
+        'application_name': name,
+        'summary': summary,
+        'targets': results,
+        'artifacts': artifacts,
+        'canary': targets[0]['application_group_name'] if canary and len(targets) > 1 else None,
+    }
+    logger.info(f"[code_deploy_multi] Response: {json.dumps(response, ensure_ascii=False, default=str)}")
+    return response
+
+
 @_append_tool
 def OOS_GetLastDeploymentInfo(
         random_string: Optional[str] = Field(default=None, description='')
@@ -439,6 +727,72 @@ def OOS_GetDeployStatus(
     return response
 
 
+@_append_tool
+async def OOS_WaitForDeployment(
+        name: str = Field(description='name of the application'),
+        application_group_name: str = Field(description='name of the application group'),
+        execution_id: Optional[str] = Field(default=None, description='Deployment execution ID to wait for. When omitted, waits for the current deployment of the group.'),
+        timeout: int = Field(default=600, description=f'Maximum seconds to wait (at most {MAX_WAIT_FOR_DEPLOYMENT_TIMEOUT})'),
+        poll_interval: int = Field(default=5, description='Initial seconds between status checks, doubled after each unchanged check'),
+        max_poll_interval: int = Field(default=30, description='Maximum seconds between status checks'),
+        ctx: Context = None,
+):
+    """
+    等待应用分组部署结束（部署成功或失败）或超时，期间通过进度通知推送当前执行任务和各实例状态，
+    结束后返回精简的部署结果汇总。部署后请调用此工具等待结果，不要反复调用 OOS_GetDeployStatus 轮询。
+    """
+    logger.info(f"[WaitForDeployment] Input parameters: name={name}, application_group_name={application_group_name}, "
+                f"execution_id={execution_id}, timeout={timeout}")
+    timeout = max(0, min(timeout, MAX_WAIT_FOR_DEPLOYMENT_TIMEOUT))
+    interval = max(1, poll_interval)
+    max_interval = max(interval, max_poll_interval)
+    client = create_client(region_id=APPLICATION_MANAGEMENT_REGION_ID)
+
+    started = time.monotonic()
+    polls = 0
+    last_fingerprint = None
+    while True:
+        deployment = await asyncio.to_thread(
+            _list_application_group_deployment, client, name, application_group_name, END_STATUSES
+        )
+        polls += 1
+        current_execution_id = deployment.get('execution_id')
+        child_executions = []
+        if current_execution_id:
+            child_executions = await asyncio.to_thread(_list_child_executions, client, current_execution_id)
+        summary = _summarize_deployment(name, application_group_name, deployment, child_executions)
+
+        waiting_for_other = execution_id and current_execution_id and current_execution_id != execution_id
+        finished = summary['status'] in END_STATUSES and not waiting_for_other
+        elapsed = time.monotonic() - started
+        timed_out = not finished and elapsed >= timeout
+
+        fingerprint = (summary['status'], tuple(summary['current_tasks']),
+                       json.dumps(summary['instance_status_counts'], sort_keys=True))
+        if ctx is not None and fingerprint != last_fingerprint:
+            await ctx.report_progress(
+                progress=summary['instances_finished'],
+                total=summary['instances_total'] or None,
+                message=_format_deployment_progress(summary)
+            )
+        last_fingerprint = fingerprint
+
+        if finished:
+            await asyncio.to_thread(_settle_delta_base, client, name, application_group_name, deployment)
+        if finished or timed_out:
+            summary.update({
+                'finished': finished,
+                'timed_out': timed_out,
+                'elapsed_seconds': round(elapsed, 1),
+                'polls': polls,
+            })
+            logger.info(f"[WaitForDeployment] Response: {json.dumps(summary, ensure_ascii=False, default=str)}")
+            return summary
+
+        await asyncio.sleep(min(interval, max(timeout - elapsed, 0)))
+        interval = min(interval * 2, max_interval)
+
+
 @_append_tool
 def ECS_DescribeInstances(
         instance_ids: List[str] = Field(description='AlibabaCloud ECS instance ID List (required)'),
@@ -463,10 +817,430 @@ def ECS_DescribeInstances(
     return response
 
 
+def _resolve_project_path(project_path: Optional[str], file_path: str):
+    """
+    设置项目根目录，未提供时从 file_path 向上推断（最多 5 层），仍未找到则使用文件所在目录
+    """
+    # Set project path if provided
+    if project_path:
+        set_project_path(project_path)
+        logger.info(f"[code_deploy] Project path set to: {project_path}")
+        return
+
+    # Try to infer project path from file_path
+    file_path_obj = Path(file_path)
+    if not file_path_obj.is_absolute():
+        file_path_obj = Path.cwd() / file_path_obj
+    file_path_resolved = file_path_obj.resolve()
+
+    # Try to find project root by looking for common project files
+    current_dir = file_path_resolved.parent
+    project_root = None
+    project_indicators = ['package.json', 'pom.xml', 'requirements.txt', 'go.mod', 'Cargo.toml', '.git']
+
+    # Search up to 5 levels for project root
+    for _ in range(5):
+        if any((current_dir / indicator).exists() for indicator in project_indicators):
+            project_root = current_dir
+            break
+        parent = current_dir.parent
+        if parent == current_dir:  # Reached filesystem root
+            break
+        current_dir = parent
+
+    if project_root:
+        set_project_path(str(project_root))
+        logger.info(f"[code_deploy] Inferred project path from file_path: {project_root}")
+    else:
+        # Use the directory containing the file as project root
+        set_project_path(str(file_path_resolved.parent))
+        logger.info(f"[code_deploy] Using file directory as project path: {file_path_resolved.parent}")
+
+
+def _stage_deploy_artifact(file_path: str) -> str:
+    """
+    将部署产物放入 .code_deploy/release 目录并清理旧产物，返回 release 目录中的文件路径
+    """
+    # Process file path: if file is not in release directory, copy it to release directory
+    file_path_obj = Path(file_path)
+    if not file_path_obj.is_absolute():
+        file_path_obj = Path.cwd() / file_path_obj
+
+    # Check if file exists
+    if not file_path_obj.exists():
+        raise FileNotFoundError(f"File does not exist: {file_path_obj}")
+
+    # If file is not in release directory, stage it there (reflink before falling back to copy)
+    release_path_resolved, stage_method = stage_release_file(file_path_obj)
+    if stage_method == 'existing':
+        logger.info(f"[code_deploy] File already in release directory: {release_path_resolved}")
+    else:
+        logger.info(f"[code_deploy] Staged file from {file_path_obj} to {release_path_resolved} via {stage_method}")
+    prune_release_dir(settings.code_deploy_release_retention, exclude=release_path_resolved)
+    return str(release_path_resolved)
+
+
+def _upload_artifact_if_changed(bucket_name: str, object_name: str, file_path: str,
+                                region_id_oss: str, record: bool = True) -> Tuple[Optional[str], bool]:
+    """
+    上传部署产物到 OSS，如果 OSS 上已存在内容相同（CRC64 一致）的对象则跳过上传，复用已有的版本 ID；
+    record 为 False 时（如增量补丁）不更新 last_artifact
+
+    Returns:
+        (version_id, uploaded): 对象版本 ID，以及本次是否实际进行了上传
+    """
+    file_hash = oss_tools.compute_file_crc64(file_path)
+    client = oss_tools.create_client(region_id=region_id_oss)
+    existing = oss_tools.head_object_hash(client, bucket_name, object_name)
+
+    if existing and existing.get('hash_crc64') == file_hash:
+        version_id = existing.get('version_id')
+        uploaded = False
+        logger.info(f"[code_deploy] Artifact unchanged (crc64={file_hash}), "
+                    f"reusing {bucket_name}/{object_name} version {version_id}")
+    else:
+        put_object_resp = oss_tools.OSS_PutObject(
+            BucketName=bucket_name,
+            ObjectKey=object_name,
+            FilePath=file_path,
+            RegionId=region_id_oss,
+            ContentType="application/octet-stream",
+        )
+        version_id = put_object_resp.get('version_id')
+        uploaded = True
+        logger.info(f"[code_deploy] Put Object Response: {put_object_resp}")
+
+    if not record:
+        return version_id, uploaded
+    save_application_info({
+        'last_artifact': {
+            'bucket_name': bucket_name,
+            'object_name': object_name,
+            'file_name': Path(file_path).name,
+            'hash_crc64': file_hash,
+            'version_id': version_id,
+        }
+    })
+    return version_id, uploaded
+
+
+def _run_phase(func: Callable[[Dict[str, Any]], Any], results: Dict[str, Any]):
+    started = time.monotonic()
+    try:
+        return func(results), None, time.monotonic() - started
+    except Exception as e:
+        return None, e, time.monotonic() - started
+
+
+def _run_phase_graph(phases: Dict[str, Tuple[Callable[[Dict[str, Any]], Any], List[str]]]
+                     ) -> Tuple[Dict[str, Any], Dict[str, Exception], Dict[str, float]]:
+    """
+    按依赖关系并发执行部署前置阶段，没有依赖关系的阶段同时运行
+
+    Args:
+        phases: {阶段名: (函数, 依赖的阶段名列表)}，函数以已完成阶段的结果字典为参数
+
+    Returns:
+        (results, errors, timings): 各阶段的返回值、抛出的异常（依赖失败的阶段复用上游异常，不再执行）
+        以及各阶段耗时（秒）
+    """
+    pending = dict(phases)
+    running = {}
+    results = {}
+    errors = {}
+    timings = {}
+
+    with ThreadPoolExecutor(max_workers=max(len(phases), 1)) as executor:
+        while pending or running:
+            for name, (func, deps) in list(pending.items()):
+                failed_deps = [dep for dep in deps if dep in errors]
+                if failed_deps:
+                    errors[name] = errors[failed_deps[0]]
+                    del pending[name]
+                elif all(dep in results for dep in deps):
+                    running[executor.submit(run_in_current_context(_run_phase), func, dict(results))] = name
+                    del pending[name]
+
+            if not running:
+                if pending:
+                    raise ValueError(f"Unresolvable phase dependencies: {sorted(pending)}")
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                value, error, elapsed = future.result()
+                timings[name] = round(elapsed, 3)
+                if error is not None:
+                    logger.warning(f"[_run_phase_graph] Phase {name} failed after {elapsed:.3f}s: {error}")
+                    errors[name] = error
+                else:
+                    results[name] = value
+
+    return results, errors, timings
+
+
+def _get_phase_result(results: Dict[str, Any], errors: Dict[str, Exception], name: str):
+    """
+    获取阶段结果，阶段失败时抛出其异常
+    """
+    if name in errors:
+        raise errors[name]
+    return results[name]
+
+
+def _normalize_deploy_targets(targets: List[Dict]) -> List[Dict]:
+    """
+    校验多目标部署参数，返回包含 region_id、application_group_name、instance_ids 的目标列表
+    """
+    if not targets:
+        raise ValueError("targets is required and cannot be empty")
+    normalized = []
+    seen = set()
+    for target in targets:
+        region_id = target.get('region_id') or target.get('RegionId')
+        group_name = target.get('application_group_name') or target.get('ApplicationGroupName')
+        instance_ids = target.get('instance_ids') or target.get('InstanceIds')
+        if not region_id or not group_name or not instance_ids:
+            raise ValueError(f"Each target requires region_id, application_group_name and instance_ids: {target}")
+        if group_name in seen:
+            raise ValueError(f"Duplicate application group in targets: {group_name}")
+        seen.add(group_name)
+        normalized.append({
+            'region_id': region_id,
+            'application_group_name': group_name,
+            'instance_ids': list(instance_ids),
+        })
+    return normalized
+
+
+def _ensure_artifact_replication(client: oss.Client, source_bucket: str, region_id: str, target_bucket: str):
+    """
+    确保主地域代码部署 Bucket 到目标地域 Bucket 的跨地域复制规则存在：只复制新写入的对象，不同步删除
+    """
+    try:
+        result = client.get_bucket_replication(oss.GetBucketReplicationRequest(bucket=source_bucket))
+        rules = (result.replication_configuration.rules or []) if result.replication_configuration else []
+    except Exception as e:
+        logger.info(f"[_ensure_artifact_replication] No replication rules on {source_bucket}: {e}")
+        rules = []
+    if any(rule.destination and rule.destination.bucket == target_bucket for rule in rules):
+        return
+    client.put_bucket_replication(oss.PutBucketReplicationRequest(
+        bucket=source_bucket,
+        replication_configuration=oss.ReplicationConfiguration(rules=[oss.ReplicationRule(
+            destination=oss.ReplicationDestination(
+                bucket=target_bucket,
+                location=f'oss-{region_id}',
+                transfer_type='internal'
+            ),
+            historical_object_replication='disabled',
+            action='PUT'
+        )])
+    ))
+    logger.info(f"[_ensure_artifact_replication] Replicating {source_bucket} to {target_bucket} ({region_id})")
+
+
+def _wait_for_replicated_artifact(region_id: str, bucket_name: str, object_name: str, file_hash: str,
+                                  timeout: int) -> Optional[Dict[str, Any]]:
+    """
+    等待复制到目标地域的产物 CRC64 与本地一致，超时返回 None
+    """
+    client = oss_tools.create_client(region_id=region_id)
+    deadline = time.monotonic() + timeout
+    while True:
+        existing = oss_tools.head_object_hash(client, bucket_name, object_name)
+        if existing and existing.get('hash_crc64') == file_hash:
+            return existing
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        time.sleep(min(ARTIFACT_REPLICATION_POLL_INTERVAL, remaining))
+
+
+def _upload_regional_artifacts(name: str, object_name: str, file_path: str, regions: List[str]) -> Dict[str, Dict]:
+    """
+    部署产物只从本地上传一次到主地域（默认 cn-hangzhou，不在目标地域中时取第一个地域）的代码部署 Bucket，
+    其他地域通过 OSS 跨地域复制在服务端同步；复制规则无法创建或超时未同步的地域回退为从本地直接上传。
+    内容未变化的对象直接复用
+
+    Returns:
+        {region_id: {'region_id', 'bucket_name', 'version_id', 'uploaded', 'source'}}，
+        source 为 existing（复用）、upload（本地上传）或 replication（跨地域复制）
+    """
+    file_hash = oss_tools.compute_file_crc64(file_path)
+    primary_region = CODE_DEPLOY_BUCKET_REGION if CODE_DEPLOY_BUCKET_REGION in regions else regions[0]
+    primary_bucket = get_or_create_bucket_for_code_deploy(name, primary_region)
+    primary_client = oss_tools.create_client(region_id=primary_region)
+    secondary_regions = [region_id for region_id in regions if region_id != primary_region]
+    max_workers = max(1, min(len(secondary_regions), MAX_MULTI_TARGET_PARALLEL))
+
+    def prepare(region_id):
+        bucket_name = get_or_create_bucket_for_code_deploy(name, region_id)
+        artifact = {'region_id': region_id, 'bucket_name': bucket_name, 'version_id': None, 'uploaded': False}
+        existing = oss_tools.head_object_hash(oss_tools.create_client(region_id=region_id), bucket_name, object_name)
+        if existing and existing.get('hash_crc64') == file_hash:
+            artifact.update(version_id=existing.get('version_id'), source='existing')
+            return artifact
+        try:
+            _ensure_artifact_replication(primary_client, primary_bucket, region_id, bucket_name)
+            artifact['source'] = 'replication'
+        except Exception as e:
+            logger.warning(f"[code_deploy_multi] Cross-region replication to {region_id} unavailable, "
+                           f"uploading directly: {e}")
+            artifact['source'] = 'upload'
+        return artifact
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        artifacts = dict(zip(secondary_regions, executor.map(run_in_current_context(prepare), secondary_regions)))
+    replicated = [artifact for artifact in artifacts.values() if artifact['source'] == 'replication']
+
+    version_id, uploaded = _upload_artifact_if_changed(primary_bucket, object_name, file_path, primary_region)
+    if replicated and not uploaded:
+        # 复制规则只复制之后写入的对象：主地域对象未变化时在服务端复制一次自身，触发跨地域复制（不经过本地）
+        try:
+            version_id = primary_client.copy_object(oss.CopyObjectRequest(
+                bucket=primary_bucket,
+                key=object_name,
+                source_bucket=primary_bucket,
+                source_key=object_name,
+                source_version_id=version_id,
+                metadata_directive='REPLACE',
+                content_type='application/octet-stream'
+            )).version_id
+        except Exception as e:
+            logger.warning(f"[code_deploy_multi] Failed to trigger replication of {primary_bucket}/{object_name}, "
+                           f"uploading directly: {e}")
+            for artifact in replicated:
+                artifact['source'] = 'upload'
+
+    def finish(artifact):
+        if artifact['source'] == 'replication':
+            existing = _wait_for_replicated_artifact(artifact['region_id'], artifact['bucket_name'], object_name,
+                                                     file_hash, ARTIFACT_REPLICATION_TIMEOUT)
+            if existing:
+                artifact['version_id'] = existing.get('version_id')
+                return artifact
+            logger.warning(f"[code_deploy_multi] Replication to {artifact['region_id']} timed out, uploading directly")
+            artifact['source'] = 'upload'
+        if artifact['source'] == 'upload':
+            artifact['version_id'], artifact['uploaded'] = _upload_artifact_if_changed(
+                artifact['bucket_name'], object_name, file_path, artifact['region_id'], record=False)
+        return artifact
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(run_in_current_context(finish), list(artifacts.values())))
+    artifacts[primary_region] = {
+        'region_id': primary_region,
+        'bucket_name': primary_bucket,
+        'version_id': version_id,
+        'uploaded': uploaded,
+        'source': 'upload' if uploaded else 'existing',
+    }
+    return {region_id: artifacts[region_id] for region_id in regions}
+
+
+def _target_summary(target: Dict, status: str, **extra) -> Dict:
+    summary = {
+        'region_id': target['region_id'],
+        'application_group_name': target['application_group_name'],
+        'instance_ids': target['instance_ids'],
+        'status': status,
+    }
+    summary.update(extra)
+    return summary
+
+
+def _get_application_group_execution_id(client, name: str, application_group_name: str) -> Optional[str]:
+    try:
+        response = client.get_application_group(oos_20190601_models.GetApplicationGroupRequest(
+            region_id=APPLICATION_MANAGEMENT_REGION_ID,
+            application_name=name,
+            name=application_group_name
+        ))
+        return response.body.application_group.execution_id
+    except Exception as e:
+        logger.info(f"[_get_application_group_execution_id] Failed to get application group {application_group_name}: {e}")
+        return None
+
+
+def _deploy_target(client, name: str, target: Dict, artifact: Dict, object_name: str, deploy_language: str,
+                   port: int, application_start: str, application_stop: str,
+                   strategy: Optional[DeploymentStrategy] = None) -> Dict:
+    """
+    部署单个目标（地域 + 应用分组），失败时返回 Failed 状态而不是抛出异常，便于多目标汇总
+    """
+    region_id = target['region_id']
+    application_group_name = target['application_group_name']
+    instance_ids = target['instance_ids']
+    try:
+        instances = _describe_instances_by_ids(region_id, instance_ids)
+        all_exist, missing_instance_ids = _check_ecs_instances_exist(region_id, instance_ids, instances)
+        if not all_exist:
+            return _target_summary(target, 'Failed', error='ECS_INSTANCE_NOT_FOUND',
+                                   missing_instance_ids=missing_instance_ids)
+
+        is_internal_oss = artifact['region_id'] == region_id
+        previous_execution_id = None
+        if not _check_application_group_exists(client, name, application_group_name):
+            deploy_request = _handle_new_application_group(client, name, application_group_name, region_id,
+                                                           artifact['region_id'], artifact['bucket_name'],
+                                                           object_name, artifact['version_id'], is_internal_oss,
+                                                           port, instance_ids, application_start,
+                                                           application_stop, deploy_language, instances, strategy)
+        else:
+            previous_execution_id = _get_application_group_execution_id(client, name, application_group_name)
+            deploy_request = _handle_existing_application_group(name, application_group_name, region_id,
+                                                                artifact['region_id'], artifact['bucket_name'],
+                                                                object_name, artifact['version_id'],
+                                                                application_start, application_stop,
+                                                                instance_ids, instances, strategy)
+        client.deploy_application_group(deploy_request)
+        logger.info(f"[code_deploy_multi] Started deployment of {application_group_name} in {region_id}")
+        return _target_summary(
+            target, 'Deploying',
+            bucket_name=artifact['bucket_name'],
+            is_internal_oss=is_internal_oss,
+            previous_execution_id=previous_execution_id,
+            service_link=f'https://ecs.console.aliyun.com/app/detail?tabKey=overview&appName={name}&groupName={application_group_name}'
+        )
+    except Exception as e:
+        logger.error(f"[code_deploy_multi] Failed to deploy {application_group_name} in {region_id}: {e}")
+        return _target_summary(target, 'Failed', error=str(e))
+
+
+async def _wait_for_application_group(client, name: str, application_group_name: str,
+                                      previous_execution_id: Optional[str], timeout: int,
+                                      ctx: Optional[Context] = None) -> str:
+    """
+    等待应用分组本次部署结束，返回最终状态；超时返回 Timeout
+    通过 execution_id 区分本次部署与上一次已结束的部署，等待期间不阻塞事件循环
+    """
+    started = time.monotonic()
+    while True:
+        status = None
+        try:
+            deployment = await asyncio.to_thread(
+                _list_application_group_deployment, client, name, application_group_name, END_STATUSES
+            )
+            status = deployment['status']
+            if deployment['execution_id'] != previous_execution_id and status in END_STATUSES:
+                return status
+        except Exception as e:
+            logger.warning(f"[_wait_for_application_group] Failed to get status of {application_group_name}: {e}")
+        elapsed = time.monotonic() - started
+        if elapsed >= timeout:
+            return 'Timeout'
+        if ctx is not None:
+            await ctx.report_progress(progress=round(elapsed, 1), total=timeout,
+                                      message=f"canary {application_group_name}: {status or 'Unknown'}")
+        await asyncio.sleep(min(CANARY_POLL_INTERVAL, timeout - elapsed))
+
+
 def _handle_new_application_group(client, name, application_group_name, deploy_region_id,
                                   region_id_oss, bucket_name, object_name, version_id,
                                   is_internal_oss, port, instance_ids, application_start,
-                                  application_stop, deploy_language):
+                                  application_stop, deploy_language, instances=None, strategy=None):
     logger.info(f"[code_deploy] Application group '{application_group_name}' does not exist, creating it...")
     create_application_group_request = oos_20190601_models.CreateApplicationGroupRequest(
         region_id=APPLICATION_MANAGEMENT_REGION_ID,
@@ -478,12 +1252,17 @@ def _handle_new_application_group(client, name, application_group_name, deploy_r
     logger.info(f"[code_deploy] Application group '{application_group_name}' created successfully")
 
     # 确保所有实例都打上 tag（包括第一个实例）
-    _ensure_instances_tagged(deploy_region_id, name, application_group_name, instance_ids)
+    _ensure_instances_tagged(deploy_region_id, name, application_group_name, instance_ids, instances)
 
+    strategy = strategy or DeploymentStrategy()
+    first_instance = (instances or {}).get(instance_ids[0]) if instance_ids else None
+    zone_id = getattr(first_instance, 'zone_id', None)
     deploy_parameters = _create_deploy_parameters(
         name, application_group_name, region_id_oss, bucket_name,
         object_name, version_id, is_internal_oss, port, instance_ids,
-        application_start, application_stop, deploy_language
+        application_start, application_stop, deploy_language,
+        zone_id=zone_id if isinstance(zone_id, str) else None,
+        working_dir=strategy.working_dir
     )
 
     return oos_20190601_models.DeployApplicationGroupRequest(
@@ -495,15 +1274,18 @@ def _handle_new_application_group(client, name, application_group_name, deploy_r
 
 
 def _handle_existing_application_group(name, application_group_name, deploy_region_id, region_id_oss, bucket_name,
-                                       object_name, version_id, application_start, application_stop, instance_ids):
+                                       object_name, version_id, application_start, application_stop, instance_ids,
+                                       instances=None, strategy=None):
     logger.info(f"[code_deploy] Application group '{application_group_name}' already exists, skipping creation")
     
     # 确保所有实例都打上 tag（应用分组已存在的情况）
-    _ensure_instances_tagged(deploy_region_id, name, application_group_name, instance_ids)
+    _ensure_instances_tagged(deploy_region_id, name, application_group_name, instance_ids, instances)
 
+    strategy = strategy or DeploymentStrategy()
     location_hooks = _create_location_and_hooks(
         region_id_oss, bucket_name, object_name, version_id,
-        deploy_region_id, application_start, application_stop
+        deploy_region_id, application_start, application_stop,
+        working_dir=strategy.working_dir
     )
 
     create_deploy_parameters = {
@@ -523,16 +1305,12 @@ def _handle_existing_application_group(name, application_group_name, deploy_regi
     logger.info(f"[code_deploy] create_deploy_revision_response {create_deploy_revision_response}")
     revision_id = str(create_deploy_revision_response.get('body', {}).get('Revision', {}).get('RevisionId'))
 
+    start_execution = _create_start_execution_parameters(
+        name, application_group_name, revision_id, strategy, len(instance_ids or [])
+    )
     start_execution_parameters = json.dumps({
-        "Parameters": json.dumps({
-            "applicationName": name,
-            "applicationGroupName": application_group_name,
-            "deployRevisionId": revision_id,
-            "deployMethod": "all",
-            "batchNumber": 2,
-            "batchPauseOption": "Automatic"
-        }),
-        "Mode": "FailurePause"
+        "Parameters": json.dumps(start_execution["Parameters"]),
+        "Mode": start_execution["Mode"]
     })
     deploy_parameters = json.dumps({
         "StartExecutionParameters": start_execution_parameters
@@ -593,9 +1371,36 @@ def _describe_instances_with_retry(deploy_region_id: str, describe_instances_req
         raise last_exception
 
 
-def _check_ecs_instances_exist(deploy_region_id: str, instance_ids: list) -> Tuple[bool, list]:
+def _describe_instances_by_ids(deploy_region_id: str, instance_ids: list) -> Dict[str, object]:
+    """
+    批量查询 ECS 实例，按 DescribeInstances 单次 100 个实例 ID 的上限分批请求
+
+    Returns:
+        Dict[instance_id, instance]: 已存在的实例（包含 tags 信息）
+    """
+    instances = {}
+    for start in range(0, len(instance_ids), ECS_DESCRIBE_INSTANCES_BATCH_SIZE):
+        batch_ids = instance_ids[start:start + ECS_DESCRIBE_INSTANCES_BATCH_SIZE]
+        describe_instances_request = ecs_20140526_models.DescribeInstancesRequest(
+            region_id=deploy_region_id,
+            instance_ids=json.dumps(batch_ids),
+            page_size=ECS_DESCRIBE_INSTANCES_BATCH_SIZE
+        )
+        response = _describe_instances_with_retry(deploy_region_id, describe_instances_request)
+        if response.body and response.body.instances and response.body.instances.instance:
+            for instance in response.body.instances.instance:
+                if instance.instance_id:
+                    instances[instance.instance_id] = instance
+    return instances
+
+
+def _check_ecs_instances_exist(deploy_region_id: str, instance_ids: list,
+                               instances: Optional[Dict[str, object]] = None) -> Tuple[bool, list]:
     """
     检查 ECS 实例是否存在
+
+    Args:
+        instances: 已通过 _describe_instances_by_ids 查询到的实例，提供时不再重复调用 DescribeInstances
     
     Returns:
         (all_exist, missing_instance_ids): 如果所有实例都存在返回 (True, [])，否则返回 (False, [缺失的实例ID列表])
@@ -603,20 +1408,10 @@ def _check_ecs_instances_exist(deploy_region_id: str, instance_ids: list) -> Tup
     if not instance_ids:
         return True, []
     
-    describe_instances_request = ecs_20140526_models.DescribeInstancesRequest(
-        region_id=deploy_region_id,
-        instance_ids=json.dumps(instance_ids)
-    )
-    
-    response = _describe_instances_with_retry(deploy_region_id, describe_instances_request)
+    if instances is None:
+        instances = _describe_instances_by_ids(deploy_region_id, instance_ids)
     
-    existing_instance_ids = set()
-    if response.body and response.body.instances and response.body.instances.instance:
-        for instance in response.body.instances.instance:
-            if instance.instance_id:
-                existing_instance_ids.add(instance.instance_id)
-    
-    missing_instance_ids = [inst_id for inst_id in instance_ids if inst_id not in existing_instance_ids]
+    missing_instance_ids = [inst_id for inst_id in instance_ids if inst_id not in instances]
     
     if missing_instance_ids:
         logger.warning(f"[_check_ecs_instances_exist] Missing instances: {missing_instance_ids}")
@@ -626,39 +1421,27 @@ def _check_ecs_instances_exist(deploy_region_id: str, instance_ids: list) -> Tup
         return True, []
 
 
-def _check_instance_has_tag(deploy_region_id: str, instance_id: str, tag_key: str, tag_value: str) -> bool:
+def _instance_has_tag(instance, tag_key: str, tag_value: str) -> bool:
     """
-    检查 ECS 实例是否已经有指定的 tag
-    
-    Returns:
-        bool: 如果实例已经有指定的 tag 返回 True，否则返回 False
+    判断 DescribeInstances 返回的实例对象上是否已有指定的 tag
     """
-    describe_instances_request = ecs_20140526_models.DescribeInstancesRequest(
-        region_id=deploy_region_id,
-        instance_ids=json.dumps([instance_id])
-    )
-    
-    try:
-        response = _describe_instances_with_retry(deploy_region_id, describe_instances_request)
-        if response.body and response.body.instances and response.body.instances.instance:
-            instance = response.body.instances.instance[0]
-            if instance.tags and instance.tags.tag is not None:
-                for tag in instance.tags.tag:
-                    if tag.tag_key == tag_key and tag.tag_value == tag_value:
-                        logger.info(f"[_check_instance_has_tag] Instance {instance_id} already has tag {tag_key}={tag_value}")
-                        return True
-        logger.info(f"[_check_instance_has_tag] Instance {instance_id} does not have tag {tag_key}={tag_value}")
-        return False
-    except Exception as e:
-        # 如果查询失败，假设没有 tag，继续打 tag
-        logger.warning(f"[_check_instance_has_tag] Error checking tag for instance {instance_id}: {e}")
+    if instance is None or not instance.tags or instance.tags.tag is None:
         return False
+    for tag in instance.tags.tag:
+        if tag.tag_key == tag_key and tag.tag_value == tag_value:
+            return True
+    return False
 
 
-def _ensure_instances_tagged(deploy_region_id: str, name: str, application_group_name: str, instance_ids: list):
+def _ensure_instances_tagged(deploy_region_id: str, name: str, application_group_name: str, instance_ids: list,
+                             instances: Optional[Dict[str, object]] = None):
     """
     确保所有 ECS 实例都打上了指定的 tag
     如果实例没有 tag，则为其打上 tag
+
+    Args:
+        instances: 实例存在性校验时已查询到的实例，提供时直接复用其 tag 信息；
+            否则批量调用一次 DescribeInstances 获取
     """
     if not instance_ids:
         return
@@ -666,29 +1449,37 @@ def _ensure_instances_tagged(deploy_region_id: str, name: str, application_group
     tag_key = f'app-{name}'
     tag_value = application_group_name
     
+    if instances is None:
+        try:
+            instances = _describe_instances_by_ids(deploy_region_id, instance_ids)
+        except Exception as e:
+            # 如果查询失败，假设没有 tag，继续打 tag
+            logger.warning(f"[_ensure_instances_tagged] Error describing instances {instance_ids}: {e}")
+            instances = {}
+    
     # 找出需要打 tag 的实例
-    instances_to_tag = []
-    for instance_id in instance_ids:
-        if not _check_instance_has_tag(deploy_region_id, instance_id, tag_key, tag_value):
-            instances_to_tag.append(instance_id)
+    instances_to_tag = [instance_id for instance_id in instance_ids
+                        if not _instance_has_tag(instances.get(instance_id), tag_key, tag_value)]
     
     if not instances_to_tag:
         logger.info(f"[_ensure_instances_tagged] All instances already have tag {tag_key}={tag_value}")
         return
     
-    # 为需要打 tag 的实例打 tag
+    # 为需要打 tag 的实例打 tag，按 TagResources 单次 50 个资源的上限分批
     logger.info(f"[_ensure_instances_tagged] Tagging instances: {instances_to_tag}")
     ecs_client = create_ecs_client(region_id=deploy_region_id)
-    tag_resources_request = ecs_20140526_models.TagResourcesRequest(
-        region_id=deploy_region_id,
-        resource_type='Instance',
-        resource_id=instances_to_tag,
-        tag=[ecs_20140526_models.TagResourcesRequestTag(
-            key=tag_key,
-            value=tag_value
-        )]
-    )
-    ecs_client.tag_resources(tag_resources_request)
+    for start in range(0, len(instances_to_tag), ECS_TAG_RESOURCES_BATCH_SIZE):
+        batch_ids = instances_to_tag[start:start + ECS_TAG_RESOURCES_BATCH_SIZE]
+        tag_resources_request = ecs_20140526_models.TagResourcesRequest(
+            region_id=deploy_region_id,
+            resource_type='Instance',
+            resource_id=batch_ids,
+            tag=[ecs_20140526_models.TagResourcesRequestTag(
+                key=tag_key,
+                value=tag_value
+            )]
+        )
+        ecs_client.tag_resources(tag_resources_request)
     logger.info(f"[_ensure_instances_tagged] Successfully tagged instances: {instances_to_tag}")
 
 
@@ -736,6 +1527,79 @@ def _list_application_group_deployment(client, name, application_group_name, sta
     return resp
 
 
+def _list_child_executions(client, execution_id: str) -> List:
+    """
+    列出部署执行的子执行（对应各批次/各实例的部署任务），查询失败时返回空列表
+    """
+    try:
+        response = client.list_executions(oos_20190601_models.ListExecutionsRequest(
+            parent_execution_id=execution_id,
+            max_results=100
+        ))
+        return list(response.body.executions or [])
+    except Exception as e:
+        logger.info(f"[_list_child_executions] Error listing child executions of {execution_id}: {e}")
+        return []
+
+
+def _child_execution_instance_id(execution) -> Optional[str]:
+    parameters = execution.parameters or {}
+    for key in ('instanceId', 'InstanceId', 'instanceIds', 'InstanceIds'):
+        value = parameters.get(key)
+        if isinstance(value, list) and len(value) == 1:
+            value = value[0]
+        if isinstance(value, str):
+            return value
+    return None
+
+
+def _summarize_deployment(name: str, application_group_name: str, deployment: Dict, child_executions: List) -> Dict:
+    """
+    将 _list_application_group_deployment 的结果和子执行列表压缩为精简的状态汇总
+    """
+    execution = None
+    execution_info = deployment.get('deploy_execution_info')
+    if execution_info is not None and getattr(execution_info, 'executions', None):
+        execution = execution_info.executions[0]
+
+    instances = []
+    instance_status_counts = {}
+    for child in child_executions:
+        instance_status_counts[child.status] = instance_status_counts.get(child.status, 0) + 1
+        instances.append({
+            'instance_id': _child_execution_instance_id(child),
+            'execution_id': child.execution_id,
+            'status': child.status,
+        })
+    instances_finished = sum(count for status, count in instance_status_counts.items()
+                             if status in ('Success', 'Failed', 'Cancelled'))
+
+    return {
+        'application_name': name,
+        'application_group_name': application_group_name,
+        'status': deployment.get('status'),
+        'execution_id': deployment.get('execution_id'),
+        'execution_status': execution.status if execution else None,
+        'status_message': execution.status_message if execution else None,
+        'current_tasks': [task.task_name for task in (execution.current_tasks or [])] if execution else [],
+        'counters': execution.counters if execution else None,
+        'instances_total': len(child_executions),
+        'instances_finished': instances_finished,
+        'instance_status_counts': instance_status_counts,
+        'instances': instances[:MAX_WAIT_REPORTED_INSTANCES],
+    }
+
+
+def _format_deployment_progress(summary: Dict) -> str:
+    message = f"{summary['application_group_name']}: {summary['status']}"
+    if summary['current_tasks']:
+        message += f", running {', '.join(summary['current_tasks'])}"
+    if summary['instances_total']:
+        counts = ', '.join(f'{status}={count}' for status, count in sorted(summary['instance_status_counts'].items()))
+        message += f", instances {summary['instances_finished']}/{summary['instances_total']} finished ({counts})"
+    return message
+
+
 def _check_application_exists(client: oos20190601Client, name: str) -> bool:
     try:
         get_application_request = oos_20190601_models.GetApplicationRequest(
@@ -763,7 +1627,8 @@ def _check_application_group_exists(client: oos20190601Client, application_name:
         return True
     except Exception as e:
         error_code = getattr(e, 'code', None)
-        if error_code == 'EntityNotExists.ApplicationGroup':
+        # 应用不存在时应用分组也必然不存在（应用分组检查可能与应用创建并发执行）
+        if error_code in ('EntityNotExists.ApplicationGroup', 'EntityNotExists.Application'):
             return False
         logger.warning(
             f"[_check_application_group_exists] Error checking application group {application_name}/{group_name}: {e}")
@@ -771,7 +1636,8 @@ def _check_application_group_exists(client: oos20190601Client, application_name:
 
 
 def _create_deploy_parameters(name, application_group_name, region_id_oss, bucket_name, object_name, version_id,
-                              is_internal_oss, port, instance_ids, application_start, application_stop, deploy_language):
+                              is_internal_oss, port, instance_ids, application_start, application_stop, deploy_language,
+                              zone_id=None, working_dir=DEFAULT_WORKING_DIR):
     """
     Create deployment parameters
     """
@@ -792,7 +1658,7 @@ def _create_deploy_parameters(name, application_group_name, region_id_oss, bucke
             "InstanceId": instance_ids[0] if instance_ids else None,
             "ApplicationName": name,
             "Description": "",
-            "ZoneId": "cn-hangzhou-b",
+            "ZoneId": zone_id,
             "Port": port,
             "RevisionType": "Oss",
             "RegionIdOSS": region_id_oss,
@@ -801,7 +1667,7 @@ def _create_deploy_parameters(name, application_group_name, region_id_oss, bucke
             "VersionId": version_id,
             "IsInternalOSS": is_internal_oss,
             "ApplicationGroupName": application_group_name,
-            "WorkingDir": "/root",
+            "WorkingDir": working_dir,
             "ApplicationStart": application_start,
             "ApplicationStop": application_stop,
             "PackageName": package_name
@@ -812,7 +1678,7 @@ def _create_deploy_parameters(name, application_group_name, region_id_oss, bucke
 
 
 def _create_location_and_hooks(region_id_oss, bucket_name, object_name, version_id, deploy_region_id,
-                               application_start, application_stop):
+                               application_start, application_stop, working_dir=DEFAULT_WORKING_DIR):
     """
     Create location and hook configuration
     """
@@ -825,55 +1691,514 @@ def _create_location_and_hooks(region_id_oss, bucket_name, object_name, version_
             "isInternal": "true" if region_id_oss == deploy_region_id else "false"
         },
         "hooks": {
-            "workingDir": "/root",
+            "workingDir": working_dir,
             "applicationStart": application_start,
             "applicationStop": application_stop
         }
     }
 
 
-def _create_revision_deploy_parameters():
+def _create_start_execution_parameters(name, application_group_name, revision_id,
+                                       strategy: Optional[DeploymentStrategy] = None, instance_count: int = 0):
+    """
+    Create the execution parameters of a revision deployment from the deployment strategy
+    """
+    strategy = strategy or DeploymentStrategy()
+    if strategy.is_batched:
+        deploy_method = "batch"
+        batch_number = strategy.resolve_batch_number(instance_count)
+    else:
+        deploy_method = "all"
+        batch_number = DEFAULT_BATCH_NUMBER
+    return {
+        "Parameters": {
+            "applicationName": name,
+            "applicationGroupName": application_group_name,
+            "deployRevisionId": revision_id,
+            "deployMethod": deploy_method,
+            "batchNumber": batch_number,
+            "batchPauseOption": strategy.pause_policy
+        },
+        "Mode": strategy.failure_policy
+    }
+
+
+def _create_revision_deploy_parameters(strategy: Optional[DeploymentStrategy] = None, instance_count: int = 0):
     """
     Create revised deployment parameters
     """
     return {
-        "StartExecutionParameters": {
-            "Parameters": {
-                "applicationName": "",
-                "applicationGroupName": "",
-                "deployRevisionId": "",
-                "deployMethod": "all",
-                "batchNumber": 2,
-                "batchPauseOption": "Automatic"
-            },
-            "Mode": "FailurePause"
-        }
+        "StartExecutionParameters": _create_start_execution_parameters("", "", "", strategy, instance_count)
     }
 
 
-def _extract_top_level_dir(members: List[str]) -> Optional[str]:
+def _append_health_check(application_start: Optional[str], port: Optional[int],
+                         strategy: DeploymentStrategy) -> Optional[str]:
     """
-    从压缩包成员列表中提取顶级目录名
-    
-    如果所有文件都在同一个顶级目录下，返回该目录名；否则返回 None
+    在启动命令后追加 HTTP 健康检查，检查失败时 hook 以非 0 退出，使当前批次失败
+    """
+    if not application_start or not strategy.health_check_path or not port:
+        return application_start
+    path = strategy.health_check_path if strategy.health_check_path.startswith('/') else f'/{strategy.health_check_path}'
+    url = f'http://127.0.0.1:{port}{path}'
+    probe = (f"(command -v curl >/dev/null 2>&1 && curl -fsS -o /dev/null {url} "
+             f"|| wget -q -O /dev/null {url})")
+    attempts = max(1, math.ceil(strategy.health_check_timeout / 2))
+    health_check = (f"for i in $(seq 1 {attempts}); do {probe} && exit 0; sleep 2; done; "
+                    f"echo 'health check failed: {url}' >&2; exit 1")
+    return f"{application_start.rstrip()}\n{health_check}"
+
+
+def _iter_archive_files(file_path: str, archive_type: str):
+    """
+    按压缩包顺序流式遍历文件和链接成员，产出 (TarInfo, 文件对象)，链接成员的文件对象为 None；
+    zip 成员转换为等价的 TarInfo
+    """
+    if archive_type == 'zip':
+        with zipfile.ZipFile(file_path, 'r') as zip_ref:
+            for info in zip_ref.infolist():
+                if info.is_dir():
+                    continue
+                tar_info = tarfile.TarInfo(info.filename)
+                tar_info.size = info.file_size
+                tar_info.mtime = int(time.mktime(info.date_time + (0, 0, -1)))
+                if info.create_system == 3 and info.external_attr >> 16:
+                    tar_info.mode = (info.external_attr >> 16) & 0o7777
+                with zip_ref.open(info) as member_file:
+                    yield tar_info, member_file
+        return
+    mode = 'r|gz' if archive_type == 'tar.gz' else 'r|*'
+    with tarfile.open(file_path, mode) as tar:
+        for member in tar:
+            if member.isfile():
+                yield member, tar.extractfile(member)
+            elif member.issym() or member.islnk():
+                yield member, None
+
+
+def _build_artifact_manifest(file_path: str) -> Optional[Dict]:
+    """
+    生成部署产物的逐文件内容哈希清单，按产物 CRC64 保存到 .code_deploy/manifests，已存在时直接读取
+
+    Returns:
+        {'hash_crc64', 'file_name', 'archive_type', 'files': {成员名: 'sha256:...' | 'link:目标'}}，非压缩包返回 None
     """
-    if not members:
+    archive_type = _detect_archive_type(Path(file_path).name)
+    if not archive_type:
         return None
-    
-    top_level = set()
-    for member in members:
-        parts = member.split('/')
-        if parts[0]:
-            top_level.add(parts[0])
-    
-    if len(top_level) == 1:
-        return list(top_level)[0]
+    artifact_hash = oss_tools.compute_file_crc64(file_path)
+    manifest_path = get_manifest_path(artifact_hash)
+    if manifest_path.exists():
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"[_build_artifact_manifest] Failed to load {manifest_path}, rebuilding: {e}")
+
+    files = {}
+    for member, member_file in _iter_archive_files(file_path, archive_type):
+        if member_file is None:
+            files[member.name] = f'link:{member.linkname}'
+            continue
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: member_file.read(1024 * 1024), b''):
+            digest.update(chunk)
+        files[member.name] = f'sha256:{digest.hexdigest()}'
+    manifest = {
+        'hash_crc64': artifact_hash,
+        'file_name': Path(file_path).name,
+        'archive_type': archive_type,
+        'files': files,
+    }
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    return manifest
+
+
+def _load_delta_base_manifest(base: Dict) -> Optional[Dict]:
+    """
+    读取上次部署产物的清单；清单不存在但 release 目录中仍保留该产物时重新生成
+    """
+    manifest_path = get_manifest_path(base['hash_crc64'])
+    if manifest_path.exists():
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    base_file = get_release_path(base['file_name'])
+    if base_file.exists() and oss_tools.compute_file_crc64(str(base_file)) == base['hash_crc64']:
+        return _build_artifact_manifest(str(base_file))
     return None
 
 
-def _analyze_deployment_file(file_path: str) -> Dict:
+def _diff_delta_manifests(manifest: Dict, base_manifest: Dict) -> Dict:
+    """
+    对比两个清单，返回新增或变化的成员（按名称排序）与已删除的成员
+    """
+    base_files = base_manifest['files']
+    changed = sorted(name for name, digest in manifest['files'].items() if base_files.get(name) != digest)
+    deleted = sorted(name for name in base_files if name not in manifest['files'])
+    return {
+        'changed': changed,
+        'deleted': deleted,
+        'changed_files': len(changed),
+        'deleted_files': len(deleted),
+        'unchanged_files': len(manifest['files']) - len(changed),
+    }
+
+
+def _build_delta_patch(file_path: str, archive_type: str, diff: Dict) -> Dict:
+    """
+    生成只包含新增和变化文件的补丁包（tar.gz，zip 产物的成员同样转换为 tar 成员），
+    删除的文件列表写入补丁根目录的 DELTA_DELETED_LIST
+    """
+    changed = set(diff['changed'])
+    patch_path = get_delta_path(f"{_artifact_stem(Path(file_path).name)}.delta.tar.gz")
+    with tarfile.open(patch_path, 'w:gz') as patch:
+        for member, member_file in _iter_archive_files(file_path, archive_type):
+            if member.name in changed:
+                patch.addfile(member, member_file)
+        deleted_data = ''.join(f'{name}\n' for name in diff['deleted']).encode('utf-8')
+        deleted_info = tarfile.TarInfo(DELTA_DELETED_LIST)
+        deleted_info.size = len(deleted_data)
+        deleted_info.mtime = int(time.time())
+        patch.addfile(deleted_info, io.BytesIO(deleted_data))
+    return {
+        'patch_path': str(patch_path),
+        'patch_size': patch_path.stat().st_size,
+        'full_size': Path(file_path).stat().st_size,
+    }
+
+
+def _read_instance_revision_markers(deploy_region_id: str, instance_ids: List[str],
+                                    marker_path: str) -> Dict[str, Optional[str]]:
+    """
+    通过云助手读取各实例上的版本标记，未写入标记、执行失败或超时的实例返回 None
+    """
+    ecs_client = create_ecs_client(deploy_region_id)
+    markers = {instance_id: None for instance_id in instance_ids}
+    invoke_ids = []
+    for i in range(0, len(instance_ids), CLOUD_ASSISTANT_BATCH_SIZE):
+        response = ecs_client.run_command(ecs_20140526_models.RunCommandRequest(
+            region_id=deploy_region_id,
+            type='RunShellScript',
+            name='code-deploy-revision-check',
+            command_content=f'cat {shlex.quote(marker_path)} 2>/dev/null || true',
+            instance_id=instance_ids[i:i + CLOUD_ASSISTANT_BATCH_SIZE],
+            timeout=DELTA_MARKER_CHECK_TIMEOUT
+        ))
+        invoke_ids.append(response.body.invoke_id)
+
+    deadline = time.monotonic() + DELTA_MARKER_CHECK_TIMEOUT
+    while invoke_ids:
+        running = []
+        for invoke_id in invoke_ids:
+            next_token = None
+            invoke_running = False
+            while True:
+                response = ecs_client.describe_invocation_results(ecs_20140526_models.DescribeInvocationResultsRequest(
+                    region_id=deploy_region_id,
+                    invoke_id=invoke_id,
+                    content_encoding='PlainText',
+                    max_results=CLOUD_ASSISTANT_BATCH_SIZE,
+                    next_token=next_token
+                ))
+                invocation = response.body.invocation
+                for result in invocation.invocation_results.invocation_result or []:
+                    if result.invocation_status in CLOUD_ASSISTANT_RUNNING_STATUSES:
+                        invoke_running = True
+                    elif result.invocation_status == 'Success':
+                        markers[result.instance_id] = (result.output or '').strip() or None
+                next_token = invocation.next_token
+                if not next_token:
+                    break
+            if invoke_running:
+                running.append(invoke_id)
+        invoke_ids = running
+        if invoke_ids and time.monotonic() >= deadline:
+            logger.warning(f"[_read_instance_revision_markers] Timed out waiting for invocations {invoke_ids}")
+            break
+        if invoke_ids:
+            time.sleep(DELTA_MARKER_CHECK_INTERVAL)
+    return markers
+
+
+def _prepare_delta_deploy(client, name: str, application_group_name: str, file_path: str, object_name: str,
+                          deploy_region_id: str, instance_ids: List[str],
+                          working_dir: str = DEFAULT_WORKING_DIR) -> Dict:
+    """
+    规划增量部署：以应用分组上次部署成功的产物为基线生成补丁包。只有所有实例上的版本标记都是基线时才启用，
+    无法增量时返回 enabled=False 及原因，由调用方部署完整产物。逐文件清单在实例校验通过后才生成
+
+    Returns:
+        {'enabled', 'reason', 'base_hash', 'target_hash', 'patch_path', 'patch_object_name',
+         'changed_files', 'deleted_files', 'unchanged_files', 'patch_size', 'full_size'}
+    """
+    plan = {'enabled': False, 'reason': None}
+    try:
+        file_name = Path(file_path).name
+        archive_type = _detect_archive_type(file_name)
+        if not archive_type:
+            return dict(plan, reason='not_an_archive')
+        plan['target_hash'] = oss_tools.compute_file_crc64(file_path)
+        _settle_delta_base(client, name, application_group_name)
+        base = load_application_info().get('delta_bases', {}).get(f'{name}/{application_group_name}')
+        if not base:
+            return dict(plan, reason='no_previous_deployment')
+        plan['base_hash'] = base['hash_crc64']
+        if base['hash_crc64'] == plan['target_hash']:
+            return dict(plan, reason='unchanged')
+
+        marker_path = f"{working_dir.rstrip('/')}/{_revision_marker_name(file_name)}"
+        markers = _read_instance_revision_markers(deploy_region_id, instance_ids, marker_path)
+        instances_not_on_base = sorted(instance_id for instance_id, marker in markers.items()
+                                       if marker != base['hash_crc64'])
+        if instances_not_on_base:
+            return dict(plan, reason='instances_not_on_base', instances_not_on_base=instances_not_on_base)
+
+        base_manifest = _load_delta_base_manifest(base)
+        if base_manifest is None:
+            return dict(plan, reason='base_manifest_missing')
+        diff = _diff_delta_manifests(_build_artifact_manifest(file_path), base_manifest)
+        if any('\n' in member for member in diff['deleted']):
+            return dict(plan, reason='unsupported_member_name')
+        plan.update({key: diff[key] for key in ('changed_files', 'deleted_files', 'unchanged_files')})
+        plan.update(_build_delta_patch(file_path, archive_type, diff))
+        if plan['patch_size'] > plan['full_size'] * DELTA_MAX_PATCH_RATIO:
+            return dict(plan, reason='patch_too_large')
+        object_dir = object_name.rsplit('/', 1)[0] + '/' if '/' in object_name else ''
+        plan['patch_object_name'] = f"{object_dir}{Path(plan['patch_path']).name}"
+        plan['enabled'] = True
+        return plan
+    except Exception as e:
+        logger.warning(f"[_prepare_delta_deploy] Failed to prepare delta deploy: {e}")
+        return dict(plan, reason=f'error: {e}')
+
+
+def _record_delta_pending(name: str, application_group_name: str, file_path: str,
+                          previous_execution_id: Optional[str]):
+    """
+    记录本次部署的产物为待确认的增量基线，部署成功后由 _settle_delta_base 转为基线
+    """
+    try:
+        delta_pending = load_application_info().get('delta_pending', {})
+        delta_pending[f'{name}/{application_group_name}'] = {
+            'hash_crc64': oss_tools.compute_file_crc64(file_path),
+            'file_name': Path(file_path).name,
+            'previous_execution_id': previous_execution_id,
+        }
+        save_application_info({'delta_pending': delta_pending})
+    except Exception as e:
+        logger.warning(f"[_record_delta_pending] Failed to record pending delta base: {e}")
+
+
+def _settle_delta_base(client, name: str, application_group_name: str, deployment: Optional[Dict] = None):
+    """
+    待确认的部署结束后更新增量基线：部署成功则替换基线，失败则丢弃，仍在部署中时保持不变。
+    deployment 为 _list_application_group_deployment 的结果，未提供时重新查询
+    """
+    key = f'{name}/{application_group_name}'
+    try:
+        info = load_application_info()
+        pending = info.get('delta_pending', {}).get(key)
+        if not pending:
+            return
+        if deployment is None:
+            deployment = _list_application_group_deployment(client, name, application_group_name, END_STATUSES)
+        execution_id = deployment.get('execution_id')
+        if not execution_id or execution_id == pending['previous_execution_id'] \
+                or deployment.get('status') not in END_STATUSES:
+            return
+        delta_pending = info['delta_pending']
+        del delta_pending[key]
+        update = {'delta_pending': delta_pending}
+        if deployment['status'] in SUCCESS_STATUSES:
+            delta_bases = info.get('delta_bases', {})
+            delta_bases[key] = {'hash_crc64': pending['hash_crc64'], 'file_name': pending['file_name']}
+            update['delta_bases'] = delta_bases
+        save_application_info(update)
+        logger.info(f"[_settle_delta_base] Deployment {execution_id} of {key} ended with {deployment['status']}")
+    except Exception as e:
+        logger.warning(f"[_settle_delta_base] Failed to settle delta base of {key}: {e}")
+
+
+def _revision_marker_name(file_name: str) -> str:
+    """实例上记录当前解压版本（产物 CRC64）的标记文件，位于解压所在的工作目录"""
+    return f".{_artifact_stem(file_name)}.code_deploy_revision"
+
+
+def _revision_marker_command(file_name: str, artifact_hash: str) -> str:
+    return f"echo {artifact_hash} > {_revision_marker_name(file_name)}"
+
+
+def _create_delta_extract_command(plan: Dict, file_path: str) -> str:
+    """
+    生成增量部署的补丁应用命令：校验实例上的版本标记仍是基线后解压补丁并删除已移除的文件，成功后记录当前版本。
+    部署前已确认所有实例都是基线版本，标记不一致（部署期间被其他部署修改）时失败而不是在错误的版本上打补丁
+    """
+    file_name = Path(file_path).name
+    patch_name = Path(plan['patch_path']).name
+    marker = _revision_marker_name(file_name)
+    return (f"[ -f {patch_name} ] || exit 1; "
+            f"if [ \"$(cat {marker} 2>/dev/null)\" != \"{plan['base_hash']}\" ]; then "
+            f"echo 'delta deploy: {marker} is not at revision {plan['base_hash']}, redeploy without delta' >&2; "
+            f"exit 1; fi; "
+            f"tar -xzf {patch_name} && xargs -r -d '\\n' rm -f -- < {DELTA_DELETED_LIST} && rm -f {DELTA_DELETED_LIST} "
+            f"&& {_revision_marker_command(file_name, plan['target_hash'])} || exit 1")
+
+
+class _ArchiveMemberCollector:
+    """
+    流式收集压缩包成员：跳过依赖目录、限制保留的成员数量，并在满足语言规则所需信号后提前结束
+    """
+
+    def __init__(self, deploy_language: Optional[str], max_members: int):
+        self.members: List[str] = []
+        self.top_level: Set[str] = set()
+        # 以目录形式出现过的顶级名称（目录成员或 name/... 路径），文件不能作为解压目录
+        self.top_level_dirs: Set[str] = set()
+        # 是否读到了压缩包末尾，只有完整扫描才能确定唯一顶级目录
+        self.complete = False
+        self._collecting = True
+        self.executables: Dict[str, Dict[str, Any]] = {}
+        self.scanned = 0
+        self.skipped = 0
+        self.truncated = False
+        self.stopped_early = False
+        self._max_members = max_members
+        self._early_stop_rule = ARCHIVE_EARLY_STOP_RULES.get(deploy_language)
+        self._sniff = deploy_language in ARCHIVE_SNIFF_LANGUAGES
+        self.lockfiles: Dict[str, str] = {}
+        self._lockfile_names = set(DEPENDENCY_LOCKFILES.get(deploy_language, ()))
+
+    def add(self, name: str, is_dir: bool = False) -> bool:
+        """
+        记录一个成员，返回 False 表示可以停止扫描；目录成员只参与顶级目录判断
+        """
+        self.scanned += 1
+        parts = name.split('/')
+        if parts[0] and len(self.top_level) < 2:
+            self.top_level.add(parts[0])
+        if parts[0] in self.top_level and (is_dir or len(parts) > 1):
+            self.top_level_dirs.add(parts[0])
+        if not self._collecting:
+            # 成员已收集完毕，只读取成员名确认是否存在唯一顶级目录，出现第二个顶级名称即可停止
+            return len(self.top_level) < 2
+        if is_dir:
+            return True
+        if any(part in ARCHIVE_IGNORED_DIRS for part in parts):
+            self.skipped += 1
+            return True
+        if len(self.members) >= self._max_members:
+            self.truncated = True
+            self._collecting = False
+            return len(self.top_level) < 2
+        self.members.append(name)
+        if self._early_stop_rule and self._early_stop_rule(parts[-1].lower()):
+            self.stopped_early = True
+            self._collecting = False
+            return len(self.top_level) < 2
+        return True
+
+    @property
+    def extracted_dir_name(self) -> Optional[str]:
+        if not self.complete or len(self.top_level) != 1:
+            return None
+        name = next(iter(self.top_level))
+        return name if name in self.top_level_dirs else None
+
+    def should_sniff(self, name: str, mode: Optional[int]) -> bool:
+        """
+        刚记录的成员是否需要读取文件头：无扩展名或带可执行权限位的文件，总数有上限
+        """
+        if not self._sniff or len(self.executables) >= ARCHIVE_MAX_SNIFFED_MEMBERS:
+            return False
+        if not self.members or self.members[-1] != name:
+            return False
+        basename = name.rsplit('/', 1)[-1]
+        has_extension = '.' in basename.lstrip('.')
+        return not has_extension or bool(mode and mode & 0o111)
+
+    def should_hash_lockfile(self, name: str) -> bool:
+        """
+        刚记录的成员是否为根目录（或唯一顶级目录）下的依赖锁文件
+        """
+        if not self._lockfile_names or not self.members or self.members[-1] != name:
+            return False
+        parts = [part for part in name.split('/') if part and part != '.']
+        return len(parts) <= 2 and parts[-1].lower() in self._lockfile_names
+
+    def record_lockfile(self, name: str, member_file):
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: member_file.read(1024 * 1024), b''):
+            digest.update(chunk)
+        self.lockfiles[name] = digest.hexdigest()
+
+    def record_executable(self, name: str, mode: Optional[int], head: bytes):
+        kind = None
+        interpreter = None
+        if head.startswith(ELF_MAGIC):
+            kind = 'elf'
+        elif head.startswith(b'#!'):
+            kind = 'script'
+            interpreter = head[2:].split(b'\n', 1)[0].strip().decode('utf-8', 'replace')
+        self.executables[name] = {'mode': mode, 'kind': kind, 'interpreter': interpreter}
+
+
+def _scan_archive_members(file_path: str, archive_type: str, collector: _ArchiveMemberCollector):
+    if archive_type == 'zip':
+        with zipfile.ZipFile(file_path, 'r') as zip_ref:
+            for info in zip_ref.infolist():
+                keep_going = collector.add(info.filename, info.is_dir())
+                # create_system 3 表示 Unix，权限位保存在 external_attr 的高 16 位
+                mode = (info.external_attr >> 16) & 0o777 if info.create_system == 3 else None
+                if collector.should_sniff(info.filename, mode):
+                    with zip_ref.open(info) as member_file:
+                        collector.record_executable(info.filename, mode, member_file.read(ARCHIVE_SNIFF_BYTES))
+                elif collector.should_hash_lockfile(info.filename):
+                    with zip_ref.open(info) as member_file:
+                        collector.record_lockfile(info.filename, member_file)
+                if not keep_going:
+                    break
+            else:
+                collector.complete = True
+        return
+    # 流式读取，不构建完整的成员列表；能确定不存在唯一顶级目录且已找到所需信号时不再解压剩余内容
+    mode = 'r|gz' if archive_type == 'tar.gz' else 'r|*'
+    with tarfile.open(file_path, mode) as tar:
+        for member in tar:
+            keep_going = collector.add(member.name, member.isdir())
+            if member.isfile() and collector.should_sniff(member.name, member.mode):
+                # 流式模式下只能读取当前成员，读取文件头后剩余内容由 tarfile 跳过
+                member_file = tar.extractfile(member)
+                collector.record_executable(member.name, member.mode, member_file.read(ARCHIVE_SNIFF_BYTES))
+            elif member.isfile() and collector.should_hash_lockfile(member.name):
+                collector.record_lockfile(member.name, tar.extractfile(member))
+            if not keep_going:
+                break
+        else:
+            collector.complete = True
+
+
+def _detect_archive_type(file_name: str) -> Optional[str]:
+    file_name_lower = file_name.lower()
+    if file_name_lower.endswith('.tar.gz') or file_name_lower.endswith('.tgz'):
+        return 'tar.gz'
+    if file_name_lower.endswith('.tar'):
+        return 'tar'
+    if file_name_lower.endswith('.zip'):
+        return 'zip'
+    return None
+
+
+def _analyze_deployment_file(file_path: str, deploy_language: Optional[str] = None) -> Dict:
     """
     分析部署文件，返回文件类型和内容列表
+
+    压缩包成员按流式方式读取，node_modules 等依赖目录中的成员只计数不保留，
+    保留的成员数受 settings.code_deploy_archive_max_members 限制；
+    Java/Docker 等只需要首个匹配成员的语言在找到后立即停止扫描。
+    Go 等需要原生二进制的语言会读取候选成员的前 ARCHIVE_SNIFF_BYTES 字节，识别 ELF 与 shebang 脚本；
+    Node.js/Python 会计算依赖锁文件的内容哈希，用于复用实例上的依赖层。
+    结果按文件 CRC64 和部署语言缓存。
     
     Returns:
         {
@@ -882,6 +2207,13 @@ def _analyze_deployment_file(file_path: str) -> Dict:
             'file_name': str,
             'files_in_archive': List[str],  # 压缩包内的文件列表
             'extracted_dir_name': Optional[str],  # 解压后的目录名（如果有）
+            'members_scanned': int,  # 扫描过的成员数（压缩包）
+            'members_skipped': int,  # 依赖目录中被跳过的成员数（压缩包）
+            'truncated': bool,  # 成员数超过上限，列表不完整
+            'stopped_early': bool,  # 已找到所需信号，提前结束扫描
+            'executables': Dict[str, Dict],  # 读取过文件头的候选成员：{'mode', 'kind': 'elf' | 'script' | None, 'interpreter'}
+            'lockfiles': Dict[str, str],  # 根目录下依赖锁文件的 SHA-256（Node.js/Python）
+            'hash_crc64': str,  # 产物 CRC64（压缩包），解压后写入实例上的版本标记
         }
     """
     file_path_obj = Path(file_path)
@@ -898,122 +2230,235 @@ def _analyze_deployment_file(file_path: str) -> Dict:
         'extracted_dir_name': None,
     }
     
-    file_name_lower = file_path_obj.name.lower()
-    
-    # 处理 tar.gz 和 tar 文件
-    if file_name_lower.endswith('.tar.gz') or file_name_lower.endswith('.tgz'):
-        result['file_type'] = 'archive'
-        result['archive_type'] = 'tar.gz'
-        try:
-            with tarfile.open(file_path, 'r:gz') as tar:
-                members = tar.getnames()
-                result['files_in_archive'] = members
-                result['extracted_dir_name'] = _extract_top_level_dir(members)
-                logger.info(f"[_analyze_deployment_file] Analyzed tar.gz archive: {len(members)} files, "
-                           f"extracted_dir: {result['extracted_dir_name']}")
-        except Exception as e:
-            logger.warning(f"[_analyze_deployment_file] Failed to read tar.gz: {e}")
-    
-    elif file_name_lower.endswith('.tar'):
-        result['file_type'] = 'archive'
-        result['archive_type'] = 'tar'
-        try:
-            with tarfile.open(file_path, 'r') as tar:
-                members = tar.getnames()
-                result['files_in_archive'] = members
-                result['extracted_dir_name'] = _extract_top_level_dir(members)
-                logger.info(f"[_analyze_deployment_file] Analyzed tar archive: {len(members)} files, "
-                           f"extracted_dir: {result['extracted_dir_name']}")
-        except Exception as e:
-            logger.warning(f"[_analyze_deployment_file] Failed to read tar: {e}")
-    
-    elif file_name_lower.endswith('.zip'):
-        result['file_type'] = 'archive'
-        result['archive_type'] = 'zip'
-        try:
-            with zipfile.ZipFile(file_path, 'r') as zip_ref:
-                members = zip_ref.namelist()
-                result['files_in_archive'] = members
-                result['extracted_dir_name'] = _extract_top_level_dir(members)
-                logger.info(f"[_analyze_deployment_file] Analyzed zip archive: {len(members)} files, "
-                           f"extracted_dir: {result['extracted_dir_name']}")
-        except Exception as e:
-            logger.warning(f"[_analyze_deployment_file] Failed to read zip: {e}")
-    
-    return result
+    archive_type = _detect_archive_type(file_path_obj.name)
+    if not archive_type:
+        return result
+    result['file_type'] = 'archive'
+    result['archive_type'] = archive_type
+
+    result['hash_crc64'] = oss_tools.compute_file_crc64(file_path)
+    cache_key = (result['hash_crc64'], deploy_language)
+    with _archive_analysis_lock:
+        cached = _archive_analysis_cache.get(cache_key)
+        if cached is not None:
+            _archive_analysis_cache.move_to_end(cache_key)
+    if cached is not None:
+        logger.info(f"[_analyze_deployment_file] Using cached analysis for {file_path_obj.name}")
+        return dict(cached, file_name=file_path_obj.name)
+
+    collector = _ArchiveMemberCollector(deploy_language, settings.code_deploy_archive_max_members)
+    try:
+        _scan_archive_members(file_path, archive_type, collector)
+    except Exception as e:
+        logger.warning(f"[_analyze_deployment_file] Failed to read {archive_type}: {e}")
+        return result
+
+    result.update({
+        'files_in_archive': collector.members,
+        'extracted_dir_name': collector.extracted_dir_name,
+        'members_scanned': collector.scanned,
+        'members_skipped': collector.skipped,
+        'truncated': collector.truncated,
+        'stopped_early': collector.stopped_early,
+        'executables': collector.executables,
+        'lockfiles': collector.lockfiles,
+    })
+    logger.info(f"[_analyze_deployment_file] Analyzed {archive_type} archive: {collector.scanned} members scanned, "
+                f"{len(collector.members)} kept, {collector.skipped} skipped, truncated: {collector.truncated}, "
+                f"stopped early: {collector.stopped_early}, extracted_dir: {result['extracted_dir_name']}")
 
+    with _archive_analysis_lock:
+        _archive_analysis_cache[cache_key] = result
+        while len(_archive_analysis_cache) > ARCHIVE_ANALYSIS_CACHE_SIZE:
+            _archive_analysis_cache.popitem(last=False)
+    return dict(result)
 
-def _find_executable_files(files_list: List[str], deploy_language: str) -> Dict[str, List[str]]:
+
+class _ArchiveIndex:
     """
-    在文件列表中查找可执行文件
-    
+    压缩包成员的一次性索引：basename -> 路径、扩展名分桶、可执行文件候选，路径相对于解压后的工作目录，
+    同一桶内按目录深度（浅的优先）和压缩包内顺序排列。
+    提供了文件头识别结果（executables）的成员按 ELF 魔数和可执行权限位判断是否为二进制，其余按文件名推测
+    """
+
+    def __init__(self, members: List[str], root: Optional[str] = None,
+                 executables: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.by_basename: Dict[str, List[str]] = {}
+        self.by_extension: Dict[str, List[str]] = {}
+        self.binaries: List[str] = []
+        self.scripts: List[str] = []
+        executables = executables or {}
+        entries = []
+        binary_candidates = []
+        root_prefix = f'{root}/' if root else None
+        for order, member in enumerate(members):
+            path = member
+            while path.startswith('./'):
+                path = path[2:]
+            if root_prefix and path.startswith(root_prefix):
+                path = path[len(root_prefix):]
+            path = path.strip('/')
+            # 只去掉 root/ 目录前缀；与 root 同名的成员是文件（目录成员不在列表中），必须保留
+            if not path:
+                continue
+            entries.append((path.count('/'), order, path, executables.get(member)))
+        entries.sort(key=lambda entry: entry[:2])
+
+        for _, _, path, sniffed in entries:
+            basename = path.rsplit('/', 1)[-1].lower()
+            self.by_basename.setdefault(basename, []).append(path)
+            stem, dot, extension = basename.rpartition('.')
+            has_extension = bool(dot and stem)
+            if has_extension:
+                self.by_extension.setdefault(f'.{extension}', []).append(path)
+            tier = self._binary_tier(basename, has_extension, sniffed)
+            if tier is not None:
+                binary_candidates.append((tier, path))
+            if sniffed and sniffed['kind'] == 'script':
+                self.scripts.append(path)
+        # 稳定排序：ELF 优先，其次带可执行权限位的文件，最后是仅按文件名推测的候选
+        self.binaries = [path for _, path in sorted(binary_candidates, key=lambda candidate: candidate[0])]
+
+    @staticmethod
+    def _binary_tier(basename: str, has_extension: bool, sniffed: Optional[Dict[str, Any]]) -> Optional[int]:
+        if sniffed is not None:
+            if sniffed['kind'] == 'elf':
+                return 0
+            if sniffed['kind'] is None and sniffed['mode'] and sniffed['mode'] & 0o111:
+                return 1
+            # 读取过文件头但既不是 ELF 也没有可执行权限（或是脚本），不是二进制
+            return None
+        if not has_extension and not basename.startswith('.') and basename not in NON_BINARY_NAMES:
+            return 2
+        return None
+
+    def has(self, basename: str) -> bool:
+        return basename in self.by_basename
+
+    def first_by_names(self, names: List[str], binary: bool = False) -> Optional[str]:
+        binaries = set(self.binaries) if binary else None
+        for name in names:
+            for path in self.by_basename.get(name, []):
+                if binaries is None or path in binaries:
+                    return path
+        return None
+
+    def first_by_prefixes(self, prefixes: List[str], binary: bool = False) -> Optional[str]:
+        candidates = self.binaries if binary else [path for paths in self.by_basename.values() for path in paths]
+        for prefix in prefixes:
+            for path in candidates:
+                if path.rsplit('/', 1)[-1].lower().startswith(prefix):
+                    return path
+        return None
+
+    def first_by_extension(self, extension: str, name_contains: Optional[str] = None) -> Optional[str]:
+        for path in self.by_extension.get(extension, []):
+            if not name_contains or name_contains in path.lower():
+                return path
+        return None
+
+
+def _match_start_rule(index: _ArchiveIndex, rule: Dict[str, Any], context: Dict[str, Any]) -> Optional[str]:
+    """
+    在索引上求值一条启动规则，匹配时返回规则使用的路径（不需要路径的规则返回空字符串），否则返回 None
+    """
+    if 'requires' in rule and not index.has(rule['requires']):
+        return None
+    binary = rule.get('binary', False)
+    if 'names' in rule:
+        return index.first_by_names(rule['names'], binary)
+    if 'prefixes' in rule:
+        return index.first_by_prefixes(rule['prefixes'], binary)
+    if 'extension' in rule:
+        return index.first_by_extension(rule['extension'], rule.get('name_contains'))
+    if binary:
+        return index.binaries[0] if index.binaries else None
+    if 'default' in rule:
+        return rule['default'].format(**context)
+    return ''
+
+
+def _artifact_stem(file_name: str) -> str:
+    lower = file_name.lower()
+    for suffix in ('.tar.gz', '.tgz', '.tar', '.zip'):
+        if lower.endswith(suffix):
+            return file_name[:-len(suffix)]
+    return file_name.rsplit('.', 1)[0] if '.' in file_name else file_name
+
+
+def _get_dependency_fingerprint(deploy_language: str, file_analysis: Dict,
+                                extracted_dir_name: Optional[str] = None) -> Optional[Dict[str, str]]:
+    """
+    按 DEPENDENCY_LOCKFILES 的优先级选择工作目录根下的锁文件，返回依赖层指纹
+
     Returns:
-        {
-            'jar_files': List[str],
-            'py_files': List[str],
-            'js_files': List[str],
-            'go_binaries': List[str],
-            'shell_scripts': List[str],
-            'package_json': Optional[str],
-            'requirements_txt': Optional[str],
-            'dockerfile': Optional[str],
-        }
+        {'lockfile': 锁文件名, 'hash': 锁文件 SHA-256, 'key': 实例上的依赖层目录名}，没有锁文件时返回 None
     """
-    result = {
-        'jar_files': [],
-        'py_files': [],
-        'js_files': [],
-        'go_binaries': [],
-        'shell_scripts': [],
-        'package_json': None,
-        'requirements_txt': None,
-        'dockerfile': None,
+    lockfiles = file_analysis.get('lockfiles') or {}
+    if not lockfiles:
+        return None
+    root_hashes = {}
+    for member, digest in lockfiles.items():
+        parts = [part for part in member.split('/') if part and part != '.']
+        if extracted_dir_name and parts and parts[0] == extracted_dir_name:
+            parts = parts[1:]
+        if len(parts) == 1:
+            root_hashes[parts[0].lower()] = (parts[0], digest)
+    for lockfile in DEPENDENCY_LOCKFILES.get(deploy_language, []):
+        if lockfile in root_hashes:
+            name, digest = root_hashes[lockfile]
+            return {'lockfile': name, 'hash': digest, 'key': f'{deploy_language}-{digest[:16]}'}
+    return None
+
+
+def _get_dependency_layer(file_path: str, deploy_language: str) -> Optional[Dict[str, str]]:
+    """
+    返回部署产物的依赖层指纹（复用已缓存的产物分析结果）
+    """
+    if deploy_language not in DEPENDENCY_LOCKFILES:
+        return None
+    try:
+        file_analysis = _analyze_deployment_file(file_path, deploy_language)
+        return _get_dependency_fingerprint(deploy_language, file_analysis, file_analysis.get('extracted_dir_name'))
+    except Exception as e:
+        logger.warning(f"[_get_dependency_layer] Failed to fingerprint dependencies: {e}")
+        return None
+
+
+def _dependency_layer_context(deploy_language: str, fingerprint: Optional[Dict[str, str]],
+                              application_name: Optional[str] = None) -> Dict[str, str]:
+    """
+    生成启动命令中的依赖安装片段：锁文件哈希一致时复用实例上已解压的依赖层，否则安装并保存为新的依赖层。
+    依赖层按应用隔离存放，每个应用只保留最近 DEPENDENCY_LAYER_RETENTION 个依赖层
+    """
+    context = {
+        'install_dependencies': 'npm install' if deploy_language == 'nodejs' else '',
+        'python': 'python',
     }
-    
-    for file_path in files_list:
-        file_name = file_path.split('/')[-1].lower()
-        
-        # Java
-        if file_name.endswith('.jar'):
-            result['jar_files'].append(file_path)
-        # Python
-        elif file_name.endswith('.py'):
-            result['py_files'].append(file_path)
-        # Node.js
-        elif file_name == 'package.json':
-            result['package_json'] = file_path
-        elif file_name.endswith('.js'):
-            result['js_files'].append(file_path)
-        # Go - 只在 golang 语言时查找潜在的二进制文件
-        # 排除常见的非二进制文件（文档、配置等）
-        elif deploy_language == 'golang':
-            # 排除列表：常见的非二进制文件名
-            non_binary_names = {
-                'readme', 'license', 'makefile', 'dockerfile', 'changelog',
-                'contributing', 'authors', 'version', 'manifest', 'config',
-                'gitignore', 'dockerignore', 'editorconfig', 'env'
-            }
-            file_name_no_ext = file_name.split('.')[0] if '.' in file_name else file_name
-            # 检查是否是潜在的 Go 二进制：没有扩展名（或只有一个点），且不在排除列表中
-            has_extension = '.' in file_name and not file_name.startswith('.')
-            if not has_extension and file_name_no_ext.lower() not in non_binary_names:
-                result['go_binaries'].append(file_path)
-        # Shell scripts
-        elif file_name.endswith('.sh'):
-            result['shell_scripts'].append(file_path)
-        # Python requirements
-        elif file_name == 'requirements.txt':
-            result['requirements_txt'] = file_path
-        # Dockerfile
-        elif file_name == 'dockerfile' and not file_path.lower().endswith('.dockerignore'):
-            result['dockerfile'] = file_path
-    
-    logger.info(f"[_find_executable_files] Found executable files for {deploy_language}: "
-                f"jars={len(result['jar_files'])}, python={len(result['py_files'])}, "
-                f"js={len(result['js_files'])}, go_bins={len(result['go_binaries'])}, "
-                f"shells={len(result['shell_scripts'])}")
-    
-    return result
+    if not fingerprint:
+        return context
+    app_layer_dir = f"{DEPENDENCY_LAYER_DIR}/{re.sub(r'[^A-Za-z0-9._-]', '-', application_name or 'app')}"
+    layer_dir = f'{app_layer_dir}/{fingerprint["key"]}'
+    prune = (f"(ls -dt {app_layer_dir}/{deploy_language}-* 2>/dev/null "
+             f"| tail -n +{DEPENDENCY_LAYER_RETENTION + 1} | xargs -r rm -rf)")
+    if deploy_language == 'nodejs':
+        context['install_dependencies'] = (
+            f'DEPS={layer_dir} && if [ -f "$DEPS/.ready" ]; then '
+            f'rm -rf node_modules && ln -s "$DEPS/node_modules" node_modules; '
+            f'else npm install && {{ mkdir -p "$DEPS" && rm -rf "$DEPS/node_modules" && '
+            f'mv node_modules "$DEPS/" && ln -s "$DEPS/node_modules" node_modules && '
+            f'touch "$DEPS/.ready" && {prune} || true; }}; fi'
+        )
+    elif deploy_language == 'python':
+        install = PYTHON_LAYER_INSTALL_COMMANDS[fingerprint['lockfile'].lower()]
+        # 依赖层构建失败时回退到系统 python，保持原有行为
+        context['install_dependencies'] = (
+            f'PY=python && DEPS={layer_dir} && if [ -f "$DEPS/.ready" ] || '
+            f'(rm -rf "$DEPS" && python3 -m venv "$DEPS" && {install} && touch "$DEPS/.ready" && {prune}); '
+            f'then PY="$DEPS/bin/python"; fi && '
+        )
+        context['python'] = '$PY'
+    return context
 
 
 def _generate_start_command_by_rules(
@@ -1022,232 +2467,66 @@ def _generate_start_command_by_rules(
     file_analysis: Dict,
     extracted_dir_name: Optional[str] = None,
     application_name: Optional[str] = None,
-    port: Optional[int] = None
+    port: Optional[int] = None,
+    extract_cmd: Optional[str] = None
 ) -> Optional[str]:
     """
     根据规则生成启动命令
+
+    按 START_COMMAND_RULES 中对应语言的规则顺序在压缩包成员索引上匹配，路径相对于解压（并进入解压目录）后的工作目录。
+    非压缩包产物本身即为唯一的候选文件。extract_cmd 用于替换默认的解压命令（如增量部署按版本标记只解压变化成员的命令）。
     
     Returns:
         生成的启动命令，如果无法通过规则生成则返回 None
     """
+    rules = START_COMMAND_RULES.get(deploy_language)
+    if not rules:
+        # 未知语言类型，返回 None
+        return None
+
     file_name = Path(file_path).name
-    file_name_lower = file_name.lower()
     
     # 判断是否需要解压
     is_archive = file_analysis['file_type'] == 'archive'
-    extract_cmd = ""
     work_dir = ""
     
     if is_archive:
-        archive_type = file_analysis['archive_type']
-        if archive_type == 'tar.gz':
-            extract_cmd = f"[ -f {file_name} ] && tar -xzf {file_name} || exit 1"
-        elif archive_type == 'tar':
-            extract_cmd = f"[ -f {file_name} ] && tar -xf {file_name} || exit 1"
-        elif archive_type == 'zip':
-            extract_cmd = f"[ -f {file_name} ] && unzip -o {file_name} || exit 1"
+        if not extract_cmd:
+            extract_cmd = _archive_extract_command(file_name, file_analysis['archive_type'])
+            if file_analysis.get('hash_crc64'):
+                # 记录实例上的解压版本，后续增量部署据此判断能否只解压变化的文件
+                extract_cmd += f" && {_revision_marker_command(file_name, file_analysis['hash_crc64'])}"
         
         # 如果有明确的解压目录，使用它
         if extracted_dir_name:
             work_dir = f" && [ -d {extracted_dir_name} ] && cd {extracted_dir_name} || exit 1"
-    
-    # 根据语言类型生成命令
-    files_in_archive = file_analysis.get('files_in_archive', [])
-    executable_files = _find_executable_files(files_in_archive, deploy_language)
-    
-    start_cmd = ""
-    
-    if deploy_language == 'java':
-        # Java 应用：查找 jar 文件
-        jar_files = executable_files['jar_files']
-        if jar_files:
-            # 使用第一个找到的 jar 文件
-            jar_file = jar_files[0].split('/')[-1]  # 只取文件名
-            if is_archive and extracted_dir_name:
-                jar_file = f"{extracted_dir_name}/{jar_file}"
-            elif is_archive:
-                jar_file = jar_file  # 假设解压到当前目录
-            start_cmd = f"[ -f {jar_file} ] && nohup java -jar {jar_file} > /root/app.log 2>&1 &"
-            logger.info(f"[_generate_start_command_by_rules] Generated Java start command for {jar_file}")
-        else:
-            # 尝试第一个常见的 jar 文件名（带防御性检查，如果不存在会跳过）
-            common_jar_names = ['app.jar', 'application.jar', 'main.jar', 'server.jar']
-            jar_name = common_jar_names[0]  # 使用第一个作为默认
-            if is_archive and extracted_dir_name:
-                test_path = f"{extracted_dir_name}/{jar_name}"
-            else:
-                test_path = jar_name
-            # 命令已包含防御性检查，如果文件不存在会失败
-            start_cmd = f"[ -f {test_path} ] && nohup java -jar {test_path} > /root/app.log 2>&1 &"
-    
-    elif deploy_language == 'python':
-        # Python 应用：查找 py 文件或 requirements.txt
-        py_files = executable_files['py_files']
-        if py_files:
-            # 优先查找 main.py, app.py, run.py, server.py
-            preferred_names = ['main.py', 'app.py', 'run.py', 'server.py', 'application.py']
-            py_file = None
-            for preferred in preferred_names:
-                for py_path in py_files:
-                    if py_path.endswith(preferred):
-                        py_file = py_path.split('/')[-1]
-                        break
-                if py_file:
-                    break
-            
-            if not py_file and py_files:
-                py_file = py_files[0].split('/')[-1]
-            
-            if py_file:
-                if is_archive and extracted_dir_name:
-                    py_file = f"{extracted_dir_name}/{py_file}"
-                start_cmd = f"[ -f {py_file} ] && nohup python {py_file} > /root/app.log 2>&1 &"
-                logger.info(f"[_generate_start_command_by_rules] Generated Python start command for {py_file}")
-        else:
-            # 尝试第一个常见的 Python 文件名（带防御性检查，如果不存在会跳过）
-            common_py_names = ['app.py', 'main.py', 'run.py', 'server.py']
-            py_name = common_py_names[0]  # 使用第一个作为默认
-            if is_archive and extracted_dir_name:
-                test_path = f"{extracted_dir_name}/{py_name}"
-            else:
-                test_path = py_name
-            # 命令已包含防御性检查，如果文件不存在会失败
-            start_cmd = f"[ -f {test_path} ] && nohup python {test_path} > /root/app.log 2>&1 &"
-    
-    elif deploy_language == 'nodejs':
-        # Node.js 应用：查找 package.json
-        if executable_files['package_json']:
-            package_json_path = executable_files['package_json']
-            if is_archive and extracted_dir_name:
-                package_json_dir = extracted_dir_name
-            else:
-                package_json_dir = "."
-            
-            # 检查是否有 start.sh
-            shell_scripts = executable_files['shell_scripts']
-            start_script = None
-            for script in shell_scripts:
-                if 'start' in script.lower():
-                    start_script = script.split('/')[-1]
-                    break
-            
-            if start_script:
-                # 即使有 start.sh，也先执行 npm install 确保依赖已安装
-                script_path_for_cmd = start_script  # 使用相对路径（文件名），因为 work_dir 会处理 cd 或已在当前目录
-                start_cmd = f"command -v npm >/dev/null 2>&1 && [ -f package.json ] && npm install && [ -f {script_path_for_cmd} ] && chmod +x {script_path_for_cmd} && nohup ./{script_path_for_cmd} > /root/app.log 2>&1 &"
-                logger.info(f"[_generate_start_command_by_rules] Generated Node.js start command with script: {start_script}")
-            else:
-                # 使用 npm start，必须先执行 npm install
-                start_cmd = f"command -v npm >/dev/null 2>&1 && [ -f package.json ] && npm install && nohup npm start > /root/app.log 2>&1 &"
-                logger.info(f"[_generate_start_command_by_rules] Generated Node.js start command with npm start")
-        else:
-            # 尝试查找 js 文件
-            js_files = executable_files['js_files']
-            if js_files:
-                # 优先查找 index.js, app.js, server.js
-                preferred_names = ['index.js', 'app.js', 'server.js', 'main.js']
-                js_file = None
-                for preferred in preferred_names:
-                    for js_path in js_files:
-                        if js_path.endswith(preferred):
-                            js_file = js_path.split('/')[-1]
-                            break
-                    if js_file:
-                        break
-                
-                if not js_file and js_files:
-                    js_file = js_files[0].split('/')[-1]
-                
-                if js_file:
-                    if is_archive and extracted_dir_name:
-                        js_file = f"{extracted_dir_name}/{js_file}"
-                    start_cmd = f"[ -f {js_file} ] && nohup node {js_file} > /root/app.log 2>&1 &"
-                    logger.info(f"[_generate_start_command_by_rules] Generated Node.js start command for {js_file}")
-                else:
-                    return None
-            else:
-                return None
-    
-    elif deploy_language == 'golang':
-        # Go 应用：查找二进制文件
-        go_binaries = executable_files['go_binaries']
-        # Go 二进制文件通常没有扩展名，且名称可能包含路径
-        # 尝试查找常见的二进制文件名
-        common_bin_names = ['app', 'main', 'server', 'application']
-        binary_file = None
-        
-        for bin_name in common_bin_names:
-            for file_path in files_in_archive:
-                file_name_only = file_path.split('/')[-1]
-                if file_name_only == bin_name or file_name_only.startswith(bin_name):
-                    binary_file = file_path.split('/')[-1]
-                    break
-            if binary_file:
-                break
-        
-        if binary_file:
-            if is_archive and extracted_dir_name:
-                binary_file = f"{extracted_dir_name}/{binary_file}"
-            start_cmd = f"[ -f {binary_file} ] && chmod +x {binary_file} && nohup ./{binary_file} > /root/app.log 2>&1 &"
-            logger.info(f"[_generate_start_command_by_rules] Generated Golang start command for {binary_file}")
-        else:
-            # 尝试直接使用文件名（去掉扩展名）
-            base_name = file_name.rsplit('.', 1)[0] if '.' in file_name else file_name
-            if is_archive and extracted_dir_name:
-                test_path = f"{extracted_dir_name}/{base_name}"
-            else:
-                test_path = base_name
-            start_cmd = f"[ -f {test_path} ] && chmod +x {test_path} && nohup ./{test_path} > /root/app.log 2>&1 & || true"
-            if not start_cmd:
-                return None
-    
-    elif deploy_language == 'docker':
-        # Docker 应用：检查是否有 Dockerfile，然后生成 docker build 和 docker run 命令
-        dockerfile_path = executable_files.get('dockerfile')
-        
-        if not dockerfile_path:
-            return None
-        
-        # 生成 Docker 命令
-        # 使用应用名称作为镜像和容器名称的基础（如果没有，使用默认值）
-        image_name = (application_name or 'app').lower().replace(' ', '-').replace('_', '-')
-        container_name = image_name
-        
-        # 确定 Dockerfile 的路径
-        if is_archive and extracted_dir_name:
-            # 如果 Dockerfile 在解压目录中
-            dockerfile_dir = extracted_dir_name
-            dockerfile_for_build = "Dockerfile"  # 在解压目录中，使用相对路径
-        elif is_archive:
-            # 解压到当前目录
-            dockerfile_dir = "."
-            dockerfile_for_build = "Dockerfile"
-        else:
-            # 不是压缩包，使用文件所在目录
-            dockerfile_dir = "."
-            dockerfile_for_build = "Dockerfile"
-        
-        # 构建 Docker 命令
-        port_mapping = f"-p {port}:{port} " if port else ""
-        
-        # 检查 Docker 是否安装
-        docker_check = "command -v docker >/dev/null 2>&1 && "
-        
-        # 停止并删除旧容器（如果存在）
-        stop_old_container = f"docker stop {container_name} 2>/dev/null || true && docker rm {container_name} 2>/dev/null || true && "
-        
-        # 构建镜像（检查 Dockerfile 是否存在）
-        build_cmd = f"[ -f {dockerfile_for_build} ] && docker build -t {image_name}:latest . && "
-        
-        # 运行容器
-        run_cmd = f"docker run -d --name {container_name} {port_mapping}{image_name}:latest"
-        
-        # 组合命令
-        start_cmd = f"{docker_check}{stop_old_container}{build_cmd}{run_cmd}"
-        logger.info(f"[_generate_start_command_by_rules] Generated Docker start command for {container_name}")
-    
+        index = _ArchiveIndex(file_analysis.get('files_in_archive', []), extracted_dir_name,
+                              file_analysis.get('executables'))
     else:
-        # 未知语言类型，返回 None
+        index = _ArchiveIndex([file_name])
+
+    # 使用应用名称作为 Docker 镜像和容器名称的基础（如果没有，使用默认值）
+    image_name = (application_name or 'app').lower().replace(' ', '-').replace('_', '-')
+    context = {
+        'artifact_stem': _artifact_stem(file_name),
+        'image': image_name,
+        'container': image_name,
+        'port_mapping': f"-p {port}:{port} " if port else "",
+    }
+    context.update(_dependency_layer_context(
+        deploy_language, _get_dependency_fingerprint(deploy_language, file_analysis, extracted_dir_name),
+        application_name
+    ))
+
+    start_cmd = None
+    for rule in rules:
+        path = _match_start_rule(index, rule, context)
+        if path is not None:
+            start_cmd = rule['command'].format(path=path, **context)
+            logger.info(f"[_generate_start_command_by_rules] Generated {deploy_language} start command"
+                        f"{f' for {path}' if path else ''}")
+            break
+    if not start_cmd:
         return None
     
     # 组合命令
@@ -1262,6 +2541,16 @@ def _generate_start_command_by_rules(
     return final_cmd
 
 
+def _archive_extract_command(file_name: str, archive_type: Optional[str]) -> str:
+    if archive_type == 'tar.gz':
+        return f"[ -f {file_name} ] && tar -xzf {file_name} || exit 1"
+    if archive_type == 'tar':
+        return f"[ -f {file_name} ] && tar -xf {file_name} || exit 1"
+    if archive_type == 'zip':
+        return f"[ -f {file_name} ] && unzip -o {file_name} || exit 1"
+    return ""
+
+
 def _generate_stop_command_by_rules(
     deploy_language: str,
     file_analysis: Dict,
@@ -1297,7 +2586,8 @@ def _generate_start_stop_commands_by_rules(
     file_path: str,
     deploy_language: str,
     application_name: Optional[str] = None,
-    port: Optional[int] = None
+    port: Optional[int] = None,
+    extract_cmd: Optional[str] = None
 ) -> Tuple[Optional[str], Optional[str]]:
     """
     根据工程规则生成启动和停止命令
@@ -1307,18 +2597,19 @@ def _generate_start_stop_commands_by_rules(
         deploy_language: 部署语言类型
         application_name: 应用名称（用于 Docker 容器命名等）
         port: 应用端口（用于 Docker 端口映射等）
+        extract_cmd: 替换默认解压命令的命令（增量部署）
     
     Returns:
         (start_command, stop_command): 如果无法通过规则生成则返回 (None, None)
     """
     try:
         # 分析部署文件
-        file_analysis = _analyze_deployment_file(file_path)
+        file_analysis = _analyze_deployment_file(file_path, deploy_language)
         extracted_dir_name = file_analysis.get('extracted_dir_name')
         
         # 生成启动命令
         start_cmd = _generate_start_command_by_rules(
-            file_path, deploy_language, file_analysis, extracted_dir_name, application_name, port
+            file_path, deploy_language, file_analysis, extracted_dir_name, application_name, port, extract_cmd
         )
         
         # 生成停止命令
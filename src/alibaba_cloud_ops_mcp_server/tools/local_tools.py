@@ -1,14 +1,58 @@
 import os
+import stat
+import signal
+import asyncio
 import subprocess
 import json
 import re
+import time
+import shlex
+import uuid
+import atexit
+import shutil
+import tempfile
+import threading
 import logging
+import hashlib
+import struct
+import zlib
+import tarfile
+import zipfile
+import contextlib
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Iterator, Tuple
 from pydantic import Field
+from fastmcp import Context
+from alibaba_cloud_ops_mcp_server.settings import settings
+from alibaba_cloud_ops_mcp_server.alibabacloud.utils import (
+    set_project_path, get_release_path, prune_release_dir, get_build_cache_path
+)
 
 logger = logging.getLogger(__name__)
 
+# Directories never descended into unless ignore rules are disabled
+DEFAULT_IGNORED_NAMES = {
+    '.git', '.hg', '.svn', 'node_modules', 'target', '__pycache__', '.venv', 'venv',
+    '.tox', '.mypy_cache', '.pytest_cache', '.gradle', '.idea',
+}
+LIST_DIRECTORY_DEFAULT_LIMIT = 1000
+LIST_DIRECTORY_MAX_LIMIT = 10000
+# Shell output kept per stream: the first HEAD bytes and the last TAIL bytes, the middle is dropped
+SHELL_OUTPUT_HEAD_BYTES = 16 * 1024
+SHELL_OUTPUT_TAIL_BYTES = 64 * 1024
+SHELL_READ_CHUNK_SIZE = 64 * 1024
+SHELL_PROGRESS_INTERVAL = 2.0
+SHELL_PROGRESS_MESSAGE_BYTES = 512
+# Background jobs
+JOB_STATUSES_FINISHED = {'succeeded', 'failed', 'cancelled'}
+JOB_MAX_FINISHED = 50
+JOB_CANCEL_GRACE_SECONDS = 5
+JOB_WAIT_POLL_INTERVAL = 1.0
+JOB_DEFAULT_TAIL_BYTES = 8 * 1024
+JOB_MAX_TAIL_BYTES = 1024 * 1024
+
 
 class ToolsList:
     """A tool list that can be used as both a list and a decorator"""
@@ -43,75 +87,330 @@ def _validate_path(path: str) -> Path:
         raise ValueError(f"Invalid path: {path}") from e
 
 
+def _compile_ignore_pattern(line: str) -> Optional[Tuple[re.Pattern, bool, bool]]:
+    """
+    Compile one .gitignore line into (regex, negated, directory_only); the regex matches paths relative to the
+    directory that holds the .gitignore file
+    """
+    line = line.rstrip('\n').rstrip()
+    if not line or line.startswith('#'):
+        return None
+    negated = line.startswith('!')
+    if negated:
+        line = line[1:]
+    if line.startswith('\\'):
+        line = line[1:]
+    directory_only = line.endswith('/')
+    line = line.strip('/') if directory_only else line
+    # A pattern with a slash (other than a trailing one) is anchored to the .gitignore directory
+    anchored = '/' in line
+    line = line.lstrip('/')
+    if not line:
+        return None
+
+    regex = ''
+    i = 0
+    while i < len(line):
+        char = line[i]
+        if line.startswith('**/', i):
+            regex += '(?:.*/)?'
+            i += 3
+            continue
+        if line.startswith('**', i):
+            regex += '.*'
+            i += 2
+            continue
+        if char == '*':
+            regex += '[^/]*'
+        elif char == '?':
+            regex += '[^/]'
+        elif char == '[':
+            end = line.find(']', i + 1)
+            if end == -1:
+                regex += re.escape(char)
+            else:
+                regex += '[' + line[i + 1:end].replace('!', '^', 1) + ']'
+                i = end
+        else:
+            regex += re.escape(char)
+        i += 1
+    if not anchored:
+        regex = '(?:.*/)?' + regex
+    return re.compile(regex + r'\Z'), negated, directory_only
+
+
+def _load_gitignore(directory: str) -> List[Tuple[re.Pattern, bool, bool]]:
+    try:
+        with open(os.path.join(directory, '.gitignore'), 'r', encoding='utf-8', errors='replace') as f:
+            return [rule for rule in map(_compile_ignore_pattern, f) if rule]
+    except OSError:
+        return []
+
+
+class _DirectoryWalker:
+    """
+    Depth-first os.scandir walker. Entries are visited in name order within each directory, directory types come
+    from the cached dirent type, and ignored directories are never descended into.
+    """
+
+    def __init__(self, root: str, max_depth: Optional[int], apply_ignore_rules: bool,
+                 extra_patterns: Optional[List[str]] = None):
+        self.root = root
+        self.max_depth = max_depth
+        self.apply_ignore_rules = apply_ignore_rules
+        # Extra .gitignore-style patterns relative to the root, applied even when ignore rules are disabled
+        self.extra_rules = [rule for rule in map(_compile_ignore_pattern, extra_patterns or []) if rule]
+        self.ignored = 0
+        self.errors = 0
+
+    def walk(self) -> Iterator[Tuple[os.DirEntry, str, int, bool]]:
+        """Yield (entry, relative_path, depth, is_dir); depth 0 is a direct child of the root"""
+        rules = [('', self.extra_rules)] if self.extra_rules else []
+        yield from self._walk_dir(self.root, '', 0, self._extend_rules(self.root, '', rules))
+
+    def _extend_rules(self, directory: str, rel_dir: str, rules: List) -> List:
+        if not self.apply_ignore_rules:
+            return rules
+        gitignore = _load_gitignore(directory)
+        return rules + [(rel_dir, gitignore)] if gitignore else rules
+
+    def _is_ignored(self, name: str, rel_path: str, is_dir: bool, rules: List) -> bool:
+        if self.apply_ignore_rules and name in DEFAULT_IGNORED_NAMES:
+            return True
+        ignored = False
+        # Rules from deeper .gitignore files come later, the last matching rule wins
+        for rel_dir, patterns in rules:
+            candidate = rel_path[len(rel_dir) + 1:] if rel_dir else rel_path
+            for regex, negated, directory_only in patterns:
+                if directory_only and not is_dir:
+                    continue
+                if regex.match(candidate):
+                    ignored = not negated
+        return ignored
+
+    def _walk_dir(self, directory: str, rel_dir: str, depth: int, rules: List):
+        try:
+            with os.scandir(directory) as iterator:
+                entries = sorted(iterator, key=lambda entry: entry.name)
+        except OSError:
+            # Skip inaccessible directories
+            self.errors += 1
+            return
+        for entry in entries:
+            rel_path = f'{rel_dir}/{entry.name}' if rel_dir else entry.name
+            try:
+                is_dir = entry.is_dir()
+                is_symlink = entry.is_symlink()
+            except OSError:
+                self.errors += 1
+                continue
+            if self._is_ignored(entry.name, rel_path, is_dir, rules):
+                self.ignored += 1
+                continue
+            yield entry, rel_path, depth, is_dir
+            if is_dir and not is_symlink and (self.max_depth is None or depth + 1 < self.max_depth):
+                yield from self._walk_dir(entry.path, rel_path, depth + 1,
+                                          self._extend_rules(entry.path, rel_path, rules))
+
+
+def _parse_cursor(cursor: Optional[str]) -> int:
+    if not cursor:
+        return 0
+    try:
+        offset = int(cursor)
+    except (TypeError, ValueError):
+        offset = -1
+    if offset < 0:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return offset
+
+
+def _summarize_directory(walker: _DirectoryWalker) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """Per-directory file/dir counts and sizes; total_* include all walked descendants"""
+    directories = {'': {'path': '.', 'files': 0, 'dirs': 0, 'size': 0, 'total_files': 0, 'total_size': 0}}
+    for entry, rel_path, _, is_dir in walker.walk():
+        parent = rel_path.rpartition('/')[0]
+        if is_dir:
+            directories[parent]['dirs'] += 1
+            directories[rel_path] = {'path': rel_path, 'files': 0, 'dirs': 0, 'size': 0,
+                                     'total_files': 0, 'total_size': 0}
+            continue
+        try:
+            size = entry.stat().st_size
+        except OSError:
+            walker.errors += 1
+            continue
+        directories[parent]['files'] += 1
+        directories[parent]['size'] += size
+        # Roll the file up into every ancestor, the root included
+        ancestor = parent
+        while True:
+            directories[ancestor]['total_files'] += 1
+            directories[ancestor]['total_size'] += size
+            if not ancestor:
+                break
+            ancestor = ancestor.rpartition('/')[0]
+    root = directories['']
+    totals = {'files': root['total_files'], 'dirs': len(directories) - 1, 'size': root['total_size']}
+    return list(directories.values()), totals
+
+
 @tools.append
 def LOCAL_ListDirectory(
     path: str = Field(description="Directory path to list (absolute or relative path)"),
-    recursive: bool = Field(description="Whether to recursively list subdirectories", default=False)
+    recursive: bool = Field(description="Whether to recursively list subdirectories", default=False),
+    max_depth: Optional[int] = Field(description="Maximum depth when recursive, 1 lists direct children only. Unlimited if not set", default=None),
+    apply_ignore_rules: bool = Field(description="Skip .gitignore matches and common dependency/VCS directories (.git, node_modules, target, __pycache__, .venv ...)", default=True),
+    limit: int = Field(description=f"Maximum number of items (or directories in summary mode) to return, at most {LIST_DIRECTORY_MAX_LIMIT}", default=LIST_DIRECTORY_DEFAULT_LIMIT),
+    cursor: Optional[str] = Field(description="next_cursor from a previous call to continue listing", default=None),
+    summary: bool = Field(description="Return per-directory file counts and sizes instead of individual entries", default=False)
 ):
-    """列出指定目录中的文件和子目录。返回包含名称、类型和大小等信息的目录和文件列表。"""
-    logger.info(f"[ListDirectory] Input parameters: path={path}, recursive={recursive}")
+    """列出指定目录中的文件和子目录。返回包含名称、类型和大小等信息的目录和文件列表。默认跳过 .gitignore 匹配项和 node_modules、.git 等目录，结果分页返回（next_cursor），summary=True 时返回各目录的文件数和大小汇总。"""
+    logger.info(f"[ListDirectory] Input parameters: path={path}, recursive={recursive}, max_depth={max_depth}, "
+                f"apply_ignore_rules={apply_ignore_rules}, limit={limit}, cursor={cursor}, summary={summary}")
     try:
         dir_path = _validate_path(path)
         
         # Ensure it's a directory, not a file
         if not dir_path.is_dir():
             raise ValueError(f"Path is not a directory: {path}")
+        if max_depth is not None and max_depth < 1:
+            raise ValueError(f"max_depth must be at least 1: {max_depth}")
         
-        results = []
+        offset = _parse_cursor(cursor)
+        limit = max(1, min(limit, LIST_DIRECTORY_MAX_LIMIT))
+        walker = _DirectoryWalker(str(dir_path), max_depth if recursive else 1, apply_ignore_rules)
         
-        if recursive:
-            # Recursively list
-            for item in dir_path.rglob('*'):
-                try:
-                    item_stat = item.stat()
-                    results.append({
-                        "name": item.name,
-                        "path": str(item),
-                        "type": "directory" if item.is_dir() else "file",
-                        "size": item_stat.st_size if item.is_file() else None,
-                        "modified": item_stat.st_mtime
-                    })
-                except (OSError, PermissionError):
-                    # Skip inaccessible files/directories
-                    continue
+        if summary:
+            directories, totals = _summarize_directory(walker)
+            page = directories[offset:offset + limit]
+            has_more = offset + limit < len(directories)
+            response = {
+                "path": str(dir_path),
+                "summary": True,
+                "totals": totals,
+                "directories": page,
+                "count": len(page),
+            }
         else:
-            # List only current directory
-            for item in dir_path.iterdir():
+            results = []
+            has_more = False
+            for index, (entry, rel_path, depth, is_dir) in enumerate(walker.walk()):
+                if index < offset:
+                    continue
+                if len(results) >= limit:
+                    has_more = True
+                    break
                 try:
-                    item_stat = item.stat()
-                    results.append({
-                        "name": item.name,
-                        "path": str(item),
-                        "type": "directory" if item.is_dir() else "file",
-                        "size": item_stat.st_size if item.is_file() else None,
-                        "modified": item_stat.st_mtime
-                    })
-                except (OSError, PermissionError):
+                    item_stat = entry.stat()
+                except OSError:
                     # Skip inaccessible files/directories
                     continue
+                results.append({
+                    "name": entry.name,
+                    "path": entry.path,
+                    "relative_path": rel_path,
+                    "type": "directory" if is_dir else "file",
+                    "size": item_stat.st_size if not is_dir else None,
+                    "modified": item_stat.st_mtime
+                })
+            response = {
+                "path": str(dir_path),
+                "items": results,
+                "count": len(results),
+            }
         
-        # Sort by name
-        results.sort(key=lambda x: x["name"])
-        
-        response = {
-            "path": str(dir_path),
-            "items": results,
-            "count": len(results)
-        }
-        logger.info(f"[ListDirectory] Response: {json.dumps(response, ensure_ascii=False, default=str)}")
+        response.update({
+            "next_cursor": str(offset + limit) if has_more else None,
+            "ignored": walker.ignored,
+            "errors": walker.errors,
+        })
+        logger.info(f"[ListDirectory] Response: {response['count']} entries from {dir_path}, "
+                    f"next_cursor={response['next_cursor']}, ignored={walker.ignored}, errors={walker.errors}")
         return response
     except Exception as e:
         raise ValueError(f"Failed to list directory: {str(e)}")
 
 
+class _OutputBuffer:
+    """Bounded capture of a process stream: keeps the first head_bytes and the last tail_bytes"""
+
+    def __init__(self, head_bytes: int, tail_bytes: int):
+        self.head_bytes = max(head_bytes, 0)
+        self.tail_bytes = max(tail_bytes, 0)
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total = 0
+
+    def write(self, data: bytes):
+        self.total += len(data)
+        room = self.head_bytes - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        if data and self.tail_bytes:
+            self.tail += data
+            # Trim lazily so that each byte is moved at most a constant number of times
+            if len(self.tail) > 2 * self.tail_bytes:
+                del self.tail[:-self.tail_bytes]
+
+    @property
+    def kept_tail(self) -> bytes:
+        return bytes(self.tail[-self.tail_bytes:]) if self.tail_bytes else b''
+
+    @property
+    def truncated_bytes(self) -> int:
+        return self.total - len(self.head) - len(self.kept_tail)
+
+    def recent(self, size: int) -> str:
+        return (bytes(self.head) + self.kept_tail)[-size:].decode('utf-8', errors='replace')
+
+    def text(self) -> str:
+        head = bytes(self.head).decode('utf-8', errors='replace')
+        tail = self.kept_tail.decode('utf-8', errors='replace')
+        if self.truncated_bytes:
+            return f"{head}\n... [{self.truncated_bytes} bytes truncated] ...\n{tail}"
+        return head + tail
+
+
+async def _pump_stream(stream: asyncio.StreamReader, buffer: _OutputBuffer):
+    while True:
+        chunk = await stream.read(SHELL_READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        buffer.write(chunk)
+
+
+def _kill_process_tree(process):
+    """Kill the process and, on POSIX, its whole process group (the shell and everything it started)"""
+    try:
+        if os.name != 'nt':
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _last_output_line(stdout: _OutputBuffer, stderr: _OutputBuffer) -> str:
+    for buffer in (stderr, stdout) if stderr.total > stdout.total else (stdout, stderr):
+        lines = [line.strip() for line in buffer.recent(SHELL_PROGRESS_MESSAGE_BYTES).splitlines() if line.strip()]
+        if lines:
+            return lines[-1]
+    return ''
+
+
 @tools.append
-def LOCAL_RunShellScript(
+async def LOCAL_RunShellScript(
     script: str = Field(description="Shell script content or command to execute"),
     working_directory: Optional[str] = Field(description="Working directory for command execution", default=None),
     timeout: int = Field(description="Command execution timeout in seconds", default=300),
-    shell: bool = Field(description="Whether to use shell execution (True uses /bin/sh, False executes command directly)", default=True)
+    shell: bool = Field(description="Whether to use shell execution (True uses /bin/sh, False executes command directly)", default=True),
+    head_bytes: int = Field(description="Bytes kept from the start of stdout and of stderr", default=SHELL_OUTPUT_HEAD_BYTES),
+    tail_bytes: int = Field(description="Bytes kept from the end of stdout and of stderr; output in between is dropped and counted", default=SHELL_OUTPUT_TAIL_BYTES),
+    ctx: Context = None
 ):
-    """执行 shell 脚本或命令。返回命令输出、错误信息和退出代码。注意：执行任意命令可能存在安全风险，请谨慎使用。"""
+    """执行 shell 脚本或命令。返回命令输出、错误信息和退出代码。输出按流读取，只保留开头 head_bytes 和结尾 tail_bytes 字节；执行过程中通过进度通知返回最新输出，超时后终止进程并返回已产生的部分输出（timed_out=True）。注意：执行任意命令可能存在安全风险，请谨慎使用。"""
     logger.info(f"[RunShellScript] Input parameters: script={script}, working_directory={working_directory}, timeout={timeout}, shell={shell}")
     try:
         # Set working directory
@@ -122,202 +421,1049 @@ def LOCAL_RunShellScript(
                 raise ValueError(f"Working directory is not a directory: {working_directory}")
             cwd = str(cwd)
         
-        # Execute command
+        # Start the command in its own session so a timeout can kill everything it spawned
+        popen_kwargs = {
+            'stdout': asyncio.subprocess.PIPE,
+            'stderr': asyncio.subprocess.PIPE,
+            'stdin': asyncio.subprocess.DEVNULL,
+            'cwd': cwd,
+            'start_new_session': os.name != 'nt',
+        }
         if shell:
             # Execute using shell
-            process = subprocess.run(
-                script,
-                shell=True,
-                capture_output=True,
-                text=True,
-                timeout=timeout,
-                cwd=cwd,
-                executable='/bin/sh' if os.name != 'nt' else None
+            process = await asyncio.create_subprocess_shell(
+                script, executable='/bin/sh' if os.name != 'nt' else None, **popen_kwargs
             )
         else:
             # Execute directly (need to split command into list)
-            import shlex
-            cmd_list = shlex.split(script)
-            process = subprocess.run(
-                cmd_list,
-                shell=False,
-                capture_output=True,
-                text=True,
-                timeout=timeout,
-                cwd=cwd
-            )
+            process = await asyncio.create_subprocess_exec(*shlex.split(script), **popen_kwargs)
+        
+        stdout = _OutputBuffer(head_bytes, tail_bytes)
+        stderr = _OutputBuffer(head_bytes, tail_bytes)
+        started = time.monotonic()
+        completion = asyncio.gather(
+            _pump_stream(process.stdout, stdout), _pump_stream(process.stderr, stderr), process.wait()
+        )
+        timed_out = False
+        reported_bytes = 0
+        try:
+            while True:
+                remaining = timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    timed_out = True
+                    break
+                try:
+                    await asyncio.wait_for(asyncio.shield(completion), timeout=min(SHELL_PROGRESS_INTERVAL, remaining))
+                    break
+                except asyncio.TimeoutError:
+                    output_bytes = stdout.total + stderr.total
+                    if ctx is not None and output_bytes != reported_bytes:
+                        reported_bytes = output_bytes
+                        await ctx.report_progress(
+                            progress=round(time.monotonic() - started, 1), total=timeout,
+                            message=_last_output_line(stdout, stderr)
+                        )
+        finally:
+            # Timeout or cancellation of the tool call: kill the process tree, keep what was read so far
+            if process.returncode is None:
+                _kill_process_tree(process)
+                try:
+                    await asyncio.wait_for(completion, timeout=5)
+                except (asyncio.TimeoutError, asyncio.CancelledError):
+                    completion.cancel()
         
         response = {
             "command": script,
             "exit_code": process.returncode,
-            "stdout": process.stdout,
-            "stderr": process.stderr,
-            "success": process.returncode == 0
+            "stdout": stdout.text(),
+            "stderr": stderr.text(),
+            "success": process.returncode == 0 and not timed_out,
+            "timed_out": timed_out,
+            "duration": round(time.monotonic() - started, 3),
+            "stdout_bytes": stdout.total,
+            "stderr_bytes": stderr.total,
+            "stdout_truncated_bytes": stdout.truncated_bytes,
+            "stderr_truncated_bytes": stderr.truncated_bytes,
         }
-        logger.info(f"[RunShellScript] Response: {json.dumps(response, ensure_ascii=False, default=str)}")
+        logger.info(f"[RunShellScript] Response: exit_code={response['exit_code']}, timed_out={timed_out}, "
+                    f"duration={response['duration']}s, stdout_bytes={stdout.total}, stderr_bytes={stderr.total}")
         return response
-    except subprocess.TimeoutExpired:
-        raise ValueError(f"Command execution timeout (exceeded {timeout} seconds)")
     except FileNotFoundError:
         raise ValueError(f"Command or script not found: {script}")
     except Exception as e:
         raise ValueError(f"Failed to execute command: {str(e)}")
 
 
+class _SpillFile:
+    """Job output on disk, rotated to output.log.1, output.log.2 ... once the current file reaches max_bytes"""
+
+    def __init__(self, directory: str, max_bytes: int, max_files: int):
+        self.path = os.path.join(directory, 'output.log')
+        self.max_bytes = max(max_bytes, 1)
+        self.max_files = max(max_files, 1)
+        self.size = 0
+        self.total = 0
+        self.rotations = 0
+        self._lock = threading.Lock()
+        self._file = open(self.path, 'wb')
+
+    def _rotated_path(self, index: int) -> str:
+        return f'{self.path}.{index}' if index else self.path
+
+    def write(self, data: bytes):
+        with self._lock:
+            if self.size and self.size + len(data) > self.max_bytes:
+                self._rotate()
+            self._file.write(data)
+            self._file.flush()
+            self.size += len(data)
+            self.total += len(data)
+
+    def _rotate(self):
+        self._file.close()
+        oldest = self._rotated_path(self.max_files - 1)
+        if self.max_files > 1 and os.path.exists(oldest):
+            os.remove(oldest)
+        for index in range(self.max_files - 2, -1, -1):
+            if os.path.exists(self._rotated_path(index)):
+                os.replace(self._rotated_path(index), self._rotated_path(index + 1))
+        self._file = open(self.path, 'wb')
+        self.size = 0
+        self.rotations += 1
+
+    def tail(self, size: int) -> bytes:
+        """Last size bytes of the output that is still on disk, reading rotated files when needed"""
+        with self._lock:
+            chunks = []
+            remaining = size
+            for index in range(self.max_files):
+                path = self._rotated_path(index)
+                if remaining <= 0 or not os.path.exists(path):
+                    break
+                with open(path, 'rb') as f:
+                    f.seek(0, os.SEEK_END)
+                    length = f.tell()
+                    f.seek(max(length - remaining, 0))
+                    data = f.read()
+                chunks.append(data)
+                remaining -= len(data)
+            return b''.join(reversed(chunks))
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class _LocalJob:
+    """A background command; stdout and stderr are merged into a rotating spill file"""
+
+    def __init__(self, script: str, cwd: Optional[str], shell: bool, name: Optional[str]):
+        self.job_id = f'job-{uuid.uuid4().hex[:12]}'
+        first_line = script.strip().splitlines()[0][:80] if script.strip() else self.job_id
+        self.name = name or first_line
+        self.script = script
+        self.cwd = cwd
+        self.shell = shell
+        self.status = 'queued'
+        self.error = None
+        self.exit_code = None
+        self.process = None
+        self.spill = None
+        self.directory = None
+        self.cancel_requested = False
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.done = threading.Event()
+
+    def describe(self) -> Dict[str, Any]:
+        end = self.finished or time.time()
+        return {
+            "job_id": self.job_id,
+            "name": self.name,
+            "command": self.script,
+            "working_directory": self.cwd,
+            "status": self.status,
+            "pid": self.process.pid if self.process else None,
+            "exit_code": self.exit_code,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "duration": round(end - self.started, 3) if self.started else None,
+            "output_bytes": self.spill.total if self.spill else 0,
+            "output_file": self.spill.path if self.spill else None,
+            "output_rotations": self.spill.rotations if self.spill else 0,
+        }
+
+    def tail(self, size: int) -> str:
+        return self.spill.tail(size).decode('utf-8', errors='replace') if self.spill else ''
+
+
+class _JobManager:
+    """Runs local jobs in the background, at most settings.local_job_max_concurrency at a time"""
+
+    def __init__(self):
+        self._jobs: "OrderedDict[str, _LocalJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, job: _LocalJob) -> _LocalJob:
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._start_pending_locked()
+        return job
+
+    def get(self, job_id: str) -> _LocalJob:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            raise ValueError(f"Job not found: {job_id}")
+        return job
+
+    def list(self) -> List[_LocalJob]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> _LocalJob:
+        job = self.get(job_id)
+        with self._lock:
+            if job.status == 'queued':
+                job.status = 'cancelled'
+                job.finished = time.time()
+                job.done.set()
+                return job
+            if job.status != 'running':
+                return job
+            job.cancel_requested = True
+        # Ask the process group to stop, then force it after the grace period
+        try:
+            if os.name != 'nt':
+                os.killpg(job.process.pid, signal.SIGTERM)
+            else:
+                job.process.terminate()
+        except (ProcessLookupError, PermissionError):
+            pass
+        timer = threading.Timer(JOB_CANCEL_GRACE_SECONDS, lambda: job.done.is_set() or _kill_process_tree(job.process))
+        timer.daemon = True
+        timer.start()
+        return job
+
+    def shutdown(self):
+        for job in self.list():
+            if job.status == 'running' and job.process:
+                _kill_process_tree(job.process)
+
+    def _start_pending_locked(self):
+        running = sum(1 for job in self._jobs.values() if job.status == 'running')
+        for job in self._jobs.values():
+            if running >= max(settings.local_job_max_concurrency, 1):
+                break
+            if job.status == 'queued':
+                self._start_locked(job)
+                running += job.status == 'running'
+
+    def _start_locked(self, job: _LocalJob):
+        job.directory = tempfile.mkdtemp(prefix=f'ops-mcp-{job.job_id}-')
+        job.spill = _SpillFile(job.directory, settings.local_job_spill_bytes, settings.local_job_spill_files)
+        job.started = time.time()
+        try:
+            popen_kwargs = {
+                'stdout': subprocess.PIPE,
+                'stderr': subprocess.STDOUT,
+                'stdin': subprocess.DEVNULL,
+                'cwd': job.cwd,
+                'start_new_session': os.name != 'nt',
+            }
+            if job.shell:
+                job.process = subprocess.Popen(job.script, shell=True,
+                                               executable='/bin/sh' if os.name != 'nt' else None, **popen_kwargs)
+            else:
+                job.process = subprocess.Popen(shlex.split(job.script), **popen_kwargs)
+        except Exception as e:
+            job.status = 'failed'
+            job.error = str(e)
+            job.finished = time.time()
+            job.spill.close()
+            job.done.set()
+            return
+        job.status = 'running'
+        threading.Thread(target=self._run, args=(job,), name=f'local-{job.job_id}', daemon=True).start()
+
+    def _run(self, job: _LocalJob):
+        fd = job.process.stdout.fileno()
+        try:
+            while True:
+                chunk = os.read(fd, SHELL_READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                job.spill.write(chunk)
+        except OSError as e:
+            logger.warning(f"[LocalJob] Failed to read output of {job.job_id}: {e}")
+        exit_code = job.process.wait()
+        job.process.stdout.close()
+        job.spill.close()
+        with self._lock:
+            job.exit_code = exit_code
+            job.finished = time.time()
+            if job.cancel_requested:
+                job.status = 'cancelled'
+            else:
+                job.status = 'succeeded' if exit_code == 0 else 'failed'
+            job.done.set()
+            logger.info(f"[LocalJob] {job.job_id} {job.status} with exit code {exit_code}, "
+                        f"{job.spill.total} output bytes")
+            self._start_pending_locked()
+            self._evict_finished_locked()
+
+    def _evict_finished_locked(self):
+        finished = [job for job in self._jobs.values() if job.status in JOB_STATUSES_FINISHED]
+        for job in finished[:max(len(finished) - JOB_MAX_FINISHED, 0)]:
+            del self._jobs[job.job_id]
+            if job.directory:
+                shutil.rmtree(job.directory, ignore_errors=True)
+
+
+_job_manager = _JobManager()
+atexit.register(_job_manager.shutdown)
+
+
+def _job_response(job: _LocalJob, tail_bytes: int = 0) -> Dict[str, Any]:
+    response = job.describe()
+    if tail_bytes:
+        response["tail"] = job.tail(min(tail_bytes, JOB_MAX_TAIL_BYTES))
+    return response
+
+
 @tools.append
-def LOCAL_AnalyzeDeployStack(
-    directory: str = Field(description="Directory path to analyze (absolute or relative path)")
+def LOCAL_StartJob(
+    script: str = Field(description="Shell script content or command to run in the background, e.g. a build command like 'mvn package'"),
+    working_directory: Optional[str] = Field(description="Working directory for command execution", default=None),
+    shell: bool = Field(description="Whether to use shell execution (True uses /bin/sh, False executes command directly)", default=True),
+    name: Optional[str] = Field(description="Optional job name, defaults to the first line of the script", default=None)
 ):
-    """识别项目部署方式和技术栈。支持识别 npm、Python、Java、Go、Docker 等部署方式。"""
-    logger.info(f"[AnalyzeDeployStack] Input parameters: directory={directory}")
+    """在后台启动本地命令（如构建产物），立即返回 job_id，不受超时限制。命令在独立的进程组中运行，输出写入可轮转的日志文件；同时运行的任务数有上限，超出时排队。使用 LOCAL_GetJobStatus、LOCAL_TailJobOutput、LOCAL_WaitForJob、LOCAL_CancelJob 查看、等待或取消任务。"""
+    logger.info(f"[StartJob] Input parameters: script={script}, working_directory={working_directory}, shell={shell}, name={name}")
     try:
-        dir_path = _validate_path(directory)
-        
-        if not dir_path.is_dir():
-            raise ValueError(f"路径不是目录: {directory}")
-        
-        detection_results = {
-            "directory": str(dir_path),
-            "deployment_methods": [],
-            "package_managers": [],
-            "frameworks": [],
-            "runtime_versions": {},
-            "config_files": {},
-            "detected": False
-        }
-        
-        # List of files to check
-        files_to_check = {
-            # Node.js / npm
-            "package.json": ("npm", "nodejs"),
-            "package-lock.json": ("npm", "nodejs"),
-            "yarn.lock": ("yarn", "nodejs"),
-            "pnpm-lock.yaml": ("pnpm", "nodejs"),
-            ".nvmrc": ("nodejs", None),
-            
-            # Python
-            "requirements.txt": ("pip", "python"),
-            "Pipfile": ("pipenv", "python"),
-            "pyproject.toml": ("poetry", "python"),
-            "setup.py": ("setuptools", "python"),
-            "environment.yml": ("conda", "python"),
-            ".python-version": ("python", None),
-            
-            # Java
-            "pom.xml": ("maven", "java"),
-            "build.gradle": ("gradle", "java"),
-            "build.gradle.kts": ("gradle", "java"),
-            
-            # Go
-            "go.mod": ("go", "go"),
-            "go.sum": ("go", "go"),
-            "Gopkg.toml": ("dep", "go"),
-            
-            # Rust
-            "Cargo.toml": ("cargo", "rust"),
-            "Cargo.lock": ("cargo", "rust"),
-            
-            # PHP
-            "composer.json": ("composer", "php"),
-            
-            # Ruby
-            "Gemfile": ("bundler", "ruby"),
-            
-            # Docker
-            "Dockerfile": ("docker", "docker"),
-            "docker-compose.yml": ("docker-compose", "docker"),
-            "docker-compose.yaml": ("docker-compose", "docker"),
-            ".dockerignore": ("docker", "docker"),
-            
-            # 其他
-            "Makefile": ("make", None),
-            "CMakeLists.txt": ("cmake", "cpp"),
-        }
-        
-        # Check if files exist
-        for filename, (package_manager, framework) in files_to_check.items():
+        cwd = None
+        if working_directory:
+            cwd_path = _validate_path(working_directory)
+            if not cwd_path.is_dir():
+                raise ValueError(f"Working directory is not a directory: {working_directory}")
+            cwd = str(cwd_path)
+        job = _job_manager.submit(_LocalJob(script, cwd, shell, name))
+        response = _job_response(job)
+        logger.info(f"[StartJob] Job {job.job_id} {job.status}")
+        return response
+    except Exception as e:
+        raise ValueError(f"Failed to start job: {str(e)}")
+
+
+@tools.append
+def LOCAL_GetJobStatus(
+    job_id: Optional[str] = Field(description="Job ID returned by LOCAL_StartJob. If not provided, all known jobs are listed", default=None)
+):
+    """查询后台任务状态（queued、running、succeeded、failed、cancelled）、退出码、耗时和输出字节数；不传 job_id 时列出所有任务。"""
+    if job_id:
+        return _job_response(_job_manager.get(job_id))
+    jobs = [job.describe() for job in _job_manager.list()]
+    return {"jobs": jobs, "count": len(jobs)}
+
+
+@tools.append
+def LOCAL_TailJobOutput(
+    job_id: str = Field(description="Job ID returned by LOCAL_StartJob"),
+    tail_bytes: int = Field(description=f"Number of bytes to return from the end of the output, at most {JOB_MAX_TAIL_BYTES}", default=JOB_DEFAULT_TAIL_BYTES)
+):
+    """返回后台任务输出（stdout 与 stderr 合并）的最后 tail_bytes 字节，任务运行中也可调用。"""
+    return _job_response(_job_manager.get(job_id), max(tail_bytes, 1))
+
+
+@tools.append
+async def LOCAL_WaitForJob(
+    job_id: str = Field(description="Job ID returned by LOCAL_StartJob"),
+    timeout: int = Field(description="Maximum seconds to wait. The job keeps running if it has not finished", default=300),
+    tail_bytes: int = Field(description="Number of output bytes to return from the end of the output", default=JOB_DEFAULT_TAIL_BYTES),
+    ctx: Context = None
+):
+    """等待后台任务结束或超时，期间通过进度通知返回最新输出；超时不会终止任务（timed_out=True）。"""
+    job = _job_manager.get(job_id)
+    started = time.monotonic()
+    reported_bytes = -1
+    while not job.done.is_set():
+        remaining = timeout - (time.monotonic() - started)
+        if remaining <= 0:
+            break
+        await asyncio.to_thread(job.done.wait, min(JOB_WAIT_POLL_INTERVAL, remaining))
+        output_bytes = job.spill.total if job.spill else 0
+        if ctx is not None and not job.done.is_set() and output_bytes != reported_bytes:
+            reported_bytes = output_bytes
+            lines = [line.strip() for line in job.tail(SHELL_PROGRESS_MESSAGE_BYTES).splitlines() if line.strip()]
+            await ctx.report_progress(progress=round(time.monotonic() - started, 1), total=timeout,
+                                      message=f"{job.status}: {lines[-1] if lines else ''}")
+    response = _job_response(job, max(tail_bytes, 1))
+    response["timed_out"] = not job.done.is_set()
+    return response
+
+
+@tools.append
+def LOCAL_CancelJob(
+    job_id: str = Field(description="Job ID returned by LOCAL_StartJob")
+):
+    """取消后台任务：排队中的任务直接取消，运行中的任务向其进程组发送 SIGTERM，超过宽限时间后强制结束。"""
+    logger.info(f"[CancelJob] Input parameters: job_id={job_id}")
+    return _job_response(_job_manager.cancel(job_id))
+
+
+STACK_MARKER_FILES = {
+    # Node.js / npm
+    "package.json": ("npm", "nodejs"),
+    "package-lock.json": ("npm", "nodejs"),
+    "yarn.lock": ("yarn", "nodejs"),
+    "pnpm-lock.yaml": ("pnpm", "nodejs"),
+    ".nvmrc": ("nodejs", None),
+    
+    # Python
+    "requirements.txt": ("pip", "python"),
+    "Pipfile": ("pipenv", "python"),
+    "pyproject.toml": ("poetry", "python"),
+    "setup.py": ("setuptools", "python"),
+    "environment.yml": ("conda", "python"),
+    ".python-version": ("python", None),
+    
+    # Java
+    "pom.xml": ("maven", "java"),
+    "build.gradle": ("gradle", "java"),
+    "build.gradle.kts": ("gradle", "java"),
+    
+    # Go
+    "go.mod": ("go", "go"),
+    "go.sum": ("go", "go"),
+    "Gopkg.toml": ("dep", "go"),
+    
+    # Rust
+    "Cargo.toml": ("cargo", "rust"),
+    "Cargo.lock": ("cargo", "rust"),
+    
+    # PHP
+    "composer.json": ("composer", "php"),
+    
+    # Ruby
+    "Gemfile": ("bundler", "ruby"),
+    
+    # Docker
+    "Dockerfile": ("docker", "docker"),
+    "docker-compose.yml": ("docker-compose", "docker"),
+    "docker-compose.yaml": ("docker-compose", "docker"),
+    ".dockerignore": ("docker", "docker"),
+    
+    # 其他
+    "Makefile": ("make", None),
+    "CMakeLists.txt": ("cmake", "cpp"),
+}
+
+STACK_ANALYSIS_CACHE_SIZE = 512
+STACK_DISCOVERY_DEFAULT_DEPTH = 4
+STACK_DISCOVERY_WORKERS = 8
+
+# Single-directory analysis results: directory -> (marker fingerprint, result)
+_stack_analysis_cache: "OrderedDict[str, Tuple[Tuple, Dict[str, Any]]]" = OrderedDict()
+_stack_analysis_lock = threading.Lock()
+
+
+def _scan_stack_markers(directory: str) -> Tuple[Dict[str, Tuple[int, int]], List[Tuple[str, bool, bool]]]:
+    """
+    List a directory once: returns the marker files present with their (mtime_ns, size), and all entries as
+    (name, is_dir, is_symlink)
+    """
+    markers = {}
+    entries = []
+    try:
+        with os.scandir(directory) as iterator:
+            for entry in iterator:
+                try:
+                    is_dir = entry.is_dir()
+                    is_symlink = entry.is_symlink()
+                    entries.append((entry.name, is_dir, is_symlink))
+                    if not is_dir and entry.name in STACK_MARKER_FILES:
+                        entry_stat = entry.stat()
+                        markers[entry.name] = (entry_stat.st_mtime_ns, entry_stat.st_size)
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return markers, entries
+
+
+def _analyze_stack_directory(dir_path: Path, markers: Dict[str, Tuple[int, int]]) -> Dict[str, Any]:
+    """Detect the stack of one directory from the marker files found in it"""
+    detection_results = {
+        "directory": str(dir_path),
+        "deployment_methods": [],
+        "package_managers": [],
+        "frameworks": [],
+        "runtime_versions": {},
+        "config_files": {},
+        "detected": False
+    }
+    
+    # Check which marker files exist
+    for filename, (package_manager, framework) in STACK_MARKER_FILES.items():
+        if filename in markers:
             file_path = dir_path / filename
-            if file_path.exists():
-                if package_manager:
-                    if package_manager not in detection_results["package_managers"]:
-                        detection_results["package_managers"].append(package_manager)
-                if framework:
-                    if framework not in detection_results["frameworks"]:
-                        detection_results["frameworks"].append(framework)
-                detection_results["config_files"][filename] = str(file_path)
-        
-        # Read key files to get more information
-        # Read package.json
-        package_json = dir_path / "package.json"
-        if package_json.exists():
+            if package_manager:
+                if package_manager not in detection_results["package_managers"]:
+                    detection_results["package_managers"].append(package_manager)
+            if framework:
+                if framework not in detection_results["frameworks"]:
+                    detection_results["frameworks"].append(framework)
+            detection_results["config_files"][filename] = str(file_path)
+    
+    # Read key files to get more information
+    # Read package.json
+    package_json = dir_path / "package.json"
+    if "package.json" in markers:
+        try:
+            with open(package_json, 'r', encoding='utf-8') as f:
+                pkg_data = json.load(f)
+                if "engines" in pkg_data and "node" in pkg_data["engines"]:
+                    detection_results["runtime_versions"]["node"] = pkg_data["engines"]["node"]
+        except Exception:
+            pass
+    
+    # Read requirements.txt or pyproject.toml to get Python version information
+    if "requirements.txt" in markers or "pyproject.toml" in markers:
+        # Try to read from .python-version
+        py_version_file = dir_path / ".python-version"
+        if ".python-version" in markers:
             try:
-                with open(package_json, 'r', encoding='utf-8') as f:
-                    pkg_data = json.load(f)
-                    if "engines" in pkg_data and "node" in pkg_data["engines"]:
-                        detection_results["runtime_versions"]["node"] = pkg_data["engines"]["node"]
+                version = py_version_file.read_text().strip()
+                detection_results["runtime_versions"]["python"] = version
             except Exception:
                 pass
-        
-        # Read requirements.txt or pyproject.toml to get Python version information
-        if (dir_path / "requirements.txt").exists() or (dir_path / "pyproject.toml").exists():
-            # Try to read from .python-version
-            py_version_file = dir_path / ".python-version"
-            if py_version_file.exists():
-                try:
-                    version = py_version_file.read_text().strip()
-                    detection_results["runtime_versions"]["python"] = version
-                except Exception:
-                    pass
-        
-        # Read go.mod to get Go version
-        go_mod = dir_path / "go.mod"
-        if go_mod.exists():
-            try:
-                content = go_mod.read_text()
-                match = re.search(r'go\s+(\d+\.\d+)', content)
+    
+    # Read go.mod to get Go version
+    go_mod = dir_path / "go.mod"
+    if "go.mod" in markers:
+        try:
+            content = go_mod.read_text()
+            match = re.search(r'go\s+(\d+\.\d+)', content)
+            if match:
+                detection_results["runtime_versions"]["go"] = match.group(1)
+        except Exception:
+            pass
+    
+    # Read Dockerfile to detect base image
+    dockerfile = dir_path / "Dockerfile"
+    if "Dockerfile" in markers:
+        try:
+            content = dockerfile.read_text()
+            # Detect common base images
+            if "FROM node" in content or "FROM node:" in content:
+                match = re.search(r'FROM node:?(\S+)', content)
                 if match:
-                    detection_results["runtime_versions"]["go"] = match.group(1)
-            except Exception:
-                pass
+                    detection_results["runtime_versions"]["node_docker"] = match.group(1)
+            elif "FROM python" in content or "FROM python:" in content:
+                match = re.search(r'FROM python:?(\S+)', content)
+                if match:
+                    detection_results["runtime_versions"]["python_docker"] = match.group(1)
+        except Exception:
+            pass
+    
+    # Determine main deployment method
+    if detection_results["package_managers"] or detection_results["frameworks"]:
+        detection_results["detected"] = True
+        # Infer deployment method based on detected package managers
+        if "npm" in detection_results["package_managers"] or "yarn" in detection_results["package_managers"] or "pnpm" in detection_results["package_managers"]:
+            detection_results["deployment_methods"].append("npm")
+        if "pip" in detection_results["package_managers"] or "pipenv" in detection_results["package_managers"] or "poetry" in detection_results["package_managers"]:
+            detection_results["deployment_methods"].append("python")
+        if "maven" in detection_results["package_managers"] or "gradle" in detection_results["package_managers"]:
+            detection_results["deployment_methods"].append("java")
+        if "go" in detection_results["package_managers"]:
+            detection_results["deployment_methods"].append("go")
+        if "docker" in detection_results["package_managers"]:
+            detection_results["deployment_methods"].append("docker")
+    
+    # If nothing detected, return unknown
+    if not detection_results["detected"]:
+        detection_results["deployment_methods"].append("unknown")
+    
+    return detection_results
+
+
+def _analyze_stack_directory_cached(dir_path: Path, markers: Optional[Dict[str, Tuple[int, int]]] = None
+                                    ) -> Tuple[Dict[str, Any], bool]:
+    """
+    Analyze a directory, reusing the previous result while its marker files keep the same mtime and size
+
+    Returns:
+        (result, cache_hit)
+    """
+    if markers is None:
+        markers, _ = _scan_stack_markers(str(dir_path))
+    key = str(dir_path)
+    fingerprint = tuple(sorted(markers.items()))
+    with _stack_analysis_lock:
+        cached = _stack_analysis_cache.get(key)
+        if cached is not None and cached[0] == fingerprint:
+            _stack_analysis_cache.move_to_end(key)
+            return json.loads(json.dumps(cached[1])), True
+    result = _analyze_stack_directory(dir_path, markers)
+    with _stack_analysis_lock:
+        _stack_analysis_cache[key] = (fingerprint, result)
+        _stack_analysis_cache.move_to_end(key)
+        while len(_stack_analysis_cache) > STACK_ANALYSIS_CACHE_SIZE:
+            _stack_analysis_cache.popitem(last=False)
+    return json.loads(json.dumps(result)), False
+
+
+def _discover_projects(root: Path, max_depth: int, apply_ignore_rules: bool) -> Dict[str, Any]:
+    """
+    Find every directory under root that contains stack marker files. Each level of the tree is listed in
+    parallel; ignored directories (see _DirectoryWalker) and directories deeper than max_depth are pruned.
+    """
+    walker = _DirectoryWalker(str(root), max_depth, apply_ignore_rules)
+    level = [(str(root), '', walker._extend_rules(str(root), '', []))]
+    found = []
+    scanned = 0
+    with ThreadPoolExecutor(max_workers=STACK_DISCOVERY_WORKERS) as executor:
+        depth = 0
+        while level:
+            listings = list(executor.map(lambda item: _scan_stack_markers(item[0]), level))
+            scanned += len(level)
+            next_level = []
+            for (directory, rel_dir, rules), (markers, entries) in zip(level, listings):
+                if markers:
+                    found.append((directory, rel_dir, markers))
+                if depth >= max_depth:
+                    continue
+                for name, is_dir, is_symlink in sorted(entries):
+                    if not is_dir or is_symlink:
+                        continue
+                    rel_path = f'{rel_dir}/{name}' if rel_dir else name
+                    if walker._is_ignored(name, rel_path, True, rules):
+                        walker.ignored += 1
+                        continue
+                    child = os.path.join(directory, name)
+                    next_level.append((child, rel_path, walker._extend_rules(child, rel_path, rules)))
+            level = next_level
+            depth += 1
+
+        analyses = list(executor.map(lambda item: _analyze_stack_directory_cached(Path(item[0]), item[2]), found))
+
+    projects = []
+    for (_, rel_dir, _), (result, _) in zip(found, analyses):
+        result["relative_path"] = rel_dir or '.'
+        projects.append(result)
+    projects.sort(key=lambda project: project["relative_path"])
+    return {
+        "projects": projects,
+        "cache_hits": sum(1 for _, cache_hit in analyses if cache_hit),
+        "scanned_directories": scanned,
+        "ignored": walker.ignored,
+    }
+
+
+@tools.append
+def LOCAL_AnalyzeDeployStack(
+    directory: str = Field(description="Directory path to analyze (absolute or relative path)"),
+    discover: bool = Field(description="Recursively discover all sub-projects (monorepo) and analyze each of them", default=False),
+    max_depth: int = Field(description="Maximum directory depth searched when discover is true", default=STACK_DISCOVERY_DEFAULT_DEPTH),
+    apply_ignore_rules: bool = Field(description="When discovering, skip .gitignore matches and dependency/VCS directories like node_modules and .git", default=True)
+):
+    """识别项目部署方式和技术栈。支持识别 npm、Python、Java、Go、Docker 等部署方式。discover=True 时递归发现 monorepo 中的所有子项目并分别识别（projects）。结果按标记文件的修改时间和大小缓存，未变化的目录不会重复分析。"""
+    logger.info(f"[AnalyzeDeployStack] Input parameters: directory={directory}, discover={discover}")
+    try:
+        dir_path = _validate_path(directory)
         
-        # Read Dockerfile to detect base image
-        dockerfile = dir_path / "Dockerfile"
-        if dockerfile.exists():
-            try:
-                content = dockerfile.read_text()
-                # Detect common base images
-                if "FROM node" in content or "FROM node:" in content:
-                    match = re.search(r'FROM node:?(\S+)', content)
-                    if match:
-                        detection_results["runtime_versions"]["node_docker"] = match.group(1)
-                elif "FROM python" in content or "FROM python:" in content:
-                    match = re.search(r'FROM python:?(\S+)', content)
-                    if match:
-                        detection_results["runtime_versions"]["python_docker"] = match.group(1)
-            except Exception:
-                pass
+        if not dir_path.is_dir():
+            raise ValueError(f"路径不是目录: {directory}")
         
-        # Determine main deployment method
-        if detection_results["package_managers"] or detection_results["frameworks"]:
-            detection_results["detected"] = True
-            # Infer deployment method based on detected package managers
-            if "npm" in detection_results["package_managers"] or "yarn" in detection_results["package_managers"] or "pnpm" in detection_results["package_managers"]:
-                detection_results["deployment_methods"].append("npm")
-            if "pip" in detection_results["package_managers"] or "pipenv" in detection_results["package_managers"] or "poetry" in detection_results["package_managers"]:
-                detection_results["deployment_methods"].append("python")
-            if "maven" in detection_results["package_managers"] or "gradle" in detection_results["package_managers"]:
-                detection_results["deployment_methods"].append("java")
-            if "go" in detection_results["package_managers"]:
-                detection_results["deployment_methods"].append("go")
-            if "docker" in detection_results["package_managers"]:
-                detection_results["deployment_methods"].append("docker")
+        detection_results, cache_hit = _analyze_stack_directory_cached(dir_path)
+        detection_results["cached"] = cache_hit
         
-        # If nothing detected, return unknown
-        if not detection_results["detected"]:
-            detection_results["deployment_methods"].append("unknown")
+        if discover is True:
+            detection_results.update(_discover_projects(dir_path, max(max_depth, 0), apply_ignore_rules))
         
         logger.info(f"[IdentifyDeploymentMethod] Response: {json.dumps(detection_results, ensure_ascii=False, default=str)}")
         return detection_results
     except Exception as e:
         raise ValueError(f"Failed to identify deployment method: {str(e)}")
 
+
+# Artifact packaging
+PACKAGE_FORMATS = {'.tar.gz': 'tar.gz', '.tgz': 'tar.gz', '.zip': 'zip'}
+# Fixed entry timestamp (1980-01-01, the earliest time a zip entry can hold) so rebuilds hash the same
+PACKAGE_ENTRY_MTIME = 315532800
+PACKAGE_GZIP_BLOCK_SIZE = 1024 * 1024
+PACKAGE_GZIP_LEVEL = 6
+PACKAGE_MAX_WORKERS = 8
+PACKAGE_ALWAYS_EXCLUDED = ['.code_deploy/']
+PACKAGE_COPY_CHUNK_SIZE = 1024 * 1024
+BUILD_CACHE_VERSION = 1
+# Files modified this close to the last stat snapshot may have changed within one mtime tick, so they are rehashed
+BUILD_CACHE_RACY_NS = 2 * 10 ** 9
+_build_cache_lock = threading.Lock()
+
+
+# Fixed gzip header: no file name, mtime 0 and OS "unknown", so the bytes only depend on the content
+GZIP_HEADER = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff'
+# Deflate window; each block is primed with this much of the data before it
+GZIP_WINDOW_SIZE = 32 * 1024
+
+
+def _deflate_block(block: bytes, dictionary: bytes, level: int, last: bool) -> bytes:
+    """
+    Raw-deflate one block. Blocks other than the last end with a sync flush (byte aligned, no final bit), so the
+    outputs concatenate into one continuous deflate stream; the dictionary lets matches reach into the previous
+    block exactly as in a single-threaded stream.
+    """
+    if dictionary:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=dictionary)
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(block) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+class _ParallelGzipWriter:
+    """
+    Write-only file object producing a single-member gzip stream, with the stream cut into fixed-size blocks that
+    are deflated on a thread pool (the pigz layout). Readers see an ordinary gzip file, including streaming readers
+    such as tarfile 'r|gz', and the output is the same for any number of workers.
+    """
+
+    def __init__(self, fileobj, workers: int, block_size: int = PACKAGE_GZIP_BLOCK_SIZE,
+                 level: int = PACKAGE_GZIP_LEVEL):
+        self._fileobj = fileobj
+        self._block_size = block_size
+        self._level = level
+        self._buffer = bytearray()
+        self._dictionary = b''
+        self._pending = deque()
+        # Bound the blocks held in memory while earlier ones are still compressing
+        self._max_pending = workers * 2
+        self._executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+        self._crc = 0
+        self.bytes_in = 0
+        self._fileobj.write(GZIP_HEADER)
+
+    def write(self, data) -> int:
+        self._buffer += data
+        self.bytes_in += len(data)
+        while len(self._buffer) >= self._block_size:
+            self._submit(bytes(self._buffer[:self._block_size]), last=False)
+            del self._buffer[:self._block_size]
+        return len(data)
+
+    def _submit(self, block: bytes, last: bool):
+        # The checksum has to run in stream order, it is cheap next to deflate
+        self._crc = zlib.crc32(block, self._crc)
+        dictionary = self._dictionary
+        self._dictionary = (dictionary + block)[-GZIP_WINDOW_SIZE:]
+        if self._executor is None:
+            self._fileobj.write(_deflate_block(block, dictionary, self._level, last))
+            return
+        self._pending.append(self._executor.submit(_deflate_block, block, dictionary, self._level, last))
+        while len(self._pending) >= self._max_pending:
+            self._fileobj.write(self._pending.popleft().result())
+
+    def close(self):
+        try:
+            self._submit(bytes(self._buffer), last=True)
+            self._buffer.clear()
+            while self._pending:
+                self._fileobj.write(self._pending.popleft().result())
+            self._fileobj.write(struct.pack('<II', self._crc, self.bytes_in & 0xffffffff))
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _package_entries(source: Path, apply_ignore_rules: bool, exclude_patterns: Optional[List[str]]
+                     ) -> Tuple[List[Tuple[str, str, os.stat_result, Optional[str]]], _DirectoryWalker]:
+    """
+    Collect (relative_path, kind, stat, link_target) for every entry to package, kind being dir, file or symlink.
+    Entries come out in walker order (sorted by name per directory), which fixes the archive order.
+    """
+    walker = _DirectoryWalker(str(source), None, apply_ignore_rules,
+                              PACKAGE_ALWAYS_EXCLUDED + list(exclude_patterns or []))
+    entries = []
+    for entry, rel_path, _, is_dir in walker.walk():
+        try:
+            st = entry.stat(follow_symlinks=False)
+            if entry.is_symlink():
+                entries.append((rel_path, 'symlink', st, os.readlink(entry.path)))
+            elif is_dir:
+                entries.append((rel_path, 'dir', st, None))
+            elif stat.S_ISREG(st.st_mode):
+                entries.append((rel_path, 'file', st, None))
+            else:
+                # Sockets, FIFOs and device files cannot be deployed
+                walker.ignored += 1
+        except OSError:
+            walker.errors += 1
+    return entries, walker
+
+
+def _normalized_mode(kind: str, st: os.stat_result) -> int:
+    if kind == 'symlink':
+        return 0o777
+    if kind == 'dir' or st.st_mode & 0o111:
+        return 0o755
+    return 0o644
+
+
+def _write_tar_package(fileobj, source: Path, entries: List, prefix: str):
+    with tarfile.open(fileobj=fileobj, mode='w|', format=tarfile.PAX_FORMAT) as tar:
+        for rel_path, kind, st, link_target in entries:
+            info = tarfile.TarInfo(prefix + rel_path)
+            info.mtime = PACKAGE_ENTRY_MTIME
+            info.mode = _normalized_mode(kind, st)
+            info.uid = info.gid = 0
+            info.uname = info.gname = ''
+            if kind == 'dir':
+                info.type = tarfile.DIRTYPE
+                tar.addfile(info)
+            elif kind == 'symlink':
+                info.type = tarfile.SYMTYPE
+                info.linkname = link_target
+                tar.addfile(info)
+            else:
+                info.size = st.st_size
+                with open(source / rel_path, 'rb') as f:
+                    tar.addfile(info, f)
+
+
+def _write_zip_package(fileobj, source: Path, entries: List, prefix: str):
+    date_time = time.gmtime(PACKAGE_ENTRY_MTIME)[:6]
+    with zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED, compresslevel=PACKAGE_GZIP_LEVEL) as zf:
+        for rel_path, kind, st, link_target in entries:
+            info = zipfile.ZipInfo(prefix + rel_path + ('/' if kind == 'dir' else ''), date_time)
+            info.create_system = 3
+            file_type = {'dir': stat.S_IFDIR, 'symlink': stat.S_IFLNK, 'file': stat.S_IFREG}[kind]
+            info.external_attr = (file_type | _normalized_mode(kind, st)) << 16
+            if kind == 'dir':
+                info.external_attr |= 0x10
+                zf.writestr(info, b'')
+            elif kind == 'symlink':
+                zf.writestr(info, link_target)
+            else:
+                info.compress_type = zipfile.ZIP_DEFLATED
+                info.file_size = st.st_size
+                with open(source / rel_path, 'rb') as src, zf.open(info, 'w') as dest:
+                    shutil.copyfileobj(src, dest, PACKAGE_COPY_CHUNK_SIZE)
+
+
+def _sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(PACKAGE_COPY_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _load_build_cache() -> Dict[str, Any]:
+    try:
+        with open(get_build_cache_path(), 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if isinstance(cache, dict) and cache.get('version') == BUILD_CACHE_VERSION:
+            return cache
+    except (OSError, ValueError):
+        pass
+    return {'version': BUILD_CACHE_VERSION, 'artifacts': {}, 'trees': {}}
+
+
+def _update_build_cache(update):
+    """Apply update(cache) to the on-disk build cache and write it back atomically"""
+    with _build_cache_lock:
+        cache = _load_build_cache()
+        update(cache)
+        path = get_build_cache_path()
+        temp_path = path.with_name(f'.{path.name}.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f)
+        os.replace(temp_path, path)
+
+
+def _fingerprint_tree(root: Path, apply_ignore_rules: bool, exclude_patterns: List[str], options: Dict[str, Any]
+                      ) -> Tuple[str, Dict[str, Any]]:
+    """
+    Content fingerprint of every entry the walker keeps under root, mixed with the packaging options. File hashes
+    are reused from the previous snapshot when size and mtime are unchanged (and the mtime is not racy), otherwise
+    the file is rehashed, so touching a file without changing it keeps the fingerprint.
+    """
+    with _build_cache_lock:
+        snapshot = _load_build_cache()['trees'].get(str(root)) or {}
+    previous = snapshot.get('files', {})
+    trusted_before = snapshot.get('written_ns', 0) - BUILD_CACHE_RACY_NS
+    snapshot_ns = time.time_ns()
+
+    entries, walker = _package_entries(root, apply_ignore_rules, exclude_patterns)
+    files = {}
+    to_hash = []
+    for rel_path, kind, st, _ in entries:
+        if kind != 'file':
+            continue
+        cached = previous.get(rel_path)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns and st.st_mtime_ns < trusted_before:
+            files[rel_path] = cached
+        else:
+            to_hash.append((rel_path, st))
+    if to_hash:
+        with ThreadPoolExecutor(max_workers=PACKAGE_MAX_WORKERS) as executor:
+            digests = list(executor.map(lambda item: _sha256_file(root / item[0]), to_hash))
+        for (rel_path, st), digest in zip(to_hash, digests):
+            files[rel_path] = [st.st_size, st.st_mtime_ns, digest]
+
+    digest = hashlib.sha256(json.dumps(options, sort_keys=True).encode('utf-8'))
+    for rel_path, kind, st, link_target in entries:
+        value = files[rel_path][2] if kind == 'file' else link_target or ''
+        digest.update(f'{rel_path}\0{kind}\0{_normalized_mode(kind, st):o}\0{value}\n'.encode('utf-8', 'surrogateescape'))
+
+    def save_snapshot(cache):
+        cache['trees'][str(root)] = {'written_ns': snapshot_ns, 'files': files}
+    _update_build_cache(save_snapshot)
+    return digest.hexdigest(), {'files': len(files), 'hashed_files': len(to_hash), 'ignored': walker.ignored}
+
+
+def _cached_artifact(output_name: str, artifact_path: Path, fingerprint: str) -> Optional[Dict[str, Any]]:
+    """The recorded response for output_name if it was built from fingerprint and the file is still untouched"""
+    with _build_cache_lock:
+        record = _load_build_cache()['artifacts'].get(output_name)
+    if not record or record.get('fingerprint') != fingerprint:
+        return None
+    try:
+        st = artifact_path.stat()
+    except OSError:
+        return None
+    if st.st_size != record.get('size') or st.st_mtime_ns != record.get('mtime_ns'):
+        return None
+    return dict(record['response'])
+
+
+@tools.append
+def LOCAL_PackageArtifact(
+    source_directory: str = Field(description="Directory to package, e.g. the project root or a build output directory such as dist"),
+    output_name: str = Field(description="Artifact file name ending with .tar.gz, .tgz or .zip, e.g. 'app.tar.gz'"),
+    project_path: Optional[str] = Field(description="Project root whose .code_deploy/release directory receives the artifact. Defaults to fingerprint_directory if set, else source_directory", default=None),
+    root_directory: Optional[str] = Field(description="Top-level directory name inside the archive. Entries are stored at the archive root if not set", default=None),
+    apply_ignore_rules: bool = Field(description="Skip .gitignore matches and common dependency/VCS directories (.git, node_modules, target, __pycache__, .venv ...)", default=True),
+    exclude_patterns: Optional[List[str]] = Field(description="Additional .gitignore-style patterns to exclude, e.g. ['*.log', 'tests/']", default=None),
+    compression_workers: Optional[int] = Field(description=f"Threads used for tar.gz compression, defaults to the CPU count (at most {PACKAGE_MAX_WORKERS})", default=None),
+    fingerprint_directory: Optional[str] = Field(description="Source tree whose content keys the build cache, e.g. the project root when packaging a build output directory. Defaults to source_directory", default=None),
+    use_cache: bool = Field(description="Return the previously packaged artifact when the source tree fingerprint is unchanged", default=True),
+    check_only: bool = Field(description="Only check the build cache without packaging. Call before building: if cached is true the build and packaging can be skipped", default=False)
+):
+    """将本地目录打包为部署产物（tar.gz 或 zip），直接写入项目 .code_deploy/release 目录，无需调用 tar 命令。默认跳过 .gitignore 匹配项和 node_modules、.git 等目录；tar.gz 使用多线程分块压缩（标准 gzip 格式，tar -xzf 可直接解压）；产物可复现：条目按名称排序、时间戳固定、属主为 0、权限归一为 644/755，相同内容多次打包的哈希一致。按源码目录（fingerprint_directory）的内容指纹缓存产物，源码未变化时直接返回已有产物（cached=True）；构建前可用 check_only=True 检查缓存，命中时跳过构建。返回 artifact_path 可直接用于 OOS_CodeDeploy。"""
+    logger.info(f"[PackageArtifact] Input parameters: source_directory={source_directory}, output_name={output_name}, "
+                f"project_path={project_path}, root_directory={root_directory}, apply_ignore_rules={apply_ignore_rules}, "
+                f"exclude_patterns={exclude_patterns}, compression_workers={compression_workers}, "
+                f"fingerprint_directory={fingerprint_directory}, use_cache={use_cache}, check_only={check_only}")
+    try:
+        if os.path.basename(output_name) != output_name:
+            raise ValueError(f"output_name must be a file name without directories: {output_name}")
+        archive_format = next((fmt for suffix, fmt in PACKAGE_FORMATS.items() if output_name.endswith(suffix)), None)
+        if archive_format is None:
+            raise ValueError(f"Unsupported artifact type, expected one of {', '.join(PACKAGE_FORMATS)}: {output_name}")
+        use_cache = use_cache is not False
+        check_only = check_only is True
+        if check_only and not use_cache:
+            raise ValueError("check_only requires use_cache")
+        exclude_patterns = list(exclude_patterns) if isinstance(exclude_patterns, list) else []
+        prefix = root_directory.strip('/') + '/' if root_directory and root_directory.strip('/') else ''
+        workers = compression_workers if isinstance(compression_workers, int) and compression_workers > 0 \
+            else min(os.cpu_count() or 1, PACKAGE_MAX_WORKERS)
+
+        # The build output may not exist yet when only checking the cache before a build
+        source = Path(source_directory).resolve() if check_only else _validate_path(source_directory)
+        if not check_only and not source.is_dir():
+            raise ValueError(f"Source is not a directory: {source_directory}")
+        fingerprint_root = _validate_path(fingerprint_directory) if fingerprint_directory else source
+        set_project_path(project_path or str(fingerprint_root))
+        artifact_path = get_release_path(output_name)
+        started = time.monotonic()
+
+        fingerprint = None
+        if use_cache:
+            fingerprint_excludes = list(exclude_patterns)
+            if fingerprint_root != source and fingerprint_root in source.parents:
+                # Build output inside the source tree changes on every build, keep it out of the fingerprint
+                fingerprint_excludes.append('/' + source.relative_to(fingerprint_root).as_posix() + '/')
+            options = {
+                'format': archive_format,
+                'root_directory': prefix,
+                'source': source.relative_to(fingerprint_root).as_posix() if source.is_relative_to(fingerprint_root)
+                else str(source),
+                'apply_ignore_rules': apply_ignore_rules is not False,
+                'exclude_patterns': exclude_patterns,
+            }
+            fingerprint, fingerprint_stats = _fingerprint_tree(
+                fingerprint_root, apply_ignore_rules is not False, fingerprint_excludes, options)
+            cached = _cached_artifact(output_name, artifact_path, fingerprint)
+            if cached is not None or check_only:
+                response = cached or {"artifact_path": None}
+                response.update({
+                    "cached": cached is not None,
+                    "fingerprint": fingerprint,
+                    "fingerprint_stats": fingerprint_stats,
+                    "pruned_releases": 0,
+                    "duration": round(time.monotonic() - started, 3),
+                })
+                logger.info(f"[PackageArtifact] Cache {'hit' if cached else 'miss'}: {output_name} {fingerprint}")
+                return response
+
+        entries, walker = _package_entries(source, apply_ignore_rules is not False, exclude_patterns)
+
+        # Write next to the final path and rename, so a failed run never leaves a truncated artifact behind
+        fd, temp_name = tempfile.mkstemp(prefix=f'.{output_name}.', dir=str(artifact_path.parent))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                if archive_format == 'zip':
+                    _write_zip_package(f, source, entries, prefix)
+                else:
+                    writer = _ParallelGzipWriter(f, workers)
+                    try:
+                        _write_tar_package(writer, source, entries, prefix)
+                    finally:
+                        writer.close()
+            os.chmod(temp_name, 0o644)
+            os.replace(temp_name, artifact_path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(temp_name)
+            raise
+        pruned = prune_release_dir(settings.code_deploy_release_retention, exclude=artifact_path)
+
+        files = [entry for entry in entries if entry[1] == 'file']
+        artifact_stat = artifact_path.stat()
+        response = {
+            "artifact_path": str(artifact_path),
+            "format": archive_format,
+            "size": artifact_stat.st_size,
+            "sha256": _sha256_file(artifact_path),
+            "files": len(files),
+            "directories": sum(1 for entry in entries if entry[1] == 'dir'),
+            "symlinks": sum(1 for entry in entries if entry[1] == 'symlink'),
+            "source_bytes": sum(entry[2].st_size for entry in files),
+            "ignored": walker.ignored,
+            "errors": walker.errors,
+            "compression_workers": workers if archive_format == 'tar.gz' else 1,
+        }
+        if fingerprint:
+            record = {'fingerprint': fingerprint, 'size': artifact_stat.st_size,
+                      'mtime_ns': artifact_stat.st_mtime_ns, 'response': dict(response)}
+
+            def save_artifact(cache):
+                cache['artifacts'][output_name] = record
+            _update_build_cache(save_artifact)
+            response["fingerprint_stats"] = fingerprint_stats
+        response.update({
+            "cached": False,
+            "fingerprint": fingerprint,
+            "pruned_releases": len(pruned),
+            "duration": round(time.monotonic() - started, 3),
+        })
+        logger.info(f"[PackageArtifact] Response: {json.dumps(response, ensure_ascii=False)}")
+        return response
+    except Exception as e:
+        raise ValueError(f"Failed to package artifact: {str(e)}")
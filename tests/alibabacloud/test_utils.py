@@ -1,9 +1,20 @@
+import pytest
 from unittest.mock import patch, MagicMock
 from alibaba_cloud_ops_mcp_server.alibabacloud import utils
 import tempfile
 import os
 import json
 
+
+@pytest.fixture(autouse=True)
+def isolate_code_deploy_state(tmp_path):
+    """每个用例使用独立的项目目录和空的 bucket 缓存"""
+    utils.set_project_path(str(tmp_path))
+    utils._code_deploy_bucket_cache.clear()
+    yield
+    utils._code_deploy_bucket_cache.clear()
+    utils.set_project_path(None)
+
 def test_create_config():
     with patch('alibaba_cloud_ops_mcp_server.alibabacloud.utils.CredClient') as mock_cred, \
          patch('alibaba_cloud_ops_mcp_server.alibabacloud.utils.Config') as mock_cfg:
@@ -190,6 +201,131 @@ def test_get_release_path():
         utils.set_project_path(None)
 
 
+def test_stage_release_file_links_and_reuses():
+    """测试 release 目录暂存：首次链接/复制，内容相同时跳过"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        utils.set_project_path(tmpdir)
+
+        src = os.path.join(tmpdir, 'app.tar.gz')
+        with open(src, 'wb') as f:
+            f.write(b'artifact')
+
+        release_path, method = utils.stage_release_file(src)
+        assert method in ('reflink', 'hardlink', 'copy')
+        assert release_path.read_bytes() == b'artifact'
+
+        release_path_again, method_again = utils.stage_release_file(src)
+        assert release_path_again == release_path
+        assert method_again == 'existing'
+        utils.set_project_path(None)
+
+
+def test_stage_release_file_fallback_to_copy():
+    """测试 reflink 不可用时回退为复制，不与构建产物共享 inode"""
+    with tempfile.TemporaryDirectory() as tmpdir, \
+         patch('alibaba_cloud_ops_mcp_server.alibabacloud.utils._reflink_file', return_value=False):
+        utils.set_project_path(tmpdir)
+
+        src = os.path.join(tmpdir, 'app.jar')
+        with open(src, 'wb') as f:
+            f.write(b'jar')
+
+        release_path, method = utils.stage_release_file(src)
+        assert method == 'copy'
+        assert release_path.read_bytes() == b'jar'
+        assert not os.path.samefile(src, release_path)
+
+        # 构建产物原地重写不会影响已暂存的 release 文件
+        with open(src, 'r+b') as f:
+            f.write(b'JAR')
+        assert release_path.read_bytes() == b'jar'
+        utils.set_project_path(None)
+
+
+def test_stage_release_file_breaks_hardlink_alias():
+    """测试 release 文件与构建产物是同一 inode 时重新复制"""
+    with tempfile.TemporaryDirectory() as tmpdir, \
+         patch('alibaba_cloud_ops_mcp_server.alibabacloud.utils._reflink_file', return_value=False):
+        utils.set_project_path(tmpdir)
+
+        src = os.path.join(tmpdir, 'app.tar.gz')
+        with open(src, 'wb') as f:
+            f.write(b'artifact')
+        os.link(src, utils.get_release_path('app.tar.gz'))
+
+        release_path, method = utils.stage_release_file(src)
+        assert method == 'copy'
+        assert not os.path.samefile(src, release_path)
+        utils.set_project_path(None)
+
+
+def test_stage_release_file_hardlinks_within_release_dir():
+    """测试源文件已在 release 目录下时才使用硬链接"""
+    with tempfile.TemporaryDirectory() as tmpdir, \
+         patch('alibaba_cloud_ops_mcp_server.alibabacloud.utils._reflink_file', return_value=False):
+        utils.set_project_path(tmpdir)
+
+        src = utils.get_release_path('build') / 'app.tar.gz'
+        src.parent.mkdir()
+        src.write_bytes(b'artifact')
+
+        release_path, method = utils.stage_release_file(src)
+        assert method == 'hardlink'
+        assert os.path.samefile(src, release_path)
+        utils.set_project_path(None)
+
+
+def test_stage_release_file_records_staging_time():
+    """测试暂存文件的 mtime 为暂存时间，清理按暂存顺序保留"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        utils.set_project_path(tmpdir)
+
+        # 较新的构建产物先暂存，较旧的构建产物后暂存
+        newer = os.path.join(tmpdir, 'app-newer.tar.gz')
+        older = os.path.join(tmpdir, 'app-older.tar.gz')
+        for path, mtime in ((newer, 2000), (older, 1000)):
+            with open(path, 'wb') as f:
+                f.write(path.encode())
+            os.utime(path, (mtime, mtime))
+
+        newer_release, _ = utils.stage_release_file(newer)
+        os.utime(newer_release, (3000, 3000))
+        older_release, _ = utils.stage_release_file(older)
+        assert older_release.stat().st_mtime > 3000
+
+        removed = utils.prune_release_dir(1)
+        assert removed == [str(newer_release)]
+        assert older_release.exists()
+
+        # 重新部署相同内容时刷新暂存时间
+        os.utime(older_release, (3000, 3000))
+        _, method = utils.stage_release_file(older)
+        assert method == 'existing'
+        assert older_release.stat().st_mtime > 3000
+        utils.set_project_path(None)
+
+
+def test_prune_release_dir():
+    """测试按保留数量清理旧的 release 文件"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        utils.set_project_path(tmpdir)
+        paths = []
+        for i in range(4):
+            path = utils.get_release_path(f'app-{i}.tar.gz')
+            path.write_bytes(b'x')
+            os.utime(path, (1000 + i, 1000 + i))
+            paths.append(path)
+
+        # 当前产物是最旧的文件，也不能被删除
+        removed = utils.prune_release_dir(2, exclude=paths[0])
+        assert sorted(removed) == sorted([str(paths[1]), str(paths[2])])
+        assert paths[0].exists()
+        assert paths[3].exists()
+
+        assert utils.prune_release_dir(0) == []
+        utils.set_project_path(None)
+
+
 def test_create_client():
     """测试创建 OOS 客户端"""
     with patch('alibaba_cloud_ops_mcp_server.alibabacloud.utils.create_config') as mock_create_config, \
@@ -290,4 +426,59 @@ def test_get_or_create_bucket_for_code_deploy_create_new():
         result = utils.get_or_create_bucket_for_code_deploy('test-app')
         assert result.startswith('code-deploy-')
         mock_client.put_bucket.assert_called_once()
-        mock_tag.assert_called_once() 
\ No newline at end of file
+        mock_tag.assert_called_once() 
+
+
+def test_get_or_create_bucket_for_code_deploy_uses_persisted_bucket():
+    """测试持久化的 bucket 校验通过后直接复用，不再按 tag 列举"""
+    utils.save_application_info({'code_deploy_buckets': {'default': 'persisted-bucket'}})
+    with patch('alibaba_cloud_ops_mcp_server.alibabacloud.utils.create_oss_client') as mock_create_client, \
+         patch('alibaba_cloud_ops_mcp_server.alibabacloud.utils.find_bucket_by_tag') as mock_find:
+        mock_client = MagicMock()
+        mock_create_client.return_value = mock_client
+
+        assert utils.get_or_create_bucket_for_code_deploy('test-app') == 'persisted-bucket'
+        mock_client.get_bucket_info.assert_called_once()
+        mock_find.assert_not_called()
+
+        # 进程内缓存命中时不再校验
+        assert utils.get_or_create_bucket_for_code_deploy('test-app') == 'persisted-bucket'
+        mock_client.get_bucket_info.assert_called_once()
+
+
+def test_get_or_create_bucket_for_code_deploy_invalid_persisted_bucket():
+    """测试持久化的 bucket 校验失败时回退到按 tag 查找，并更新缓存"""
+    utils.save_application_info({'code_deploy_buckets': {'default': 'deleted-bucket'}})
+    with patch('alibaba_cloud_ops_mcp_server.alibabacloud.utils.create_oss_client') as mock_create_client, \
+         patch('alibaba_cloud_ops_mcp_server.alibabacloud.utils.find_bucket_by_tag') as mock_find:
+        mock_client = MagicMock()
+        mock_client.get_bucket_info.side_effect = Exception('NoSuchBucket')
+        mock_create_client.return_value = mock_client
+        mock_find.return_value = 'tagged-bucket'
+
+        assert utils.get_or_create_bucket_for_code_deploy('test-app') == 'tagged-bucket'
+        assert utils.load_application_info()['code_deploy_buckets']['default'] == 'tagged-bucket'
+
+
+def test_get_or_create_bucket_for_code_deploy_other_region():
+    """测试非默认地域使用独立的 tag 和缓存 key"""
+    with patch('alibaba_cloud_ops_mcp_server.alibabacloud.utils.create_oss_client') as mock_create_client, \
+         patch('alibaba_cloud_ops_mcp_server.alibabacloud.utils.find_bucket_by_tag') as mock_find:
+        mock_create_client.return_value = MagicMock()
+        mock_find.return_value = 'shanghai-bucket'
+
+        assert utils.get_or_create_bucket_for_code_deploy('test-app', 'cn-shanghai') == 'shanghai-bucket'
+        mock_create_client.assert_called_once_with(region_id='cn-shanghai')
+        assert mock_find.call_args.args[1:] == ('app_management', 'code_deploy-cn-shanghai')
+        assert utils.load_application_info()['code_deploy_buckets'] == {'default:cn-shanghai': 'shanghai-bucket'}
+
+
+def test_code_deploy_account_key_hides_access_key():
+    """测试账号标识不直接保存 AccessKeyId"""
+    with patch('alibaba_cloud_ops_mcp_server.alibabacloud.utils.get_credentials_from_header') as mock_get_creds:
+        mock_get_creds.return_value = {'AccessKeyId': 'LTAI-test', 'AccessKeySecret': 's', 'SecurityToken': None}
+        key = utils._code_deploy_account_key()
+        assert key != 'LTAI-test' and len(key) == 16
+        mock_get_creds.return_value = None
+        assert utils._code_deploy_account_key() == 'default'
+
@@ -1,6 +1,7 @@
 import pytest
 import json
-from unittest.mock import patch, MagicMock
+import asyncio
+from unittest.mock import patch, MagicMock, AsyncMock
 from alibaba_cloud_ops_mcp_server.tools import application_management_tools
 
 
@@ -122,6 +123,19 @@ class TestHelperFunctions:
         
         assert result is False
     
+    def test_check_application_group_exists_application_missing(self):
+        """测试应用不存在时应用分组视为不存在"""
+        mock_client = MagicMock()
+        mock_error = Exception('test')
+        mock_error.code = 'EntityNotExists.Application'
+        mock_client.get_application_group.side_effect = mock_error
+        
+        result = application_management_tools._check_application_group_exists(
+            mock_client, 'nonexistent-app', 'test-group'
+        )
+        
+        assert result is False
+    
     def test_create_deploy_parameters(self):
         """测试创建部署参数"""
         result = application_management_tools._create_deploy_parameters(
@@ -246,63 +260,41 @@ class TestCheckEcsInstancesExist:
         assert missing == []
 
 
-class TestCheckInstanceHasTag:
-    """测试 _check_instance_has_tag 函数"""
-    
-    def test_instance_has_tag(self):
-        """测试实例有标签"""
-        with patch('alibaba_cloud_ops_mcp_server.tools.application_management_tools._describe_instances_with_retry') as mock_describe:
-            mock_response = MagicMock()
-            mock_instance = MagicMock()
-            mock_tag = MagicMock()
-            mock_tag.tag_key = 'app-test'
-            mock_tag.tag_value = 'test-group'
-            mock_instance.tags.tag = [mock_tag]
-            mock_response.body.instances.instance = [mock_instance]
-            mock_describe.return_value = mock_response
-            
-            result = application_management_tools._check_instance_has_tag(
-                'cn-hangzhou', 'i-test123', 'app-test', 'test-group'
-            )
-            
-            assert result is True
-    
-    def test_instance_no_tag(self):
-        """测试实例没有标签"""
-        with patch('alibaba_cloud_ops_mcp_server.tools.application_management_tools._describe_instances_with_retry') as mock_describe:
-            mock_response = MagicMock()
-            mock_instance = MagicMock()
-            mock_instance.tags.tag = []
-            mock_response.body.instances.instance = [mock_instance]
-            mock_describe.return_value = mock_response
-            
-            result = application_management_tools._check_instance_has_tag(
-                'cn-hangzhou', 'i-test123', 'app-test', 'test-group'
-            )
-            
-            assert result is False
-
-
 class TestEnsureInstancesTagged:
     """测试 _ensure_instances_tagged 函数"""
     
+    @staticmethod
+    def _make_instance(instance_id, tags):
+        mock_instance = MagicMock()
+        mock_instance.instance_id = instance_id
+        mock_tags = []
+        for key, value in tags:
+            mock_tag = MagicMock()
+            mock_tag.tag_key = key
+            mock_tag.tag_value = value
+            mock_tags.append(mock_tag)
+        mock_instance.tags.tag = mock_tags
+        return mock_instance
+    
     def test_all_already_tagged(self):
         """测试所有实例已打标签"""
-        with patch('alibaba_cloud_ops_mcp_server.tools.application_management_tools._check_instance_has_tag') as mock_check:
-            mock_check.return_value = True
+        instances = {'i-test123': self._make_instance('i-test123', [('app-test-app', 'test-group')])}
+        with patch('alibaba_cloud_ops_mcp_server.tools.application_management_tools._describe_instances_by_ids') as mock_describe, \
+             patch('alibaba_cloud_ops_mcp_server.tools.application_management_tools.create_ecs_client') as mock_create:
+            mock_describe.return_value = instances
             
             application_management_tools._ensure_instances_tagged(
                 'cn-hangzhou', 'test-app', 'test-group', ['i-test123']
             )
             
             # 不应该调用打标签
-            # 测试通过即可
+            mock_create.assert_not_called()
     
     def test_tag_instances(self):
         """测试给实例打标签"""
-        with patch('alibaba_cloud_ops_mcp_server.tools.application_management_tools._check_instance_has_tag') as mock_check, \
+        with patch('alibaba_cloud_ops_mcp_server.tools.application_management_tools._describe_instances_by_ids') as mock_describe, \
              patch('alibaba_cloud_ops_mcp_server.tools.application_management_tools.create_ecs_client') as mock_create:
-            mock_check.return_value = False
+            mock_describe.return_value = {'i-test123': self._make_instance('i-test123', [])}
             mock_client = MagicMock()
             mock_create.return_value = mock_client
             
@@ -312,6 +304,29 @@ class TestEnsureInstancesTagged:
             
             mock_client.tag_resources.assert_called_once()
     
+    def test_reuses_described_instances(self):
+        """测试复用存在性校验的查询结果，只为缺少标签的实例分批打标签"""
+        instance_ids = [f'i-{i}' for i in range(120)]
+        instances = {
+            instance_id: self._make_instance(
+                instance_id, [('app-test-app', 'test-group')] if i % 2 == 0 else []
+            )
+            for i, instance_id in enumerate(instance_ids)
+        }
+        with patch('alibaba_cloud_ops_mcp_server.tools.application_management_tools._describe_instances_with_retry') as mock_describe, \
+             patch('alibaba_cloud_ops_mcp_server.tools.application_management_tools.create_ecs_client') as mock_create:
+            mock_client = MagicMock()
+            mock_create.return_value = mock_client
+            
+            application_management_tools._ensure_instances_tagged(
+                'cn-hangzhou', 'test-app', 'test-group', instance_ids, instances
+            )
+            
+            mock_describe.assert_not_called()
+            batches = [call.args[0].resource_id for call in mock_client.tag_resources.call_args_list]
+            assert [len(batch) for batch in batches] == [50, 10]
+            assert sum(batches, []) == instance_ids[1::2]
+    
     def test_empty_instance_ids(self):
         """测试空实例 ID 列表"""
         application_management_tools._ensure_instances_tagged(
@@ -320,6 +335,34 @@ class TestEnsureInstancesTagged:
         # 不应该报错
 
 
+class TestDescribeInstancesByIds:
+    """测试 _describe_instances_by_ids 函数"""
+    
+    def test_chunks_requests_by_api_limit(self):
+        """测试按 100 个实例 ID 分批查询"""
+        instance_ids = [f'i-{i}' for i in range(250)]
+        
+        def fake_describe(region_id, request):
+            response = MagicMock()
+            batch = []
+            for instance_id in json.loads(request.instance_ids):
+                mock_instance = MagicMock()
+                mock_instance.instance_id = instance_id
+                batch.append(mock_instance)
+            response.body.instances.instance = batch
+            return response
+        
+        with patch('alibaba_cloud_ops_mcp_server.tools.application_management_tools._describe_instances_with_retry') as mock_describe:
+            mock_describe.side_effect = fake_describe
+            
+            instances = application_management_tools._describe_instances_by_ids('cn-hangzhou', instance_ids)
+            
+            assert mock_describe.call_count == 3
+            assert [len(json.loads(call.args[1].instance_ids)) for call in mock_describe.call_args_list] == [100, 100, 50]
+            assert all(call.args[1].page_size == 100 for call in mock_describe.call_args_list)
+            assert list(instances) == instance_ids
+
+
 class TestListApplicationGroupDeployment:
     """测试 _list_application_group_deployment 函数"""
     
@@ -355,3 +398,1180 @@ class TestListApplicationGroupDeployment:
         
         assert result['status'] == 'Deployed'
         assert result['deploy_execution_info'] is None
+
+
+class TestUploadArtifactIfChanged:
+    """测试 _upload_artifact_if_changed 函数"""
+
+    def test_skip_upload_when_hash_matches(self):
+        """测试 OSS 上已有相同内容时跳过上传"""
+        with patch('alibaba_cloud_ops_mcp_server.tools.application_management_tools.oss_tools') as mock_oss_tools, \
+             patch('alibaba_cloud_ops_mcp_server.tools.application_management_tools.save_application_info') as mock_save:
+            mock_oss_tools.compute_file_crc64.return_value = '12345'
+            mock_oss_tools.head_object_hash.return_value = {'hash_crc64': '12345', 'version_id': 'v-old'}
+
+            version_id, uploaded = application_management_tools._upload_artifact_if_changed(
+                'test-bucket', 'app.tar.gz', '/tmp/app.tar.gz', 'cn-hangzhou'
+            )
+
+            assert version_id == 'v-old'
+            assert uploaded is False
+            mock_oss_tools.OSS_PutObject.assert_not_called()
+            saved = mock_save.call_args[0][0]['last_artifact']
+            assert saved['hash_crc64'] == '12345'
+
+    def test_upload_when_hash_differs(self):
+        """测试内容变化时重新上传"""
+        with patch('alibaba_cloud_ops_mcp_server.tools.application_management_tools.oss_tools') as mock_oss_tools, \
+             patch('alibaba_cloud_ops_mcp_server.tools.application_management_tools.save_application_info'):
+            mock_oss_tools.compute_file_crc64.return_value = '12345'
+            mock_oss_tools.head_object_hash.return_value = {'hash_crc64': '99999', 'version_id': 'v-old'}
+            mock_oss_tools.OSS_PutObject.return_value = {'version_id': 'v-new'}
+
+            version_id, uploaded = application_management_tools._upload_artifact_if_changed(
+                'test-bucket', 'app.tar.gz', '/tmp/app.tar.gz', 'cn-hangzhou'
+            )
+
+            assert version_id == 'v-new'
+            assert uploaded is True
+            mock_oss_tools.OSS_PutObject.assert_called_once()
+
+
+class TestRunPhaseGraph:
+    """测试 _run_phase_graph 函数"""
+    
+    def test_independent_phases_run_concurrently(self):
+        """测试无依赖的阶段并发执行，依赖阶段拿到上游结果"""
+        import threading
+        barrier = threading.Barrier(2, timeout=5)
+        
+        def wait_for_peer(value):
+            def phase(results):
+                barrier.wait()
+                return value
+            return phase
+        
+        results, errors, timings = application_management_tools._run_phase_graph({
+            'a': (wait_for_peer('bucket'), []),
+            'b': (wait_for_peer(True), []),
+            'c': (lambda results: f"{results['a']}/object", ['a']),
+        })
+        
+        assert errors == {}
+        assert results == {'a': 'bucket', 'b': True, 'c': 'bucket/object'}
+        assert set(timings) == {'a', 'b', 'c'}
+    
+    def test_failure_skips_dependents(self):
+        """测试阶段失败时依赖它的阶段不再执行"""
+        error = RuntimeError('boom')
+        called = []
+        
+        def fail(results):
+            raise error
+        
+        results, errors, timings = application_management_tools._run_phase_graph({
+            'a': (fail, []),
+            'b': (lambda results: called.append('b'), ['a']),
+            'c': (lambda results: 'ok', []),
+        })
+        
+        assert errors == {'a': error, 'b': error}
+        assert results == {'c': 'ok'}
+        assert called == []
+        assert 'b' not in timings
+        with pytest.raises(RuntimeError):
+            application_management_tools._get_phase_result(results, errors, 'b')
+    
+    def test_phases_see_header_credentials(self):
+        """测试阶段在线程池中仍能读取当前 HTTP 请求头中的凭证"""
+        from fastmcp.server.http import _current_http_request
+        from alibaba_cloud_ops_mcp_server.alibabacloud.utils import get_credentials_from_header
+        request = MagicMock()
+        request.headers = {'x-acs-accesskey-id': 'ak', 'x-acs-accesskey-secret': 'sk'}
+        
+        token = _current_http_request.set(request)
+        try:
+            results, errors, _ = application_management_tools._run_phase_graph({
+                'a': (lambda results: get_credentials_from_header(), []),
+                'b': (lambda results: get_credentials_from_header(), []),
+            })
+        finally:
+            _current_http_request.reset(token)
+        
+        assert errors == {}
+        assert results['a']['AccessKeyId'] == 'ak'
+        assert results['b']['AccessKeySecret'] == 'sk'
+    
+    def test_unresolvable_dependency(self):
+        """测试依赖不存在的阶段时报错"""
+        with pytest.raises(ValueError):
+            application_management_tools._run_phase_graph({
+                'a': (lambda results: None, ['missing']),
+            })
+
+
+class TestOOSCodeDeploy:
+    """测试 OOS_CodeDeploy 编排流程"""
+    
+    def test_deploy_existing_group_reports_phase_timings(self, tmp_path):
+        """测试前置阶段结果被正确汇总并返回各阶段耗时"""
+        artifact = tmp_path / 'app.tar.gz'
+        artifact.write_bytes(b'artifact')
+        mock_instance = MagicMock()
+        mock_instance.instance_id = 'i-test123'
+        instances = {'i-test123': mock_instance}
+        module = 'alibaba_cloud_ops_mcp_server.tools.application_management_tools'
+        with patch(f'{module}._describe_instances_by_ids', return_value=instances), \
+             patch(f'{module}.get_or_create_bucket_for_code_deploy', return_value='test-bucket'), \
+             patch(f'{module}._upload_artifact_if_changed', return_value=('v1', False)) as mock_upload, \
+             patch(f'{module}._check_application_exists', return_value=True), \
+             patch(f'{module}._check_application_group_exists', return_value=True), \
+             patch(f'{module}._handle_existing_application_group') as mock_handle, \
+             patch(f'{module}.create_client') as mock_create:
+            mock_client = MagicMock()
+            mock_create.return_value = mock_client
+            
+            result = application_management_tools.OOS_CodeDeploy(
+                name='test-app', deploy_region_id='cn-hangzhou', application_group_name='test-group',
+                object_name='app.tar.gz', file_path=str(artifact), deploy_language='python', port=8080,
+                project_path=str(tmp_path), application_start='./start.sh', application_stop='./stop.sh',
+                instance_ids=['i-test123']
+            )
+            
+            assert result['bucket_name'] == 'test-bucket'
+            assert result['artifact_uploaded'] is False
+            assert set(result['phase_timings']) == {
+                'validate_instances', 'discover_bucket', 'upload_artifact',
+                'check_application', 'check_application_group', 'previous_execution', 'deploy'
+            }
+            assert mock_upload.call_args.args[0] == 'test-bucket'
+            assert mock_handle.call_args.args[-2] is instances
+            assert mock_handle.call_args.args[-1] == application_management_tools.DeploymentStrategy()
+            mock_client.deploy_application_group.assert_called_once_with(mock_handle.return_value)
+    
+    def test_missing_instances_returns_error(self, tmp_path):
+        """测试实例不存在时返回错误且不发起部署"""
+        artifact = tmp_path / 'app.tar.gz'
+        artifact.write_bytes(b'artifact')
+        module = 'alibaba_cloud_ops_mcp_server.tools.application_management_tools'
+        with patch(f'{module}._describe_instances_by_ids', return_value={}), \
+             patch(f'{module}.get_or_create_bucket_for_code_deploy', return_value='test-bucket'), \
+             patch(f'{module}._upload_artifact_if_changed', return_value=('v1', True)), \
+             patch(f'{module}._check_application_exists', return_value=True), \
+             patch(f'{module}._check_application_group_exists', return_value=True), \
+             patch(f'{module}.create_client') as mock_create:
+            mock_client = MagicMock()
+            mock_create.return_value = mock_client
+            
+            result = application_management_tools.OOS_CodeDeploy(
+                name='test-app', deploy_region_id='cn-hangzhou', application_group_name='test-group',
+                object_name='app.tar.gz', file_path=str(artifact), deploy_language='python', port=8080,
+                project_path=str(tmp_path), application_start='./start.sh', application_stop='./stop.sh',
+                instance_ids=['i-missing']
+            )
+            
+            assert result['error'] == 'ECS_INSTANCE_NOT_FOUND'
+            assert result['missing_instance_ids'] == ['i-missing']
+            mock_client.deploy_application_group.assert_not_called()
+
+
+class TestOOSCodeDeployMultiTarget:
+    """测试 OOS_CodeDeployMultiTarget 多目标部署"""
+    
+    MODULE = 'alibaba_cloud_ops_mcp_server.tools.application_management_tools'
+    TARGETS = [
+        {'region_id': 'cn-hangzhou', 'application_group_name': 'g-hz', 'instance_ids': ['i-hz']},
+        {'region_id': 'cn-shanghai', 'application_group_name': 'g-sh', 'instance_ids': ['i-sh1']},
+        {'region_id': 'cn-shanghai', 'application_group_name': 'g-sh2', 'instance_ids': ['i-sh2']},
+    ]
+    
+    @pytest.fixture(autouse=True)
+    def oss(self):
+        """跨地域复制相关的 OSS 调用默认成功，目标地域尚无产物"""
+        with patch(f'{self.MODULE}.oss_tools.create_client') as mock_create, \
+             patch(f'{self.MODULE}.oss_tools.head_object_hash', return_value=None), \
+             patch(f'{self.MODULE}._ensure_artifact_replication') as mock_replication, \
+             patch(f'{self.MODULE}._wait_for_replicated_artifact',
+                   return_value={'version_id': 'v-replica'}) as mock_wait_replica:
+            self.oss_client = mock_create.return_value
+            self.mock_replication = mock_replication
+            self.mock_wait_replica = mock_wait_replica
+            yield
+    
+    def _deploy(self, tmp_path, **kwargs):
+        artifact = tmp_path / 'app.tar.gz'
+        artifact.write_bytes(b'artifact')
+        params = dict(
+            name='test-app', targets=self.TARGETS, object_name='app.tar.gz', file_path=str(artifact),
+            deploy_language='python', port=8080, project_path=str(tmp_path),
+            application_start='./start.sh', application_stop='./stop.sh',
+            max_parallel=4, canary=False, canary_timeout=60, regional_artifacts=True,
+        )
+        params.update(kwargs)
+        return asyncio.run(application_management_tools.OOS_CodeDeployMultiTarget(**params))
+    
+    def test_uploads_once_and_replicates_to_other_regions(self, tmp_path):
+        """测试本地只上传一次到主地域，其他地域通过跨地域复制同步，所有目标使用同地域内网产物部署"""
+        with patch(f'{self.MODULE}.get_or_create_bucket_for_code_deploy', side_effect=lambda name, region: f'bucket-{region}') as mock_bucket, \
+             patch(f'{self.MODULE}._upload_artifact_if_changed', return_value=('v1', True)) as mock_upload, \
+             patch(f'{self.MODULE}._check_application_exists', return_value=True), \
+             patch(f'{self.MODULE}._deploy_target') as mock_deploy_target, \
+             patch(f'{self.MODULE}.create_client'):
+            mock_deploy_target.side_effect = lambda client, name, target, artifact, *args: {
+                **target, 'status': 'Deploying', 'bucket_name': artifact['bucket_name']
+            }
+            
+            result = self._deploy(tmp_path)
+            
+            assert sorted(call.args[1] for call in mock_bucket.call_args_list) == ['cn-hangzhou', 'cn-shanghai']
+            mock_upload.assert_called_once()
+            assert mock_upload.call_args.args[0] == 'bucket-cn-hangzhou'
+            self.mock_replication.assert_called_once_with(
+                self.oss_client, 'bucket-cn-hangzhou', 'cn-shanghai', 'bucket-cn-shanghai')
+            self.oss_client.copy_object.assert_not_called()
+            assert result['artifacts']['cn-shanghai']['source'] == 'replication'
+            assert result['artifacts']['cn-shanghai']['version_id'] == 'v-replica'
+            assert result['summary'] == {'Deploying': 3}
+            assert {t['application_group_name']: t['bucket_name'] for t in result['targets']} == {
+                'g-hz': 'bucket-cn-hangzhou', 'g-sh': 'bucket-cn-shanghai', 'g-sh2': 'bucket-cn-shanghai'
+            }
+    
+    def test_unchanged_primary_artifact_is_copied_to_trigger_replication(self, tmp_path):
+        """测试主地域产物未变化时在服务端复制一次自身以触发跨地域复制"""
+        self.oss_client.copy_object.return_value.version_id = 'v2'
+        with patch(f'{self.MODULE}.get_or_create_bucket_for_code_deploy', side_effect=lambda name, region: f'bucket-{region}'), \
+             patch(f'{self.MODULE}._upload_artifact_if_changed', return_value=('v1', False)) as mock_upload, \
+             patch(f'{self.MODULE}._check_application_exists', return_value=True), \
+             patch(f'{self.MODULE}._deploy_target', side_effect=lambda client, name, target, *args: {**target, 'status': 'Deploying'}), \
+             patch(f'{self.MODULE}.create_client'):
+            result = self._deploy(tmp_path)
+        
+        mock_upload.assert_called_once()
+        request = self.oss_client.copy_object.call_args.args[0]
+        assert (request.bucket, request.source_bucket, request.source_version_id) == (
+            'bucket-cn-hangzhou', 'bucket-cn-hangzhou', 'v1')
+        assert result['artifacts']['cn-hangzhou']['version_id'] == 'v2'
+    
+    def test_falls_back_to_direct_upload(self, tmp_path):
+        """测试无法创建复制规则或复制超时时从本地直接上传到该地域"""
+        with patch(f'{self.MODULE}.get_or_create_bucket_for_code_deploy', side_effect=lambda name, region: f'bucket-{region}'), \
+             patch(f'{self.MODULE}._upload_artifact_if_changed', return_value=('v1', True)) as mock_upload, \
+             patch(f'{self.MODULE}._check_application_exists', return_value=True), \
+             patch(f'{self.MODULE}._deploy_target', side_effect=lambda client, name, target, *args: {**target, 'status': 'Deploying'}), \
+             patch(f'{self.MODULE}.create_client'):
+            self.mock_replication.side_effect = Exception('AccessDenied')
+            result = self._deploy(tmp_path)
+            self.mock_replication.side_effect = None
+            self.mock_wait_replica.return_value = None
+            timed_out = self._deploy(tmp_path)
+        
+        assert result['artifacts']['cn-shanghai']['source'] == 'upload'
+        assert timed_out['artifacts']['cn-shanghai']['source'] == 'upload'
+        assert [call.args[0] for call in mock_upload.call_args_list] == [
+            'bucket-cn-hangzhou', 'bucket-cn-shanghai', 'bucket-cn-hangzhou', 'bucket-cn-shanghai']
+        assert mock_upload.call_args.kwargs == {'record': False}
+    
+    def test_single_artifact_region(self, tmp_path):
+        """测试关闭地域产物时只上传到默认地域"""
+        with patch(f'{self.MODULE}.get_or_create_bucket_for_code_deploy', return_value='bucket-hz'), \
+             patch(f'{self.MODULE}._upload_artifact_if_changed', return_value=('v1', False)) as mock_upload, \
+             patch(f'{self.MODULE}._check_application_exists', return_value=True), \
+             patch(f'{self.MODULE}._deploy_target') as mock_deploy_target, \
+             patch(f'{self.MODULE}.create_client'):
+            mock_deploy_target.side_effect = lambda client, name, target, artifact, *args: {
+                **target, 'status': 'Deploying'
+            }
+            
+            result = self._deploy(tmp_path, regional_artifacts=False)
+            
+            mock_upload.assert_called_once()
+            assert list(result['artifacts']) == ['cn-hangzhou']
+            assert all(call.args[3]['region_id'] == 'cn-hangzhou' for call in mock_deploy_target.call_args_list)
+    
+    def test_failed_canary_skips_remaining_targets(self, tmp_path):
+        """测试金丝雀目标失败后跳过其余目标"""
+        with patch(f'{self.MODULE}.get_or_create_bucket_for_code_deploy', return_value='bucket'), \
+             patch(f'{self.MODULE}._upload_artifact_if_changed', return_value=('v1', True)), \
+             patch(f'{self.MODULE}._check_application_exists', return_value=True), \
+             patch(f'{self.MODULE}._deploy_target') as mock_deploy_target, \
+             patch(f'{self.MODULE}._wait_for_application_group', return_value='DeployFailed') as mock_wait, \
+             patch(f'{self.MODULE}.create_client'):
+            mock_deploy_target.side_effect = lambda client, name, target, artifact, *args: {
+                **target, 'status': 'Deploying', 'previous_execution_id': 'exec-old'
+            }
+            
+            result = self._deploy(tmp_path, canary=True)
+            
+            mock_deploy_target.assert_called_once()
+            assert mock_wait.call_args.args[3] == 'exec-old'
+            assert result['canary'] == 'g-hz'
+            assert result['summary'] == {'DeployFailed': 1, 'Skipped': 2}
+            assert 'previous_execution_id' not in result['targets'][0]
+    
+    def test_workers_see_header_credentials(self, tmp_path):
+        """测试并发上传和部署线程仍能读取当前 HTTP 请求头中的凭证"""
+        from fastmcp.server.http import _current_http_request
+        from alibaba_cloud_ops_mcp_server.alibabacloud.utils import get_credentials_from_header
+        request = MagicMock()
+        request.headers = {'x-acs-accesskey-id': 'tenant-ak', 'x-acs-accesskey-secret': 'sk'}
+        seen = []
+        
+        def bucket(name, region):
+            seen.append(get_credentials_from_header())
+            return f'bucket-{region}'
+        
+        def deploy_target(client, name, target, artifact, *args):
+            seen.append(get_credentials_from_header())
+            return {**target, 'status': 'Deploying'}
+        
+        token = _current_http_request.set(request)
+        try:
+            with patch(f'{self.MODULE}.get_or_create_bucket_for_code_deploy', side_effect=bucket), \
+                 patch(f'{self.MODULE}._upload_artifact_if_changed', return_value=('v1', True)), \
+                 patch(f'{self.MODULE}._check_application_exists', return_value=True), \
+                 patch(f'{self.MODULE}._deploy_target', side_effect=deploy_target), \
+                 patch(f'{self.MODULE}.create_client'):
+                self._deploy(tmp_path)
+        finally:
+            _current_http_request.reset(token)
+        
+        assert len(seen) == 5
+        assert all(credentials and credentials['AccessKeyId'] == 'tenant-ak' for credentials in seen)
+    
+    def test_invalid_targets(self, tmp_path):
+        """测试目标参数缺失时报错"""
+        with pytest.raises(ValueError):
+            self._deploy(tmp_path, targets=[{'region_id': 'cn-hangzhou', 'instance_ids': ['i-1']}])
+        with pytest.raises(ValueError):
+            self._deploy(tmp_path, targets=[])
+
+
+class TestArtifactReplication:
+    """测试跨地域复制规则和复制等待"""
+    
+    MODULE = 'alibaba_cloud_ops_mcp_server.tools.application_management_tools'
+    
+    def test_creates_rule_only_when_missing(self):
+        """测试目标 Bucket 已有复制规则时不重复创建"""
+        client = MagicMock()
+        rule = MagicMock()
+        rule.destination.bucket = 'bucket-sh'
+        client.get_bucket_replication.return_value.replication_configuration.rules = [rule]
+        
+        application_management_tools._ensure_artifact_replication(client, 'bucket-hz', 'cn-shanghai', 'bucket-sh')
+        client.put_bucket_replication.assert_not_called()
+        
+        application_management_tools._ensure_artifact_replication(client, 'bucket-hz', 'cn-beijing', 'bucket-bj')
+        request = client.put_bucket_replication.call_args.args[0]
+        new_rule = request.replication_configuration.rules[0]
+        assert request.bucket == 'bucket-hz'
+        assert (new_rule.destination.bucket, new_rule.destination.location) == ('bucket-bj', 'oss-cn-beijing')
+        assert (new_rule.action, new_rule.historical_object_replication) == ('PUT', 'disabled')
+    
+    def test_waits_until_replica_matches(self):
+        """测试等待目标地域副本的 CRC64 与本地一致，超时返回 None"""
+        heads = [None, {'hash_crc64': 'old', 'version_id': 'v0'}, {'hash_crc64': '123', 'version_id': 'v1'}]
+        with patch(f'{self.MODULE}.oss_tools.create_client'), \
+             patch(f'{self.MODULE}.oss_tools.head_object_hash', side_effect=heads), \
+             patch(f'{self.MODULE}.time.sleep') as mock_sleep:
+            result = application_management_tools._wait_for_replicated_artifact(
+                'cn-shanghai', 'bucket-sh', 'app.tar.gz', '123', 60)
+        assert result == {'hash_crc64': '123', 'version_id': 'v1'}
+        assert mock_sleep.call_count == 2
+        
+        with patch(f'{self.MODULE}.oss_tools.create_client'), \
+             patch(f'{self.MODULE}.oss_tools.head_object_hash', return_value=None):
+            assert application_management_tools._wait_for_replicated_artifact(
+                'cn-shanghai', 'bucket-sh', 'app.tar.gz', '123', 0) is None
+
+
+class TestWaitForApplicationGroup:
+    """测试 _wait_for_application_group 函数"""
+    
+    def test_ignores_previous_execution(self):
+        """测试忽略上一次已结束的部署，等待本次部署结束"""
+        statuses = [
+            {'status': 'Deployed', 'execution_id': 'exec-old'},
+            {'status': 'Deploying', 'execution_id': 'exec-new'},
+            {'status': 'Deployed', 'execution_id': 'exec-new'},
+        ]
+        module = 'alibaba_cloud_ops_mcp_server.tools.application_management_tools'
+        ctx = MagicMock()
+        ctx.report_progress = AsyncMock()
+        with patch(f'{module}._list_application_group_deployment', side_effect=statuses), \
+             patch(f'{module}.asyncio.sleep', new_callable=AsyncMock) as mock_sleep:
+            status = asyncio.run(application_management_tools._wait_for_application_group(
+                MagicMock(), 'test-app', 'test-group', 'exec-old', 60, ctx
+            ))
+            
+            assert status == 'Deployed'
+            assert mock_sleep.await_count == 2
+            assert ctx.report_progress.await_args.kwargs['message'] == 'canary test-group: Deploying'
+    
+    def test_timeout(self):
+        """测试超过等待时间返回 Timeout"""
+        module = 'alibaba_cloud_ops_mcp_server.tools.application_management_tools'
+        with patch(f'{module}._list_application_group_deployment',
+                   return_value={'status': 'Deploying', 'execution_id': 'exec-new'}), \
+             patch(f'{module}.asyncio.sleep', new_callable=AsyncMock):
+            status = asyncio.run(application_management_tools._wait_for_application_group(
+                MagicMock(), 'test-app', 'test-group', 'exec-old', 0
+            ))
+            
+            assert status == 'Timeout'
+
+
+class TestDeploymentStrategy:
+    """测试部署策略"""
+    
+    def test_default_strategy_keeps_all_at_once(self):
+        """测试默认策略与原有的一次性全部部署参数一致"""
+        result = application_management_tools._create_start_execution_parameters('app', 'group', 'rev-1')
+        
+        assert result['Mode'] == 'FailurePause'
+        assert result['Parameters']['deployMethod'] == 'all'
+        assert result['Parameters']['batchNumber'] == 2
+        assert result['Parameters']['batchPauseOption'] == 'Automatic'
+    
+    def test_batch_percentage_and_max_unavailable(self):
+        """测试按百分比分批，并受最大不可用实例数约束"""
+        strategy = application_management_tools.DeploymentStrategy(batch_percentage=25)
+        assert strategy.resolve_batch_number(10) == 4
+        
+        strategy = application_management_tools.DeploymentStrategy(batch_percentage=50, max_unavailable=2)
+        assert strategy.resolve_batch_number(10) == 5
+        
+        strategy = application_management_tools.DeploymentStrategy(batch_number=8)
+        assert strategy.resolve_batch_number(3) == 3
+    
+    def test_batched_execution_parameters(self):
+        """测试分批策略生成的执行参数"""
+        strategy = application_management_tools.DeploymentStrategy(
+            batch_number=3, pause_policy='FirstBatchPause', failure_policy='Automatic'
+        )
+        result = application_management_tools._create_start_execution_parameters('app', 'group', 'rev-1', strategy, 9)
+        
+        assert result['Mode'] == 'Automatic'
+        assert result['Parameters']['deployMethod'] == 'batch'
+        assert result['Parameters']['batchNumber'] == 3
+        assert result['Parameters']['batchPauseOption'] == 'FirstBatchPause'
+    
+    def test_resolve_from_dict(self):
+        """测试从字典解析部署策略，缺省时使用默认策略"""
+        strategy = application_management_tools._resolve_deployment_strategy({'batch_percentage': 20, 'working_dir': '/opt/app'})
+        
+        assert strategy.batch_percentage == 20
+        assert strategy.working_dir == '/opt/app'
+        assert application_management_tools._resolve_deployment_strategy(None) == application_management_tools.DeploymentStrategy()
+        with pytest.raises(Exception):
+            application_management_tools._resolve_deployment_strategy({'pause_policy': 'Never'})
+    
+    def test_health_check_appended_to_start_command(self):
+        """测试健康检查追加到启动命令后"""
+        strategy = application_management_tools.DeploymentStrategy(health_check_path='health', health_check_timeout=10)
+        result = application_management_tools._append_health_check('nohup ./app > /root/app.log 2>&1 &', 8080, strategy)
+        
+        first_line, health_check = result.split('\n')
+        assert first_line == 'nohup ./app > /root/app.log 2>&1 &'
+        assert 'http://127.0.0.1:8080/health' in health_check
+        assert '$(seq 1 5)' in health_check
+        assert health_check.endswith('exit 1')
+        assert application_management_tools._append_health_check('./start.sh', 8080,
+                                                                 application_management_tools.DeploymentStrategy()) == './start.sh'
+    
+    def test_deploy_parameters_use_instance_zone_and_working_dir(self):
+        """测试新建应用分组时使用实例所在可用区和自定义工作目录"""
+        result = application_management_tools._create_deploy_parameters(
+            'app', 'group', 'cn-hangzhou', 'bucket', 'app.tar.gz', 'v1', True, 8080, ['i-1'],
+            './start.sh', './stop.sh', 'java', zone_id='cn-hangzhou-k', working_dir='/opt/app'
+        )
+        
+        assert result['Parameters']['ZoneId'] == 'cn-hangzhou-k'
+        assert result['Parameters']['WorkingDir'] == '/opt/app'
+
+
+class TestOOSWaitForDeployment:
+    """测试 OOS_WaitForDeployment 函数"""
+    
+    MODULE = 'alibaba_cloud_ops_mcp_server.tools.application_management_tools'
+    
+    @staticmethod
+    def _child(execution_id, instance_id, status):
+        child = MagicMock()
+        child.execution_id = execution_id
+        child.status = status
+        child.parameters = {'instanceId': instance_id}
+        return child
+    
+    def _wait(self, **kwargs):
+        import asyncio
+        params = dict(name='test-app', application_group_name='test-group', execution_id=None,
+                      timeout=600, poll_interval=5, max_poll_interval=30, ctx=None)
+        params.update(kwargs)
+        return asyncio.run(application_management_tools.OOS_WaitForDeployment(**params))
+    
+    def test_waits_until_end_status_with_backoff(self):
+        """测试轮询直到部署结束，间隔指数退避，并推送进度"""
+        from unittest.mock import AsyncMock
+        deployments = [
+            {'status': 'Deploying', 'execution_id': 'exec-1', 'deploy_execution_info': None},
+            {'status': 'Deploying', 'execution_id': 'exec-1', 'deploy_execution_info': None},
+            {'status': 'Deployed', 'execution_id': 'exec-1', 'deploy_execution_info': None},
+        ]
+        children = [
+            [self._child('c-1', 'i-1', 'Running'), self._child('c-2', 'i-2', 'Waiting')],
+            [self._child('c-1', 'i-1', 'Success'), self._child('c-2', 'i-2', 'Running')],
+            [self._child('c-1', 'i-1', 'Success'), self._child('c-2', 'i-2', 'Success')],
+        ]
+        ctx = MagicMock()
+        ctx.report_progress = AsyncMock()
+        with patch(f'{self.MODULE}.create_client'), \
+             patch(f'{self.MODULE}._list_application_group_deployment', side_effect=deployments), \
+             patch(f'{self.MODULE}._list_child_executions', side_effect=children), \
+             patch(f'{self.MODULE}.asyncio.sleep', new_callable=AsyncMock) as mock_sleep, \
+             patch(f'{self.MODULE}._settle_delta_base') as mock_settle:
+            result = self._wait(ctx=ctx)
+        
+        assert result['finished'] is True
+        assert result['timed_out'] is False
+        assert result['status'] == 'Deployed'
+        assert result['polls'] == 3
+        assert result['instances_finished'] == 2
+        assert result['instances'][0] == {'instance_id': 'i-1', 'execution_id': 'c-1', 'status': 'Success'}
+        assert [call.args[0] for call in mock_sleep.call_args_list] == [5, 10]
+        assert ctx.report_progress.call_count == 3
+        assert ctx.report_progress.call_args.kwargs['progress'] == 2
+        assert ctx.report_progress.call_args.kwargs['total'] == 2
+        # 部署结束后才确认增量部署基线
+        mock_settle.assert_called_once()
+        assert mock_settle.call_args.args[1:] == ('test-app', 'test-group', deployments[-1])
+    
+    def test_timeout_returns_snapshot(self):
+        """测试超时后返回当前状态汇总"""
+        deployment = {'status': 'Deploying', 'execution_id': 'exec-1', 'deploy_execution_info': None}
+        with patch(f'{self.MODULE}.create_client'), \
+             patch(f'{self.MODULE}._list_application_group_deployment', return_value=deployment), \
+             patch(f'{self.MODULE}._list_child_executions', return_value=[]), \
+             patch(f'{self.MODULE}._settle_delta_base') as mock_settle:
+            result = self._wait(timeout=0)
+        
+        assert result['finished'] is False
+        assert result['timed_out'] is True
+        assert result['status'] == 'Deploying'
+        assert result['polls'] == 1
+        mock_settle.assert_not_called()
+    
+    def test_waits_for_requested_execution(self):
+        """测试指定 execution_id 时忽略之前已结束的部署"""
+        from unittest.mock import AsyncMock
+        deployments = [
+            {'status': 'Deployed', 'execution_id': 'exec-old', 'deploy_execution_info': None},
+            {'status': 'DeployFailed', 'execution_id': 'exec-new', 'deploy_execution_info': None},
+        ]
+        with patch(f'{self.MODULE}.create_client'), \
+             patch(f'{self.MODULE}._list_application_group_deployment', side_effect=deployments), \
+             patch(f'{self.MODULE}._list_child_executions', return_value=[]), \
+             patch(f'{self.MODULE}.asyncio.sleep', new_callable=AsyncMock):
+            result = self._wait(execution_id='exec-new')
+        
+        assert result['status'] == 'DeployFailed'
+        assert result['execution_id'] == 'exec-new'
+        assert result['finished'] is True
+
+
+class TestAnalyzeDeploymentFile:
+    """测试 _analyze_deployment_file 流式分析"""
+    
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        application_management_tools._archive_analysis_cache.clear()
+        yield
+        application_management_tools._archive_analysis_cache.clear()
+    
+    @staticmethod
+    def _make_tar(path, names):
+        import io
+        import tarfile
+        with tarfile.open(path, 'w:gz') as tar:
+            for name in names:
+                data = name.encode()
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+        return str(path)
+    
+    def test_skips_dependency_dirs(self, tmp_path):
+        """测试依赖目录中的成员只计数不保留"""
+        names = ['app/package.json', 'app/index.js'] + [f'app/node_modules/pkg{i}/index.js' for i in range(50)]
+        file_path = self._make_tar(tmp_path / 'app.tar.gz', names)
+        
+        result = application_management_tools._analyze_deployment_file(file_path, 'nodejs')
+        
+        assert result['archive_type'] == 'tar.gz'
+        assert result['files_in_archive'] == ['app/package.json', 'app/index.js']
+        assert result['extracted_dir_name'] == 'app'
+        assert result['members_scanned'] == 52
+        assert result['members_skipped'] == 50
+        assert result['stopped_early'] is False
+    
+    def test_java_stops_collecting_at_first_jar(self, tmp_path):
+        """测试 Java 找到第一个 jar 后不再收集成员，但继续读取成员名以确认唯一顶级目录"""
+        names = ['app/README.md', 'app/app.jar'] + [f'app/lib/dep{i}.jar' for i in range(20)]
+        file_path = self._make_tar(tmp_path / 'app.tar.gz', names)
+        
+        result = application_management_tools._analyze_deployment_file(file_path, 'java')
+        
+        assert result['stopped_early'] is True
+        assert result['members_scanned'] == 22
+        assert result['files_in_archive'] == ['app/README.md', 'app/app.jar']
+        assert result['extracted_dir_name'] == 'app'
+    
+    def test_flat_java_archive_has_no_extracted_dir(self, tmp_path):
+        """测试平铺的 Java 压缩包不会把 jar 文件当作解压目录，确认存在多个顶级名称后停止扫描"""
+        names = ['app.jar', 'config/application.yml'] + [f'lib/dep{i}.jar' for i in range(20)]
+        file_path = self._make_tar(tmp_path / 'app.tar.gz', names)
+        
+        result = application_management_tools._analyze_deployment_file(file_path, 'java')
+        start, _ = application_management_tools._generate_start_stop_commands_by_rules(file_path, 'java', 'app', 8080)
+        
+        assert result['extracted_dir_name'] is None
+        assert result['members_scanned'] == 2
+        assert 'cd app.jar' not in start
+        assert '[ -f app.jar ] && nohup java -jar app.jar' in start
+    
+    def test_flat_docker_archive_has_no_extracted_dir(self, tmp_path):
+        """测试平铺的 Docker 压缩包不会把 Dockerfile 当作解压目录"""
+        file_path = self._make_tar(tmp_path / 'app.tar.gz', ['Dockerfile', 'src/main.py', 'package.json'])
+        
+        result = application_management_tools._analyze_deployment_file(file_path, 'docker')
+        start, _ = application_management_tools._generate_start_stop_commands_by_rules(file_path, 'docker', 'app', 8080)
+        
+        assert result['extracted_dir_name'] is None
+        assert 'cd Dockerfile' not in start
+        assert '[ -f Dockerfile ] && docker build -t app:latest .' in start
+    
+    def test_single_file_archive_has_no_extracted_dir(self, tmp_path):
+        """测试只有一个文件的压缩包不会把该文件当作解压目录"""
+        file_path = self._make_tar(tmp_path / 'app.tar.gz', ['server'])
+        
+        result = application_management_tools._analyze_deployment_file(file_path, 'golang')
+        
+        assert result['extracted_dir_name'] is None
+    
+    def test_member_cap(self, tmp_path):
+        """测试保留的成员数受上限约束"""
+        names = [f'app/file{i}.py' for i in range(10)]
+        file_path = self._make_tar(tmp_path / 'app.tar.gz', names)
+        
+        with patch.object(application_management_tools.settings, 'code_deploy_archive_max_members', 3):
+            result = application_management_tools._analyze_deployment_file(file_path, 'python')
+        
+        assert result['truncated'] is True
+        assert len(result['files_in_archive']) == 3
+    
+    def test_result_cached_by_file_hash(self, tmp_path):
+        """测试相同内容的产物复用缓存的分析结果"""
+        names = ['app/main.py']
+        first = self._make_tar(tmp_path / 'app.tar.gz', names)
+        
+        with patch.object(application_management_tools, '_scan_archive_members',
+                          wraps=application_management_tools._scan_archive_members) as mock_scan:
+            application_management_tools._analyze_deployment_file(first, 'python')
+            result = application_management_tools._analyze_deployment_file(first, 'python')
+            
+            assert mock_scan.call_count == 1
+            assert result['files_in_archive'] == ['app/main.py']
+    
+    def test_zip_archive(self, tmp_path):
+        """测试 zip 压缩包"""
+        import zipfile
+        file_path = tmp_path / 'app.zip'
+        with zipfile.ZipFile(file_path, 'w') as zip_ref:
+            zip_ref.writestr('main.py', 'print(1)')
+            zip_ref.writestr('lib/util.py', '')
+        
+        result = application_management_tools._analyze_deployment_file(str(file_path), 'python')
+        
+        assert result['archive_type'] == 'zip'
+        assert result['files_in_archive'] == ['main.py', 'lib/util.py']
+        assert result['extracted_dir_name'] is None
+
+
+    def test_golang_sniffs_candidate_members(self, tmp_path):
+        """测试 Go 读取候选成员文件头，识别 ELF、脚本和权限位"""
+        import io
+        import tarfile
+        members = [
+            ('app/main.go', b'package main', 0o644),
+            ('app/server', b'just some notes', 0o644),
+            ('app/run', b'#!/bin/bash\necho run', 0o755),
+            ('app/bin/svc', b'\x7fELF\x02\x01\x01' + b'\x00' * 500, 0o755),
+        ]
+        file_path = tmp_path / 'app.tar.gz'
+        with tarfile.open(file_path, 'w:gz') as tar:
+            for name, data, mode in members:
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                info.mode = mode
+                tar.addfile(info, io.BytesIO(data))
+        
+        result = application_management_tools._analyze_deployment_file(str(file_path), 'golang')
+        executables = result['executables']
+        
+        assert 'app/main.go' not in executables
+        assert executables['app/bin/svc']['kind'] == 'elf'
+        assert executables['app/run'] == {'mode': 0o755, 'kind': 'script', 'interpreter': '/bin/bash'}
+        assert executables['app/server']['kind'] is None
+        # 非 Go 语言不读取文件头
+        assert application_management_tools._analyze_deployment_file(str(file_path), 'python')['executables'] == {}
+    
+    def test_zip_sniff_uses_unix_mode(self, tmp_path):
+        """测试 zip 从 external_attr 读取 Unix 权限位"""
+        import zipfile
+        file_path = tmp_path / 'app.zip'
+        with zipfile.ZipFile(file_path, 'w') as zf:
+            info = zipfile.ZipInfo('app/svc')
+            info.create_system = 3
+            info.external_attr = 0o755 << 16
+            zf.writestr(info, b'\x7fELF' + b'\x00' * 10)
+        
+        result = application_management_tools._analyze_deployment_file(str(file_path), 'golang')
+        
+        assert result['executables']['app/svc'] == {'mode': 0o755, 'kind': 'elf', 'interpreter': None}
+
+
+    def test_hashes_root_lockfiles(self, tmp_path):
+        """测试 Node.js 计算根目录下锁文件的哈希，忽略子目录中的锁文件"""
+        import hashlib
+        names = ['app/package.json', 'app/package-lock.json', 'app/packages/lib/package-lock.json']
+        file_path = self._make_tar(tmp_path / 'app.tar.gz', names)
+        
+        result = application_management_tools._analyze_deployment_file(file_path, 'nodejs')
+        
+        assert result['lockfiles'] == {
+            'app/package-lock.json': hashlib.sha256(b'app/package-lock.json').hexdigest()
+        }
+        assert application_management_tools._analyze_deployment_file(file_path, 'java')['lockfiles'] == {}
+
+
+class TestStartCommandRules:
+    """测试基于成员索引的启动命令规则引擎"""
+    
+    @staticmethod
+    def _generate(deploy_language, members, extracted_dir_name='app', file_name='app.tar.gz'):
+        file_analysis = {'file_type': 'archive', 'archive_type': 'tar.gz', 'files_in_archive': members}
+        return application_management_tools._generate_start_command_by_rules(
+            file_name, deploy_language, file_analysis, extracted_dir_name, 'My_App', 8080
+        )
+    
+    def test_index_paths_relative_to_extracted_dir(self):
+        """测试索引路径相对于解压目录，并按深度排序"""
+        index = application_management_tools._ArchiveIndex(
+            ['app/', 'app/lib/run.py', './app/run.py', 'app/bin/server', 'app/README'], 'app'
+        )
+        
+        assert index.by_basename['run.py'] == ['run.py', 'lib/run.py']
+        assert index.by_extension['.py'] == ['run.py', 'lib/run.py']
+        assert index.binaries == ['bin/server']
+    
+    def test_index_keeps_member_named_like_root(self):
+        """测试与解压目录同名的文件成员不会被丢弃"""
+        index = application_management_tools._ArchiveIndex(['Dockerfile', 'src/main.py'], 'Dockerfile')
+        
+        assert index.by_basename['dockerfile'] == ['Dockerfile']
+        assert index.by_basename['main.py'] == ['src/main.py']
+    
+    def test_flat_archives_first_member_is_file(self):
+        """测试第一个成员为文件的平铺压缩包仍能生成启动命令"""
+        docker_cmd = self._generate('docker', ['Dockerfile', 'src/main.py', 'package.json'], None)
+        java_cmd = self._generate('java', ['app.jar', 'config/application.yml'], None)
+        
+        assert '[ -f Dockerfile ] && docker build' in docker_cmd
+        assert 'cd ' not in docker_cmd
+        assert '[ -f app.jar ] && nohup java -jar app.jar' in java_cmd
+        assert 'cd ' not in java_cmd
+    
+    def test_python_priority_table(self):
+        """测试 Python 按优先级选择入口文件，路径不重复拼接解压目录"""
+        cmd = self._generate('python', ['app/util.py', 'app/server.py', 'app/app.py'])
+        
+        assert cmd.endswith('cd app || exit 1 && [ -f app.py ] && nohup python app.py > /root/app.log 2>&1 &')
+    
+    def test_nodejs_start_script(self):
+        """测试 Node.js 有 start 脚本时使用脚本启动"""
+        cmd = self._generate('nodejs', ['app/package.json', 'app/scripts/start.sh', 'app/index.js'])
+        
+        assert 'npm install && [ -f scripts/start.sh ] && chmod +x scripts/start.sh && nohup ./scripts/start.sh' in cmd
+    
+    def test_nodejs_without_package_json(self):
+        """测试 Node.js 没有 package.json 时选择 js 入口"""
+        assert 'nohup node server.js' in self._generate('nodejs', ['app/lib/x.js', 'app/server.js'])
+        assert self._generate('nodejs', ['app/README.md']) is None
+    
+    def test_golang_ignores_sources(self):
+        """测试 Go 只在无扩展名的候选中选择二进制，不会选中 main.go"""
+        cmd = self._generate('golang', ['app/main.go', 'app/LICENSE', 'app/bin/server-amd64'])
+        
+        assert '[ -f bin/server-amd64 ] && chmod +x bin/server-amd64 && nohup ./bin/server-amd64' in cmd
+        assert cmd.endswith('&')
+    
+    def test_golang_prefers_sniffed_binaries(self):
+        """测试有文件头识别结果时优先 ELF，排除文本文件和脚本"""
+        members = ['app/main.go', 'app/server', 'app/run', 'app/bin/svc.linux-amd64']
+        executables = {
+            'app/server': {'mode': 0o644, 'kind': None, 'interpreter': None},
+            'app/run': {'mode': 0o755, 'kind': 'script', 'interpreter': '/bin/sh'},
+            'app/bin/svc.linux-amd64': {'mode': 0o755, 'kind': 'elf', 'interpreter': None},
+        }
+        index = application_management_tools._ArchiveIndex(members, 'app', executables)
+        
+        assert index.binaries == ['bin/svc.linux-amd64']
+        assert index.scripts == ['run']
+        
+        file_analysis = {'file_type': 'archive', 'archive_type': 'tar.gz', 'files_in_archive': members,
+                         'executables': executables}
+        cmd = application_management_tools._generate_start_command_by_rules(
+            'app.tar.gz', 'golang', file_analysis, 'app', 'My_App', 8080
+        )
+        assert 'nohup ./bin/svc.linux-amd64' in cmd
+    
+    def test_dependency_fingerprint_priority(self):
+        """测试依赖层指纹按锁文件优先级选择，且只使用工作目录根下的锁文件"""
+        file_analysis = {'lockfiles': {
+            'app/requirements.txt': 'a' * 64,
+            'app/poetry.lock': 'b' * 64,
+            'app/sub/requirements.txt': 'c' * 64,
+        }}
+        
+        fingerprint = application_management_tools._get_dependency_fingerprint('python', file_analysis, 'app')
+        
+        assert fingerprint == {'lockfile': 'poetry.lock', 'hash': 'b' * 64, 'key': 'python-' + 'b' * 16}
+        assert application_management_tools._get_dependency_fingerprint('python', {'lockfiles': {}}, 'app') is None
+    
+    def test_nodejs_reuses_dependency_layer(self):
+        """测试 Node.js 有锁文件时按哈希复用实例上的依赖层"""
+        file_analysis = {'file_type': 'archive', 'archive_type': 'tar.gz',
+                         'files_in_archive': ['app/package.json', 'app/package-lock.json'],
+                         'lockfiles': {'app/package-lock.json': '0123456789abcdef' * 4}}
+        cmd = application_management_tools._generate_start_command_by_rules(
+            'app.tar.gz', 'nodejs', file_analysis, 'app', 'My_App', 8080
+        )
+        
+        assert 'DEPS=/root/.code_deploy_deps/My_App/nodejs-0123456789abcdef' in cmd
+        assert 'ln -s "$DEPS/node_modules" node_modules' in cmd
+        # 只清理本应用的旧依赖层，不影响同一实例上其他应用的依赖层
+        assert 'ls -dt /root/.code_deploy_deps/My_App/nodejs-* 2>/dev/null | tail -n +4' in cmd
+        assert cmd.endswith('nohup npm start > /root/app.log 2>&1 &')
+        # 没有锁文件时保持原有的 npm install
+        assert '[ -f package.json ] && npm install && nohup npm start' in self._generate(
+            'nodejs', ['app/package.json', 'app/index.js'])
+    
+    def test_python_dependency_layer_venv(self):
+        """测试 Python 有 requirements.txt 时使用依赖层中的虚拟环境启动"""
+        file_analysis = {'file_type': 'archive', 'archive_type': 'tar.gz',
+                         'files_in_archive': ['app/app.py', 'app/requirements.txt'],
+                         'lockfiles': {'app/requirements.txt': 'f' * 64}}
+        cmd = application_management_tools._generate_start_command_by_rules(
+            'app.tar.gz', 'python', file_analysis, 'app', 'My_App', 8080
+        )
+        
+        assert 'DEPS=/root/.code_deploy_deps/My_App/python-ffffffffffffffff' in cmd
+        assert 'python3 -m venv "$DEPS" && "$DEPS/bin/pip" install -r requirements.txt' in cmd
+        assert cmd.endswith('[ -f app.py ] && nohup $PY app.py > /root/app.log 2>&1 &')
+    
+    def test_golang_default_uses_artifact_stem(self):
+        """测试 Go 没有候选时使用产物名"""
+        cmd = self._generate('golang', ['app/main.go'], file_name='svc.tar.gz')
+        
+        assert '[ -f svc ] && chmod +x svc && nohup ./svc > /root/app.log 2>&1 &' in cmd
+    
+    def test_docker_requires_dockerfile(self):
+        """测试 Docker 需要 Dockerfile"""
+        cmd = self._generate('docker', ['app/Dockerfile'])
+        
+        assert 'docker build -t my-app:latest .' in cmd
+        assert 'docker run -d --name my-app -p 8080:8080 my-app:latest' in cmd
+        assert self._generate('docker', ['app/main.py']) is None
+    
+    def test_plain_file_artifact(self):
+        """测试非压缩包产物以自身作为候选"""
+        file_analysis = {'file_type': 'file', 'archive_type': None, 'files_in_archive': []}
+        cmd = application_management_tools._generate_start_command_by_rules(
+            'service.jar', 'java', file_analysis, None, 'app', 8080
+        )
+        
+        assert cmd == '[ -f service.jar ] && nohup java -jar service.jar > /root/app.log 2>&1 &'
+    
+    def test_unknown_language(self):
+        """测试未知语言返回 None"""
+        assert self._generate('rust', ['app/main']) is None
+
+
+class TestDeltaDeploy:
+    """测试基于逐文件清单的增量部署"""
+    
+    @pytest.fixture(autouse=True)
+    def project_dir(self, tmp_path):
+        from alibaba_cloud_ops_mcp_server.alibabacloud import utils
+        utils.set_project_path(str(tmp_path))
+        yield tmp_path
+        utils.set_project_path(None)
+    
+    @staticmethod
+    def _make_tar(path, files):
+        import io
+        import tarfile
+        with tarfile.open(path, 'w:gz') as tar:
+            for name, data in files.items():
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+        return str(path)
+    
+    def test_manifest_saved_by_artifact_hash(self, tmp_path):
+        """测试清单按产物 CRC64 保存，再次生成时直接读取"""
+        import hashlib
+        file_path = self._make_tar(tmp_path / 'app.tar.gz', {'app/a.txt': b'a'})
+        
+        manifest = application_management_tools._build_artifact_manifest(file_path)
+        
+        assert manifest['files'] == {'app/a.txt': 'sha256:' + hashlib.sha256(b'a').hexdigest()}
+        assert (tmp_path / '.code_deploy' / 'manifests' / f"{manifest['hash_crc64']}.json").exists()
+        module = 'alibaba_cloud_ops_mcp_server.tools.application_management_tools'
+        with patch(f'{module}._iter_archive_files') as mock_iter:
+            assert application_management_tools._build_artifact_manifest(file_path) == manifest
+            mock_iter.assert_not_called()
+    
+    @staticmethod
+    def _set_base(file_path):
+        import os
+        from alibaba_cloud_ops_mcp_server.alibabacloud import utils
+        utils.save_application_info({'delta_bases': {'demo/g1': {
+            'hash_crc64': application_management_tools.oss_tools.compute_file_crc64(file_path),
+            'file_name': os.path.basename(file_path),
+        }}})
+    
+    def _prepare(self, file_path, markers=None):
+        """以给定的实例版本标记规划增量部署，默认所有实例都在基线版本上"""
+        module = 'alibaba_cloud_ops_mcp_server.tools.application_management_tools'
+        base = application_management_tools.load_application_info().get('delta_bases', {}).get('demo/g1', {})
+        if markers is None:
+            markers = {'i-1': base.get('hash_crc64')}
+        with patch(f'{module}._read_instance_revision_markers', return_value=markers) as mock_markers, \
+             patch(f'{module}._list_application_group_deployment') as mock_deployment:
+            plan = application_management_tools._prepare_delta_deploy(
+                MagicMock(), 'demo', 'g1', file_path, 'releases/app.tar.gz', 'cn-hangzhou', ['i-1'], '/root/'
+            )
+        return plan, mock_markers, mock_deployment
+    
+    def test_prepare_patch_with_changed_and_deleted_files(self, tmp_path):
+        """测试补丁只包含变化的文件，并记录删除的文件"""
+        import os
+        import tarfile
+        big = os.urandom(200000)
+        base = self._make_tar(tmp_path / 'base.tar.gz', {'app/lib.bin': big, 'app/main.js': b'v1', 'app/old.js': b'x'})
+        application_management_tools._build_artifact_manifest(base)
+        self._set_base(base)
+        target = self._make_tar(tmp_path / 'app.tar.gz', {'app/lib.bin': big, 'app/main.js': b'v2', 'app/new.js': b'y'})
+        
+        plan, mock_markers, _ = self._prepare(target)
+        
+        assert plan['enabled'] is True
+        assert (plan['changed_files'], plan['deleted_files'], plan['unchanged_files']) == (2, 1, 1)
+        assert plan['patch_object_name'] == 'releases/app.delta.tar.gz'
+        assert mock_markers.call_args.args == ('cn-hangzhou', ['i-1'], '/root/.app.code_deploy_revision')
+        with tarfile.open(plan['patch_path']) as patch_tar:
+            assert sorted(patch_tar.getnames()) == ['.code_deploy_delta_deleted', 'app/main.js', 'app/new.js']
+            assert patch_tar.extractfile('.code_deploy_delta_deleted').read() == b'app/old.js\n'
+    
+    def test_prepare_falls_back_to_full_artifact(self, tmp_path):
+        """测试没有基线、产物未变化、实例不在基线版本或补丁过大时不启用增量"""
+        import os
+        target = self._make_tar(tmp_path / 'app.tar.gz', {'app/a.bin': os.urandom(1000)})
+        
+        assert self._prepare(target)[0]['reason'] == 'no_previous_deployment'
+        application_management_tools._build_artifact_manifest(target)
+        self._set_base(target)
+        assert self._prepare(target)[0]['reason'] == 'unchanged'
+        changed = self._make_tar(tmp_path / 'app2.tar.gz', {'app/a.bin': os.urandom(1000)})
+        plan, _, _ = self._prepare(changed, markers={'i-1': None})
+        assert plan['reason'] == 'instances_not_on_base'
+        assert plan['instances_not_on_base'] == ['i-1']
+        assert self._prepare(changed)[0]['reason'] == 'patch_too_large'
+    
+    def test_base_recorded_only_after_successful_deployment(self, tmp_path):
+        """测试部署提交后只记录待确认基线，部署成功后才成为基线，失败则丢弃"""
+        artifact = self._make_tar(tmp_path / 'app.tar.gz', {'app/a.txt': b'a'})
+        info = application_management_tools.load_application_info
+        application_management_tools._record_delta_pending('demo', 'g1', artifact, 'exec-old')
+        
+        application_management_tools._settle_delta_base(
+            None, 'demo', 'g1', {'execution_id': 'exec-new', 'status': 'Deploying'})
+        assert 'demo/g1' not in info().get('delta_bases', {})
+        application_management_tools._settle_delta_base(
+            None, 'demo', 'g1', {'execution_id': 'exec-old', 'status': 'Deployed'})
+        assert 'demo/g1' not in info().get('delta_bases', {})
+        application_management_tools._settle_delta_base(
+            None, 'demo', 'g1', {'execution_id': 'exec-new', 'status': 'Deployed'})
+        assert info()['delta_bases']['demo/g1']['file_name'] == 'app.tar.gz'
+        assert info()['delta_pending'] == {}
+        
+        failed = self._make_tar(tmp_path / 'app2.tar.gz', {'app/a.txt': b'b'})
+        application_management_tools._record_delta_pending('demo', 'g1', failed, 'exec-new')
+        application_management_tools._settle_delta_base(
+            None, 'demo', 'g1', {'execution_id': 'exec-3', 'status': 'DeployFailed'})
+        assert info()['delta_bases']['demo/g1']['file_name'] == 'app.tar.gz'
+        assert info()['delta_pending'] == {}
+    
+    def test_prepare_settles_pending_base_first(self, tmp_path):
+        """测试规划增量前先查询上次部署的结果，成功的部署才作为基线"""
+        base = self._make_tar(tmp_path / 'base.tar.gz', {'app/a.txt': b'a'})
+        application_management_tools._record_delta_pending('demo', 'g1', base, None)
+        target = self._make_tar(tmp_path / 'app.tar.gz', {'app/a.txt': b'b'})
+        module = 'alibaba_cloud_ops_mcp_server.tools.application_management_tools'
+        
+        with patch(f'{module}._list_application_group_deployment',
+                   return_value={'execution_id': 'exec-1', 'status': 'DeployFailed'}), \
+             patch(f'{module}._read_instance_revision_markers') as mock_markers:
+            plan = application_management_tools._prepare_delta_deploy(
+                MagicMock(), 'demo', 'g1', target, 'app.tar.gz', 'cn-hangzhou', ['i-1'])
+        
+        assert plan['reason'] == 'no_previous_deployment'
+        mock_markers.assert_not_called()
+    
+    def test_read_revision_markers_polls_cloud_assistant(self):
+        """测试通过云助手读取实例版本标记，等待执行结束，失败的实例返回 None"""
+        def _results(*items):
+            response = MagicMock()
+            response.body.invocation.next_token = None
+            response.body.invocation.invocation_results.invocation_result = [
+                MagicMock(instance_id=instance_id, invocation_status=status, output=output)
+                for instance_id, status, output in items
+            ]
+            return response
+        
+        ecs_client = MagicMock()
+        ecs_client.run_command.return_value.body.invoke_id = 't-1'
+        ecs_client.describe_invocation_results.side_effect = [
+            _results(('i-1', 'Running', ''), ('i-2', 'Failed', '')),
+            _results(('i-1', 'Success', '111\n'), ('i-2', 'Failed', '')),
+        ]
+        module = 'alibaba_cloud_ops_mcp_server.tools.application_management_tools'
+        with patch(f'{module}.create_ecs_client', return_value=ecs_client), patch(f'{module}.time.sleep'):
+            markers = application_management_tools._read_instance_revision_markers(
+                'cn-hangzhou', ['i-1', 'i-2'], '/root/.app.code_deploy_revision')
+        
+        assert markers == {'i-1': '111', 'i-2': None}
+        request = ecs_client.run_command.call_args.args[0]
+        assert request.instance_id == ['i-1', 'i-2']
+        assert request.command_content == 'cat /root/.app.code_deploy_revision 2>/dev/null || true'
+        assert ecs_client.describe_invocation_results.call_count == 2
+    
+    def test_extract_command_checks_revision_marker(self):
+        """测试补丁应用命令校验实例上的版本标记，不一致时失败而不是打补丁"""
+        plan = {'patch_path': '/p/.code_deploy/delta/app.delta.tar.gz', 'base_hash': '111', 'target_hash': '222'}
+        
+        cmd = application_management_tools._create_delta_extract_command(plan, '/p/app.tar.gz')
+        
+        assert cmd.startswith('[ -f app.delta.tar.gz ] || exit 1; '
+                              'if [ "$(cat .app.code_deploy_revision 2>/dev/null)" != "111" ]')
+        assert "xargs -r -d '\\n' rm -f -- < .code_deploy_delta_deleted" in cmd
+        assert 'curl' not in cmd and 'http' not in cmd
+        assert cmd.endswith('echo 222 > .app.code_deploy_revision || exit 1')
+    
+    def test_zip_patch_applies_wildcard_member_names(self, tmp_path):
+        """测试 zip 产物的补丁以 tar 成员应用，成员名中的通配符不会被解释"""
+        import subprocess
+        import zipfile
+        base = tmp_path / 'base.zip'
+        with zipfile.ZipFile(base, 'w') as zf:
+            zf.writestr('app/a[1].js', b'v1')
+            zf.writestr('app/a1.js', b'keep')
+            zf.writestr('app/old*.js', b'x')
+        application_management_tools._build_artifact_manifest(str(base))
+        self._set_base(str(base))
+        target = tmp_path / 'app.zip'
+        with zipfile.ZipFile(target, 'w') as zf:
+            zf.writestr('app/a[1].js', b'v2')
+            zf.writestr('app/a1.js', b'keep')
+            zf.writestr('app/big.bin', b'0' * 100000)
+            zf.writestr('app/big2.bin', b'1' * 100000)
+        target_hash = application_management_tools.oss_tools.compute_file_crc64(str(target))
+        workdir = tmp_path / 'instance'
+        (workdir / 'app').mkdir(parents=True)
+        (workdir / 'app' / 'a[1].js').write_bytes(b'v1')
+        (workdir / 'app' / 'a1.js').write_bytes(b'keep')
+        (workdir / 'app' / 'old*.js').write_bytes(b'x')
+        (workdir / 'app' / 'oldA.js').write_bytes(b'unrelated')
+        (workdir / '.app.code_deploy_revision').write_text(self._base_hash() + '\n')
+        
+        plan, _, _ = self._prepare(str(target))
+        assert plan['reason'] is None
+        import shutil
+        shutil.copy(plan['patch_path'], workdir)
+        cmd = application_management_tools._create_delta_extract_command(plan, str(target))
+        subprocess.run(['bash', '-c', cmd], cwd=workdir, check=True)
+        
+        assert (workdir / 'app' / 'a[1].js').read_bytes() == b'v2'
+        assert (workdir / 'app' / 'a1.js').read_bytes() == b'keep'
+        assert (workdir / 'app' / 'big.bin').exists()
+        assert not (workdir / 'app' / 'old*.js').exists()
+        assert (workdir / 'app' / 'oldA.js').exists()
+        assert not (workdir / '.code_deploy_delta_deleted').exists()
+        assert (workdir / '.app.code_deploy_revision').read_text() == f'{target_hash}\n'
+        
+        # 版本标记在部署期间被修改时失败，不在错误的版本上打补丁
+        (workdir / '.app.code_deploy_revision').write_text('000\n')
+        assert subprocess.run(['bash', '-c', cmd], cwd=workdir, capture_output=True).returncode == 1
+    
+    @staticmethod
+    def _base_hash():
+        return application_management_tools.load_application_info()['delta_bases']['demo/g1']['hash_crc64']
+    
+    def test_full_extract_writes_revision_marker(self, tmp_path):
+        """测试普通部署解压后也写入版本标记，下次增量部署可以使用"""
+        artifact = self._make_tar(tmp_path / 'app.tar.gz', {'app/app.py': b'print(1)'})
+        file_hash = application_management_tools.oss_tools.compute_file_crc64(artifact)
+        
+        start_cmd, _ = application_management_tools._generate_start_stop_commands_by_rules(artifact, 'python', 'demo', 8080)
+        
+        assert f'tar -xzf app.tar.gz || exit 1 && echo {file_hash} > .app.code_deploy_revision' in start_cmd
+    
+    def test_code_deploy_uses_patch_revision(self, tmp_path):
+        """测试增量可用时部署补丁对象，完整产物仍然上传，部署后只记录待确认基线"""
+        artifact = self._make_tar(tmp_path / 'app.tar.gz', {'app/app.py': b'print(1)'})
+        plan = {'enabled': True, 'reason': None, 'base_hash': '111', 'target_hash': '222',
+                'patch_path': str(tmp_path / 'app.delta.tar.gz'), 'patch_object_name': 'app.delta.tar.gz',
+                'changed_files': 1, 'deleted_files': 0, 'unchanged_files': 0, 'patch_size': 10, 'full_size': 100}
+        
+        module = 'alibaba_cloud_ops_mcp_server.tools.application_management_tools'
+        
+        def _upload(bucket_name, object_name, file_path, region_id_oss, record=True):
+            return ('patch-v' if object_name == 'app.delta.tar.gz' else 'full-v'), True
+        
+        with patch(f'{module}._describe_instances_by_ids', return_value={'i-1': MagicMock()}), \
+             patch(f'{module}._check_ecs_instances_exist', return_value=(True, [])), \
+             patch(f'{module}.get_or_create_bucket_for_code_deploy', return_value='test-bucket'), \
+             patch(f'{module}._upload_artifact_if_changed', side_effect=_upload) as mock_upload, \
+             patch(f'{module}._prepare_delta_deploy', return_value=plan), \
+             patch(f'{module}._get_application_group_execution_id', return_value='exec-old'), \
+             patch(f'{module}._check_application_exists', return_value=True), \
+             patch(f'{module}._check_application_group_exists', return_value=True), \
+             patch(f'{module}._handle_existing_application_group') as mock_handle, \
+             patch(f'{module}.create_client'):
+            result = application_management_tools.OOS_CodeDeploy(
+                name='demo', deploy_region_id='cn-hangzhou', application_group_name='g1',
+                object_name='app.tar.gz', file_path=artifact, deploy_language='python', port=8080,
+                project_path=str(tmp_path), application_start=None, application_stop=None,
+                instance_ids=['i-1'], deployment_strategy=None, delta=True
+            )
+        
+        assert sorted(call.args[1] for call in mock_upload.call_args_list) == ['app.delta.tar.gz', 'app.tar.gz']
+        args = mock_handle.call_args.args
+        assert args[5:7] == ('app.delta.tar.gz', 'patch-v')
+        assert args[7].startswith('[ -f app.delta.tar.gz ] || exit 1;')
+        assert 'cd app || exit 1 && [ -f app.py ] && nohup python app.py' in args[7]
+        assert result['delta']['enabled'] is True
+        info = application_management_tools.load_application_info()
+        assert 'demo/g1' not in info.get('delta_bases', {})
+        assert info['delta_pending']['demo/g1']['previous_execution_id'] == 'exec-old'
@@ -2,8 +2,13 @@ import pytest
 import tempfile
 import os
 import json
-from unittest.mock import patch, MagicMock
-from alibaba_cloud_ops_mcp_server.tools import local_tools
+import asyncio
+import gzip
+import io
+import tarfile
+import zipfile
+from unittest.mock import patch, MagicMock, AsyncMock
+from alibaba_cloud_ops_mcp_server.tools import local_tools, application_management_tools
 
 
 class TestToolsList:
@@ -70,7 +75,8 @@ class TestLocalListDirectory:
                 f.write('test content')
             os.makedirs(test_dir)
             
-            result = local_tools.LOCAL_ListDirectory(path=tmpdir, recursive=False)
+            result = local_tools.LOCAL_ListDirectory(path=tmpdir, recursive=False, max_depth=None,
+                                                     apply_ignore_rules=True, limit=1000, cursor=None, summary=False)
             
             # 比较真实路径（解决 /var -> /private/var 符号链接问题）
             from pathlib import Path
@@ -90,7 +96,8 @@ class TestLocalListDirectory:
             with open(nested_file, 'w') as f:
                 f.write('nested')
             
-            result = local_tools.LOCAL_ListDirectory(path=tmpdir, recursive=True)
+            result = local_tools.LOCAL_ListDirectory(path=tmpdir, recursive=True, max_depth=None,
+                                                     apply_ignore_rules=True, limit=1000, cursor=None, summary=False)
             
             names = [item['name'] for item in result['items']]
             assert 'subdir' in names
@@ -114,17 +121,95 @@ class TestLocalListDirectory:
             local_tools.LOCAL_ListDirectory(path='/nonexistent/dir', recursive=False)
 
 
+class TestLocalListDirectoryWalker:
+    """测试基于 scandir 的目录遍历、忽略规则、分页与汇总"""
+    
+    @staticmethod
+    def _list(path, **kwargs):
+        params = dict(recursive=True, max_depth=None, apply_ignore_rules=True, limit=1000, cursor=None,
+                      summary=False)
+        params.update(kwargs)
+        return local_tools.LOCAL_ListDirectory(path=str(path), **params)
+    
+    @staticmethod
+    def _make_tree(root, files):
+        for rel_path, content in files.items():
+            file_path = root / rel_path
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            file_path.write_text(content)
+    
+    def test_ignore_rules(self, tmp_path):
+        """测试默认忽略目录和 .gitignore（含取反与子目录 .gitignore）"""
+        self._make_tree(tmp_path, {
+            '.gitignore': 'dist/\n*.log\n!keep.log\n/secret.txt\n',
+            'src/app.py': '', 'src/debug.log': '', 'src/keep.log': '', 'src/secret.txt': '',
+            'secret.txt': '', 'dist/bundle.js': '', 'node_modules/pkg/index.js': '', '.git/HEAD': '',
+            'pkg/.gitignore': 'generated/\n', 'pkg/generated/out.py': '', 'pkg/main.py': '',
+        })
+        
+        result = self._list(tmp_path)
+        paths = {item['relative_path'] for item in result['items']}
+        
+        assert paths == {'.gitignore', 'src', 'src/app.py', 'src/keep.log', 'src/secret.txt',
+                         'pkg', 'pkg/.gitignore', 'pkg/main.py'}
+        assert result['ignored'] == 6
+        assert len(self._list(tmp_path, apply_ignore_rules=False)['items']) == 19
+    
+    def test_max_depth_and_order(self, tmp_path):
+        """测试 max_depth 限制深度，同一目录内按名称排序"""
+        self._make_tree(tmp_path, {'b/c/d.txt': '', 'a.txt': ''})
+        
+        result = self._list(tmp_path, max_depth=2)
+        
+        assert [item['relative_path'] for item in result['items']] == ['a.txt', 'b', 'b/c']
+        assert [item['relative_path'] for item in self._list(tmp_path, recursive=False)['items']] == ['a.txt', 'b']
+    
+    def test_pagination_cursor(self, tmp_path):
+        """测试 limit/cursor 分页遍历全部条目"""
+        self._make_tree(tmp_path, {f'dir{i}/f{j}.txt': '' for i in range(3) for j in range(3)})
+        
+        seen = []
+        cursor = None
+        while True:
+            page = self._list(tmp_path, limit=5, cursor=cursor)
+            seen.extend(item['relative_path'] for item in page['items'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        
+        assert len(seen) == 12
+        assert seen == [item['relative_path'] for item in self._list(tmp_path)['items']]
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            self._list(tmp_path, cursor='abc')
+    
+    def test_summary_mode(self, tmp_path):
+        """测试汇总模式返回各目录的文件数和大小"""
+        self._make_tree(tmp_path, {'a.txt': '12345', 'sub/b.txt': '123', 'sub/deep/c.txt': '12'})
+        
+        result = self._list(tmp_path, summary=True)
+        directories = {item['path']: item for item in result['directories']}
+        
+        assert result['totals'] == {'files': 3, 'dirs': 2, 'size': 10}
+        assert directories['.']['files'] == 1 and directories['.']['size'] == 5
+        assert directories['sub']['total_files'] == 2 and directories['sub']['total_size'] == 5
+        assert directories['sub/deep']['size'] == 2
+
+
 class TestLocalRunShellScript:
     """测试 LOCAL_RunShellScript 函数"""
     
+    @staticmethod
+    def _run(script, working_directory=None, timeout=30, shell=True, **kwargs):
+        params = dict(head_bytes=local_tools.SHELL_OUTPUT_HEAD_BYTES, tail_bytes=local_tools.SHELL_OUTPUT_TAIL_BYTES,
+                      ctx=None)
+        params.update(kwargs)
+        return asyncio.run(local_tools.LOCAL_RunShellScript(
+            script=script, working_directory=working_directory, timeout=timeout, shell=shell, **params
+        ))
+    
     def test_run_shell_script_success(self):
         """测试运行 shell 脚本成功"""
-        result = local_tools.LOCAL_RunShellScript(
-            script='echo "hello world"',
-            working_directory=None,
-            timeout=30,
-            shell=True
-        )
+        result = self._run('echo "hello world"')
         
         assert result['success'] is True
         assert result['exit_code'] == 0
@@ -133,59 +218,182 @@ class TestLocalRunShellScript:
     def test_run_shell_script_with_working_directory(self):
         """测试指定工作目录"""
         with tempfile.TemporaryDirectory() as tmpdir:
-            result = local_tools.LOCAL_RunShellScript(
-                script='pwd',
-                working_directory=tmpdir,
-                timeout=30,
-                shell=True
-            )
+            result = self._run('pwd', working_directory=tmpdir)
             
             assert result['success'] is True
             assert tmpdir in result['stdout']
     
     def test_run_shell_script_non_shell_mode(self):
         """测试非 shell 模式"""
-        result = local_tools.LOCAL_RunShellScript(
-            script='echo hello',
-            working_directory=None,
-            timeout=30,
-            shell=False
-        )
+        result = self._run('echo hello', shell=False)
         
         assert result['success'] is True
         assert 'hello' in result['stdout']
     
     def test_run_shell_script_error(self):
         """测试脚本执行失败"""
-        result = local_tools.LOCAL_RunShellScript(
-            script='exit 1',
-            working_directory=None,
-            timeout=30,
-            shell=True
-        )
+        result = self._run('exit 1')
         
         assert result['success'] is False
         assert result['exit_code'] == 1
     
     def test_run_shell_script_timeout(self):
-        """测试脚本超时"""
-        with pytest.raises(ValueError, match="timeout"):
-            local_tools.LOCAL_RunShellScript(
-                script='sleep 10',
-                working_directory=None,
-                timeout=1,
-                shell=True
-            )
+        """测试脚本超时后终止进程并返回部分输出"""
+        result = self._run('echo started; sleep 10; echo never', timeout=1)
+        
+        assert result['timed_out'] is True
+        assert result['success'] is False
+        assert result['stdout'].strip() == 'started'
+        assert result['duration'] < 8
     
     def test_run_shell_script_invalid_working_directory(self):
         """测试无效的工作目录"""
         with pytest.raises(ValueError):
-            local_tools.LOCAL_RunShellScript(
-                script='echo test',
-                working_directory='/nonexistent/dir',
-                timeout=30,
-                shell=True
-            )
+            self._run('echo test', working_directory='/nonexistent/dir')
+    
+    def test_run_shell_script_command_not_found(self):
+        """测试非 shell 模式下命令不存在"""
+        with pytest.raises(ValueError, match="Command or script not found"):
+            self._run('definitely-not-a-command-12345', shell=False)
+    
+    def test_output_keeps_head_and_tail(self):
+        """测试输出超过上限时只保留开头和结尾"""
+        result = self._run("seq 1 20000; echo err >&2", head_bytes=10, tail_bytes=12)
+        
+        assert result['stdout_bytes'] == len(''.join(f'{i}\n' for i in range(1, 20001)))
+        assert result['stdout'].startswith('1\n2\n3\n4\n5\n')
+        assert result['stdout'].endswith('19999\n20000\n')
+        assert f"[{result['stdout_truncated_bytes']} bytes truncated]" in result['stdout']
+        assert result['stderr'] == 'err\n'
+        assert result['stderr_truncated_bytes'] == 0
+    
+    def test_progress_reports_latest_output(self):
+        """测试执行过程中通过进度通知返回最新输出"""
+        ctx = MagicMock()
+        ctx.report_progress = AsyncMock()
+        
+        with patch.object(local_tools, 'SHELL_PROGRESS_INTERVAL', 0.2):
+            result = self._run('echo building; sleep 1; echo done', ctx=ctx)
+        
+        assert result['success'] is True
+        messages = [call.kwargs['message'] for call in ctx.report_progress.call_args_list]
+        assert 'building' in messages
+        assert all(call.kwargs['total'] == 30 for call in ctx.report_progress.call_args_list)
+
+
+class TestOutputBuffer:
+    """测试 _OutputBuffer 的头尾字节上限"""
+    
+    def test_small_output_kept_whole(self):
+        buffer = local_tools._OutputBuffer(4, 4)
+        buffer.write(b'abcdef')
+        
+        assert buffer.text() == 'abcdef'
+        assert buffer.truncated_bytes == 0
+    
+    def test_tail_is_bounded(self):
+        buffer = local_tools._OutputBuffer(2, 3)
+        for _ in range(100):
+            buffer.write(b'0123456789')
+        
+        assert buffer.total == 1000
+        assert len(buffer.tail) <= 6
+        assert buffer.truncated_bytes == 995
+        assert buffer.text() == '01\n... [995 bytes truncated] ...\n789'
+
+
+class TestLocalJobs:
+    """测试后台任务的启动、轮询、等待、取消和并发限制"""
+    
+    @pytest.fixture(autouse=True)
+    def job_manager(self):
+        manager = local_tools._JobManager()
+        with patch.object(local_tools, '_job_manager', manager):
+            yield manager
+        manager.shutdown()
+    
+    @staticmethod
+    def _start(script, **kwargs):
+        params = dict(working_directory=None, shell=True, name=None)
+        params.update(kwargs)
+        return local_tools.LOCAL_StartJob(script=script, **params)
+    
+    @staticmethod
+    def _wait(job_id, timeout=10, ctx=None):
+        return asyncio.run(local_tools.LOCAL_WaitForJob(job_id=job_id, timeout=timeout,
+                                                        tail_bytes=local_tools.JOB_DEFAULT_TAIL_BYTES, ctx=ctx))
+    
+    def test_start_and_wait(self, tmp_path):
+        """测试后台任务执行完成后返回状态和输出"""
+        job = self._start('echo building; echo warn >&2; exit 3', working_directory=str(tmp_path), name='build')
+        
+        result = self._wait(job['job_id'])
+        
+        assert job['name'] == 'build'
+        assert result['status'] == 'failed'
+        assert result['exit_code'] == 3
+        assert result['timed_out'] is False
+        assert result['tail'] == 'building\nwarn\n'
+        assert local_tools.LOCAL_GetJobStatus(job_id=None)['count'] == 1
+    
+    def test_wait_timeout_keeps_job_running(self):
+        """测试等待超时不终止任务"""
+        job = self._start('sleep 5')
+        
+        result = self._wait(job['job_id'], timeout=1)
+        
+        assert result['timed_out'] is True
+        assert local_tools.LOCAL_GetJobStatus(job_id=job['job_id'])['status'] == 'running'
+    
+    def test_concurrency_limit_queues_jobs(self):
+        """测试超过并发上限的任务排队，前一个任务结束后自动启动"""
+        with patch.object(local_tools.settings, 'local_job_max_concurrency', 1):
+            first = self._start('sleep 1')
+            second = self._start('echo second')
+            
+            assert first['status'] == 'running'
+            assert second['status'] == 'queued'
+            assert self._wait(second['job_id'])['status'] == 'succeeded'
+    
+    def test_cancel_kills_process_group(self, tmp_path):
+        """测试取消运行中的任务会结束整个进程组"""
+        marker = tmp_path / 'marker'
+        job = self._start(f'(sleep 3; touch {marker}) & wait')
+        
+        local_tools.LOCAL_CancelJob(job_id=job['job_id'])
+        result = self._wait(job['job_id'])
+        
+        assert result['status'] == 'cancelled'
+        import time
+        time.sleep(3.5)
+        assert not marker.exists()
+    
+    def test_cancel_queued_job(self):
+        """测试取消排队中的任务"""
+        with patch.object(local_tools.settings, 'local_job_max_concurrency', 1):
+            self._start('sleep 2')
+            queued = self._start('echo never')
+            
+            assert local_tools.LOCAL_CancelJob(job_id=queued['job_id'])['status'] == 'cancelled'
+    
+    def test_unknown_job(self):
+        """测试任务不存在"""
+        with pytest.raises(ValueError, match="Job not found"):
+            local_tools.LOCAL_TailJobOutput(job_id='job-missing', tail_bytes=100)
+    
+    def test_spill_file_rotation(self, tmp_path):
+        """测试输出文件轮转，tail 可跨文件读取且磁盘占用有上限"""
+        spill = local_tools._SpillFile(str(tmp_path), max_bytes=10, max_files=2)
+        for i in range(10):
+            spill.write(f'line{i}\n'.encode())
+        spill.close()
+        
+        assert spill.total == 60
+        assert spill.rotations > 0
+        assert sorted(os.listdir(tmp_path)) == ['output.log', 'output.log.1']
+        assert spill.tail(12) == b'line8\nline9\n'
+        assert spill.tail(1000).endswith(b'line9\n')
+        assert len(spill.tail(1000)) <= 20
 
 
 class TestLocalAnalyzeDeployStack:
@@ -302,3 +510,235 @@ class TestLocalAnalyzeDeployStack:
             result = local_tools.LOCAL_AnalyzeDeployStack(directory=tmpdir)
             
             assert result['runtime_versions'].get('python') == '3.10.0'
+
+
+class TestLocalAnalyzeDeployStackDiscovery:
+    """测试 monorepo 子项目发现与按标记文件缓存"""
+    
+    @staticmethod
+    def _analyze(directory, **kwargs):
+        params = dict(discover=True, max_depth=local_tools.STACK_DISCOVERY_DEFAULT_DEPTH, apply_ignore_rules=True)
+        params.update(kwargs)
+        return local_tools.LOCAL_AnalyzeDeployStack(directory=str(directory), **params)
+    
+    @staticmethod
+    def _make_tree(root, files):
+        for rel_path, content in files.items():
+            file_path = root / rel_path
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            file_path.write_text(content)
+    
+    def test_discovers_sub_projects(self, tmp_path):
+        """测试发现所有子项目，跳过依赖目录并受深度限制"""
+        self._make_tree(tmp_path, {
+            'package.json': '{"private": true}',
+            'services/api/go.mod': 'module api\n\ngo 1.21\n',
+            'services/web/package.json': '{"engines": {"node": ">=18"}}',
+            'services/web/node_modules/dep/package.json': '{}',
+            'tools/deep/a/b/c/requirements.txt': 'flask\n',
+        })
+        
+        result = self._analyze(tmp_path)
+        projects = {project['relative_path']: project for project in result['projects']}
+        
+        assert set(projects) == {'.', 'services/api', 'services/web'}
+        assert projects['services/api']['runtime_versions'] == {'go': '1.21'}
+        assert projects['services/web']['runtime_versions'] == {'node': '>=18'}
+        assert result['deployment_methods'] == ['npm']
+        assert 'tools/deep/a/b/c' in {p['relative_path'] for p in self._analyze(tmp_path, max_depth=6)['projects']}
+    
+    def test_cache_reanalyzes_only_changed_projects(self, tmp_path):
+        """测试重复调用命中缓存，只有标记文件变化的子项目重新分析"""
+        self._make_tree(tmp_path, {'a/go.mod': 'go 1.20\n', 'b/go.mod': 'go 1.20\n'})
+        
+        first = self._analyze(tmp_path)
+        second = self._analyze(tmp_path)
+        (tmp_path / 'b' / 'go.mod').write_text('go 1.22.1\n')
+        third = self._analyze(tmp_path)
+        
+        assert first['cache_hits'] == 0
+        assert second['cache_hits'] == 2
+        assert third['cache_hits'] == 1
+        assert {p['relative_path']: p['runtime_versions']['go'] for p in third['projects']} == {'a': '1.20', 'b': '1.22'}
+    
+    def test_single_directory_cached(self, tmp_path):
+        """测试单目录分析结果缓存，且缓存结果不会被调用方修改"""
+        self._make_tree(tmp_path, {'Dockerfile': 'FROM python:3.11\n'})
+        
+        first = local_tools.LOCAL_AnalyzeDeployStack(directory=str(tmp_path))
+        first['frameworks'].append('mutated')
+        second = local_tools.LOCAL_AnalyzeDeployStack(directory=str(tmp_path))
+        
+        assert first['cached'] is False
+        assert second['cached'] is True
+        assert second['frameworks'] == ['docker']
+        assert 'projects' not in second
+
+
+class TestLocalPackageArtifact:
+    """测试 LOCAL_PackageArtifact 打包产物"""
+    
+    @pytest.fixture(autouse=True)
+    def reset_project_path(self):
+        yield
+        local_tools.set_project_path(None)
+    
+    def _make_tree(self, root):
+        (root / 'src').mkdir()
+        (root / 'src' / 'app.py').write_text('print("hi")\n')
+        (root / 'src' / 'data.bin').write_bytes(os.urandom(300 * 1024))
+        (root / 'run.sh').write_text('#!/bin/sh\n')
+        (root / 'run.sh').chmod(0o700)
+        (root / 'debug.log').write_text('log\n')
+        (root / '.gitignore').write_text('*.log\n')
+        (root / 'node_modules' / 'dep').mkdir(parents=True)
+        (root / 'node_modules' / 'dep' / 'index.js').write_text('')
+    
+    def _package(self, root, output_name='app.tar.gz', **kwargs):
+        params = {'project_path': None, 'root_directory': None, 'apply_ignore_rules': True,
+                  'exclude_patterns': None, 'compression_workers': None, 'fingerprint_directory': None,
+                  'use_cache': False, 'check_only': False}
+        params.update(kwargs)
+        return local_tools.LOCAL_PackageArtifact(source_directory=str(root), output_name=output_name, **params)
+    
+    def test_tar_gz_normalized_entries(self, tmp_path):
+        """测试 tar.gz 产物写入 release 目录，跳过忽略项，条目元数据归一化"""
+        self._make_tree(tmp_path)
+        
+        result = self._package(tmp_path, root_directory='app')
+        
+        assert result['artifact_path'] == str(tmp_path / '.code_deploy' / 'release' / 'app.tar.gz')
+        with tarfile.open(result['artifact_path']) as tar:
+            members = {member.name: member for member in tar.getmembers()}
+            assert tar.extractfile('app/src/data.bin').read() == (tmp_path / 'src' / 'data.bin').read_bytes()
+        assert sorted(members) == ['app/.gitignore', 'app/run.sh', 'app/src', 'app/src/app.py', 'app/src/data.bin']
+        assert {m.mtime for m in members.values()} == {local_tools.PACKAGE_ENTRY_MTIME}
+        assert {(m.uid, m.gid, m.uname) for m in members.values()} == {(0, 0, '')}
+        assert members['app/run.sh'].mode == 0o755
+        assert members['app/src/app.py'].mode == 0o644
+        assert result['files'] == 4
+        assert result['ignored'] == 3
+    
+    def test_reproducible_across_mtimes_and_workers(self, tmp_path):
+        """测试修改时间或压缩线程数变化时产物哈希不变，内容变化时哈希改变"""
+        self._make_tree(tmp_path)
+        
+        first = self._package(tmp_path, compression_workers=4)
+        os.utime(tmp_path / 'src' / 'app.py', (1, 1))
+        second = self._package(tmp_path, compression_workers=1)
+        (tmp_path / 'src' / 'app.py').write_text('print("changed")\n')
+        third = self._package(tmp_path, compression_workers=4)
+        
+        assert first['sha256'] == second['sha256']
+        assert third['sha256'] != first['sha256']
+    
+    def test_parallel_gzip_single_member(self):
+        """测试多线程分块压缩输出为单个 gzip 成员，且与单线程输出一致"""
+        data = os.urandom(1000) * 500
+        outputs = []
+        for workers in (1, 3):
+            output = io.BytesIO()
+            writer = local_tools._ParallelGzipWriter(output, workers=workers, block_size=64 * 1024)
+            writer.write(data[:1234])
+            writer.write(data[1234:])
+            writer.close()
+            outputs.append(output.getvalue())
+        
+        assert gzip.decompress(outputs[1]) == data
+        assert outputs[0] == outputs[1]
+        assert outputs[1].count(local_tools.GZIP_HEADER) == 1
+        # Back-references across blocks keep the repeated data compressing like a single stream
+        assert len(outputs[1]) < 20 * 1024
+    
+    def test_large_artifact_readable_by_deploy_analyzer(self, tmp_path):
+        """测试超过一个压缩块的产物可被流式读取并分析"""
+        (tmp_path / 'package.json').write_text('{"scripts": {"start": "node index.js"}}')
+        (tmp_path / 'index.js').write_text('console.log(1)\n')
+        (tmp_path / 'assets').mkdir()
+        (tmp_path / 'assets' / 'blob.bin').write_bytes(os.urandom(3 * 1024 * 1024))
+        
+        result = self._package(tmp_path, root_directory='app', compression_workers=4)
+        analysis = application_management_tools._analyze_deployment_file(result['artifact_path'], 'nodejs')
+        with tarfile.open(result['artifact_path'], 'r|gz') as tar:
+            names = [member.name for member in tar]
+        
+        assert 'app/assets/blob.bin' in names
+        assert 'app/package.json' in analysis['files_in_archive']
+        assert analysis['extracted_dir_name'] == 'app'
+    
+    def test_zip_with_exclude_patterns(self, tmp_path):
+        """测试 zip 产物使用 Unix 权限并应用额外排除规则"""
+        self._make_tree(tmp_path)
+        
+        first = self._package(tmp_path, 'app.zip', exclude_patterns=['*.bin'])
+        second = self._package(tmp_path, 'app.zip', exclude_patterns=['*.bin'])
+        
+        with zipfile.ZipFile(first['artifact_path']) as zf:
+            infos = {info.filename: info for info in zf.infolist()}
+        assert sorted(infos) == ['.gitignore', 'run.sh', 'src/', 'src/app.py']
+        assert infos['run.sh'].external_attr >> 16 & 0o777 == 0o755
+        assert infos['src/app.py'].date_time == (1980, 1, 1, 0, 0, 0)
+        assert first['sha256'] == second['sha256']
+    
+    def test_invalid_output_name(self, tmp_path):
+        """测试不支持的产物类型"""
+        with pytest.raises(ValueError, match='Unsupported artifact type'):
+            self._package(tmp_path, 'app.rar')
+        assert not (tmp_path / '.code_deploy' / 'release' / 'app.rar').exists()
+
+    def test_cache_hit_skips_packaging(self, tmp_path):
+        """测试源码未变化时直接返回缓存产物，仅修改时间变化时通过哈希确认内容未变"""
+        self._make_tree(tmp_path)
+        # Files written just before the stat snapshot are always rehashed, backdate them
+        for path in tmp_path.rglob('*'):
+            os.utime(path, (1000, 1000))
+        
+        first = self._package(tmp_path, use_cache=True)
+        with patch.object(local_tools, '_write_tar_package') as write_tar:
+            second = self._package(tmp_path, use_cache=True)
+            os.utime(tmp_path / 'src' / 'app.py', (1, 1))
+            third = self._package(tmp_path, use_cache=True)
+        (tmp_path / 'src' / 'app.py').write_text('print("changed")\n')
+        fourth = self._package(tmp_path, use_cache=True)
+        
+        write_tar.assert_not_called()
+        assert first['cached'] is False
+        assert second['cached'] is True and third['cached'] is True
+        assert second['sha256'] == first['sha256'] and second['fingerprint'] == first['fingerprint']
+        assert third['fingerprint_stats']['hashed_files'] == 1
+        assert fourth['cached'] is False
+        assert fourth['fingerprint'] != first['fingerprint']
+    
+    def test_check_only_before_build(self, tmp_path):
+        """测试以项目根目录为指纹检查缓存，构建输出目录不参与指纹"""
+        self._make_tree(tmp_path)
+        dist = tmp_path / 'dist'
+        params = {'fingerprint_directory': str(tmp_path), 'use_cache': True}
+        
+        miss = self._package(dist, check_only=True, **params)
+        dist.mkdir()
+        (dist / 'bundle.js').write_text('built')
+        built = self._package(dist, **params)
+        (dist / 'bundle.js').write_text('rebuilt')
+        hit = self._package(dist, check_only=True, **params)
+        (tmp_path / 'src' / 'app.py').write_text('print("changed")\n')
+        stale = self._package(dist, check_only=True, **params)
+        
+        assert miss['cached'] is False and miss['artifact_path'] is None
+        assert built['artifact_path'] == str(tmp_path / '.code_deploy' / 'release' / 'app.tar.gz')
+        assert hit['cached'] is True and hit['artifact_path'] == built['artifact_path']
+        assert stale['cached'] is False
+    
+    def test_cache_miss_when_artifact_replaced(self, tmp_path):
+        """测试缓存产物被删除或打包参数变化时重新打包"""
+        self._make_tree(tmp_path)
+        
+        first = self._package(tmp_path, use_cache=True)
+        os.remove(first['artifact_path'])
+        second = self._package(tmp_path, use_cache=True)
+        third = self._package(tmp_path, use_cache=True, root_directory='app')
+        
+        assert second['cached'] is False
+        assert os.path.exists(second['artifact_path'])
+        assert third['cached'] is False
+        assert third['fingerprint'] != second['fingerprint']
@@ -29,11 +29,73 @@ def test_OSS_ListBuckets():
     result = func(RegionId='cn-test', Prefix='prefix')
     assert result == ['bucket1']
 
-@patch('alibaba_cloud_ops_mcp_server.tools.oss_tools.create_client', fake_client)
-def test_OSS_ListObjects():
+def fake_object(key, size=1):
+    import datetime
+    return MagicMock(key=key, size=size, etag='"ETAG"', storage_class='Standard',
+                     last_modified=datetime.datetime(2024, 1, 1))
+
+
+@patch('alibaba_cloud_ops_mcp_server.tools.oss_tools.create_client')
+def test_OSS_ListObjects(mock_create_client):
+    mock_client = MagicMock()
+    mock_client.list_objects_v2.return_value = MagicMock(
+        contents=[fake_object('obj1', 10)], common_prefixes=[], is_truncated=False,
+        next_continuation_token=None
+    )
+    mock_create_client.return_value = mock_client
+    func = get_tool_func("OSS_ListObjects")
+    result = func(RegionId='cn-test', BucketName='bucket', Prefix='prefix', MaxKeys=100,
+                  ContinuationToken=None, Delimiter=None, StartAfter=None)
+    assert result['objects'] == [{
+        'key': 'obj1',
+        'size': 10,
+        'etag': 'ETAG',
+        'last_modified': '2024-01-01T00:00:00',
+        'storage_class': 'Standard'
+    }]
+    assert result['count'] == 1
+    assert result['is_truncated'] is False
+    assert result['next_continuation_token'] is None
+
+
+@patch('alibaba_cloud_ops_mcp_server.tools.oss_tools.create_client')
+def test_OSS_ListObjects_pagination(mock_create_client):
+    mock_client = MagicMock()
+    mock_client.list_objects_v2.side_effect = [
+        MagicMock(contents=[fake_object('a')], common_prefixes=[MagicMock(prefix='dir/')],
+                  is_truncated=True, next_continuation_token='token-1'),
+        MagicMock(contents=[fake_object('b')], common_prefixes=[],
+                  is_truncated=True, next_continuation_token='token-2'),
+    ]
+    mock_create_client.return_value = mock_client
+    func = get_tool_func("OSS_ListObjects")
+    result = func(RegionId='cn-test', BucketName='bucket', Prefix=None, MaxKeys=3,
+                  ContinuationToken='token-0', Delimiter='/', StartAfter=None)
+
+    assert [o['key'] for o in result['objects']] == ['a', 'b']
+    assert result['common_prefixes'] == ['dir/']
+    assert result['is_truncated'] is True
+    assert result['next_continuation_token'] == 'token-2'
+    first_request = mock_client.list_objects_v2.call_args_list[0][0][0]
+    second_request = mock_client.list_objects_v2.call_args_list[1][0][0]
+    assert first_request.continuation_token == 'token-0'
+    assert first_request.max_keys == 3
+    assert second_request.continuation_token == 'token-1'
+    assert second_request.max_keys == 1
+
+
+@patch('alibaba_cloud_ops_mcp_server.tools.oss_tools.create_client')
+def test_OSS_ListObjects_max_keys_capped(mock_create_client):
+    mock_client = MagicMock()
+    mock_client.list_objects_v2.return_value = MagicMock(
+        contents=[], common_prefixes=[], is_truncated=False, next_continuation_token=None
+    )
+    mock_create_client.return_value = mock_client
     func = get_tool_func("OSS_ListObjects")
-    result = func(RegionId='cn-test', BucketName='bucket', Prefix='prefix')
-    assert result == ['obj1']
+    func(RegionId='cn-test', BucketName='bucket', Prefix=None, MaxKeys=100000,
+         ContinuationToken=None, Delimiter=None, StartAfter=None)
+    request = mock_client.list_objects_v2.call_args[0][0]
+    assert request.max_keys == oss_tools.MAX_LIST_OBJECTS_KEYS
 
 @patch('alibaba_cloud_ops_mcp_server.tools.oss_tools.create_client', fake_client)
 def test_OSS_ListObjects_no_bucket():
@@ -98,6 +160,65 @@ def test_create_client(mock_oss, mock_provider):
     assert mock_cfg.credentials_provider == mock_provider.return_value 
 
 
+@patch('alibaba_cloud_ops_mcp_server.alibabacloud.utils.get_credentials_from_header', return_value=None)
+@patch('alibaba_cloud_ops_mcp_server.tools.oss_tools.CredentialsProvider')
+@patch('alibaba_cloud_ops_mcp_server.tools.oss_tools.oss')
+def test_create_client_pooled(mock_oss, mock_provider, mock_get_creds):
+    """测试 OSS 客户端按 region / 凭证 / endpoint 类型复用"""
+    mock_oss.Client.side_effect = lambda cfg: MagicMock()
+    with patch.object(oss_tools, '_client_pool', oss_tools.OrderedDict()), \
+         patch.object(oss_tools.settings, 'oss_client_pool_size', 2):
+        client_a = oss_tools.create_client('cn-pool-a')
+        assert oss_tools.create_client('cn-pool-a') is client_a
+        client_internal = oss_tools.create_client('cn-pool-a', internal=True)
+        assert client_internal is not client_a
+        assert mock_provider.call_count == 2
+
+        # 超过容量时淘汰最久未使用的客户端
+        oss_tools.create_client('cn-pool-b')
+        assert len(oss_tools._client_pool) == 2
+        assert oss_tools.create_client('cn-pool-a') is not client_a
+
+
+@patch('alibaba_cloud_ops_mcp_server.alibabacloud.utils.get_credentials_from_header')
+@patch('alibaba_cloud_ops_mcp_server.tools.oss_tools.oss')
+def test_create_client_pooled_header_credentials_refreshed(mock_oss, mock_get_creds):
+    """测试同一 AccessKeyId 的新 token 会原地更新到已缓存客户端"""
+    mock_oss.Client.side_effect = lambda cfg: MagicMock()
+    mock_get_creds.return_value = {'AccessKeyId': 'ak', 'AccessKeySecret': 'secret', 'SecurityToken': 'token-1'}
+    with patch.object(oss_tools, '_client_pool', oss_tools.OrderedDict()):
+        client = oss_tools.create_client('cn-pool-h')
+        provider = mock_oss.config.load_default.return_value.credentials_provider
+        assert provider.get_credentials().security_token == 'token-1'
+
+        mock_get_creds.return_value = {'AccessKeyId': 'ak', 'AccessKeySecret': 'secret', 'SecurityToken': 'token-2'}
+        assert oss_tools.create_client('cn-pool-h') is client
+        assert provider.get_credentials().security_token == 'token-2'
+
+        mock_get_creds.return_value = {'AccessKeyId': 'other', 'AccessKeySecret': 's', 'SecurityToken': None}
+        assert oss_tools.create_client('cn-pool-h') is not client
+
+
+def test_shared_http_client_sized_and_configured():
+    """测试共享 HTTP 客户端的连接池按同步并发设定大小并沿用配置中的超时"""
+    cfg = oss_tools.oss.config.load_default()
+    cfg.connect_timeout = 7
+    cfg.readwrite_timeout = 90
+    with patch.object(oss_tools, '_shared_http_client', None), \
+         patch.object(oss_tools.settings, 'oss_parallel_num', 4), \
+         patch.object(oss_tools.settings, 'oss_max_connections', 0), \
+         patch('alibaba_cloud_ops_mcp_server.tools.oss_tools.oss.transport.RequestsHttpClient') as mock_http:
+        client = oss_tools._get_shared_http_client(cfg)
+        assert oss_tools._get_shared_http_client(cfg) is client
+        mock_http.assert_called_once_with(max_connections=oss_tools.MAX_SYNC_PARALLEL * 4,
+                                          connect_timeout=7, readwrite_timeout=90)
+
+    with patch.object(oss_tools, '_shared_http_client', None), \
+         patch.object(oss_tools.settings, 'oss_max_connections', 500):
+        client = oss_tools._get_shared_http_client(oss_tools.oss.config.load_default())
+        assert client._max_connections == 500
+
+
 @patch('alibaba_cloud_ops_mcp_server.tools.oss_tools.create_client')
 def test_OSS_PutObject_success(mock_create_client):
     """测试 OSS_PutObject 成功上传"""
@@ -259,4 +380,280 @@ def test_OSS_PutObject_infer_content_type(mock_create_client):
         # html 文件应该被识别为 text/html
         assert 'text/html' in result['content_type']
     finally:
-        os.unlink(temp_file)
\ No newline at end of file
+        os.unlink(temp_file)
+
+@patch('alibaba_cloud_ops_mcp_server.tools.oss_tools.create_client')
+def test_OSS_PutObject_multipart(mock_create_client):
+    """测试 OSS_PutObject 大文件走分片上传"""
+    import tempfile
+    import os
+
+    with tempfile.NamedTemporaryFile(mode='wb', suffix='.tar.gz', delete=False) as f:
+        f.write(b'x' * 1024)
+        temp_file = f.name
+
+    try:
+        mock_client = MagicMock()
+        mock_result = MagicMock()
+        mock_result.status_code = 200
+        mock_result.etag = 'multipart-etag'
+        mock_result.version_id = 'v2'
+        mock_client.uploader.return_value.upload_file.return_value = mock_result
+        mock_create_client.return_value = mock_client
+
+        with patch.object(oss_tools.settings, 'oss_multipart_threshold', 512), \
+             patch.object(oss_tools.settings, 'oss_checkpoint_dir', None):
+            result = oss_tools.OSS_PutObject(
+                BucketName='test-bucket',
+                ObjectKey='test/app.tar.gz',
+                FilePath=temp_file,
+                RegionId='cn-hangzhou',
+                ContentType=None
+            )
+
+        assert result['multipart'] is True
+        assert result['version_id'] == 'v2'
+        assert result['file_size'] == 1024
+        mock_client.put_object.assert_not_called()
+        _, kwargs = mock_client.uploader.call_args
+        assert kwargs['enable_checkpoint'] is True
+        mock_client.uploader.return_value.upload_file.assert_called_once()
+    finally:
+        os.unlink(temp_file)
+
+
+def test_compute_file_crc64():
+    """测试流式计算文件 CRC64"""
+    import tempfile
+    import os
+
+    with tempfile.NamedTemporaryFile(mode='wb', delete=False) as f:
+        f.write(b'123456789')
+        temp_file = f.name
+
+    try:
+        # CRC-64/ECMA-182 check value used by OSS
+        assert oss_tools.compute_file_crc64(temp_file) == str(0x995DC9BBDF1939FA)
+    finally:
+        os.unlink(temp_file)
+
+
+def test_head_object_hash_not_found():
+    """测试对象不存在时返回 None"""
+    mock_client = MagicMock()
+    mock_client.head_object.side_effect = Exception('NoSuchKey')
+    assert oss_tools.head_object_hash(mock_client, 'bucket', 'key') is None
+
+
+def fake_listing_client(pages_by_prefix, delimiter_pages=None):
+    """按 prefix 返回分页结果的 fake client"""
+    class FakePaginator:
+        def iter_page(self, req):
+            if req.delimiter == '/':
+                yield from delimiter_pages
+            else:
+                yield from pages_by_prefix[req.prefix]
+
+    client = MagicMock()
+    client.list_objects_v2_paginator.return_value = FakePaginator()
+    return client
+
+
+def test_OSS_SummarizeBucket_sequential():
+    import datetime
+    objects = [
+        MagicMock(key='logs/a.log', size=512, storage_class='Standard', last_modified=datetime.datetime(2024, 1, 2)),
+        MagicMock(key='logs/b.log', size=2048, storage_class='IA', last_modified=datetime.datetime(2023, 1, 1)),
+        MagicMock(key='index.html', size=2 * 1024 * 1024 * 1024, storage_class='Standard',
+                  last_modified=datetime.datetime(2025, 1, 1)),
+    ]
+    client = fake_listing_client({None: [MagicMock(contents=objects[:2]), MagicMock(contents=objects[2:])]})
+    with patch('alibaba_cloud_ops_mcp_server.tools.oss_tools.create_client', return_value=client):
+        func = get_tool_func("OSS_SummarizeBucket")
+        result = func(BucketName='bucket', RegionId='cn-test', Prefix=None, Parallel=1, TopPrefixes=20)
+
+    assert result['object_count'] == 3
+    assert result['total_size'] == 512 + 2048 + 2 * 1024 * 1024 * 1024
+    histogram = {item['range']: item['count'] for item in result['size_histogram']}
+    assert histogram == {'<1KB': 1, '1KB-1MB': 1, '1MB-100MB': 0, '100MB-1GB': 0, '>=1GB': 1}
+    assert result['storage_classes']['IA'] == {'count': 1, 'size': 2048}
+    assert result['top_prefixes'][0]['prefix'] == ''
+    assert {'prefix': 'logs/', 'count': 2, 'size': 2560} in result['top_prefixes']
+    assert result['oldest_object']['key'] == 'logs/b.log'
+    assert result['newest_object']['key'] == 'index.html'
+
+
+def test_OSS_SummarizeBucket_parallel_shards():
+    import datetime
+    root_object = MagicMock(key='data/readme.txt', size=10, storage_class='Standard',
+                            last_modified=datetime.datetime(2024, 1, 1))
+    delimiter_pages = [MagicMock(contents=[root_object],
+                                 common_prefixes=[MagicMock(prefix='data/a/'), MagicMock(prefix='data/b/')])]
+    pages = {
+        'data/a/': [MagicMock(contents=[MagicMock(key='data/a/1', size=100, storage_class='Standard',
+                                                  last_modified=datetime.datetime(2024, 1, 1))])],
+        'data/b/': [MagicMock(contents=[MagicMock(key='data/b/1', size=1000, storage_class='Archive',
+                                                  last_modified=datetime.datetime(2024, 1, 1))])],
+    }
+    client = fake_listing_client(pages, delimiter_pages)
+    with patch('alibaba_cloud_ops_mcp_server.tools.oss_tools.create_client', return_value=client):
+        func = get_tool_func("OSS_SummarizeBucket")
+        result = func(BucketName='bucket', RegionId='cn-test', Prefix='data/', Parallel=4, TopPrefixes=1)
+
+    assert result['object_count'] == 3
+    assert result['total_size'] == 1110
+    assert result['shard_count'] == 3
+    assert result['prefix_count'] == 3
+    assert result['top_prefixes'] == [{'prefix': 'data/b/', 'count': 1, 'size': 1000}]
+
+
+def test_OSS_SummarizeBucket_no_bucket():
+    func = get_tool_func("OSS_SummarizeBucket")
+    with pytest.raises(ValueError):
+        func(BucketName='', RegionId='cn-test', Prefix=None, Parallel=1, TopPrefixes=20)
+
+
+def test_OSS_SyncDirectory_uploads_changed_files():
+    import tempfile
+    import os
+    import hashlib
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.makedirs(os.path.join(tmpdir, 'sub'))
+        for name, content in (('a.txt', b'same'), ('b.txt', b'changed'), ('sub/c.txt', b'new')):
+            with open(os.path.join(tmpdir, name), 'wb') as f:
+                f.write(content)
+
+        same_etag = '"' + hashlib.md5(b'same').hexdigest().upper() + '"'
+        client = fake_listing_client({'site/': [MagicMock(contents=[
+            MagicMock(key='site/a.txt', size=4, etag=same_etag),
+            MagicMock(key='site/b.txt', size=3, etag='"OLD"'),
+        ])]})
+        client.put_object.return_value = MagicMock()
+        with patch('alibaba_cloud_ops_mcp_server.tools.oss_tools.create_client', return_value=client):
+            func = get_tool_func("OSS_SyncDirectory")
+            result = func(LocalDirectory=tmpdir, BucketName='bucket', Prefix='site', RegionId='cn-test',
+                          Parallel=2, DryRun=False)
+
+        assert result['uploaded_count'] == 2
+        assert result['skipped_count'] == 1
+        assert result['failed_count'] == 0
+        assert result['bytes_uploaded'] == len(b'changed') + len(b'new')
+        assert sorted(result['uploaded_files']) == ['site/b.txt', 'site/sub/c.txt']
+        assert client.put_object.call_count == 2
+
+
+def test_OSS_SyncDirectory_dry_run_and_failures():
+    import tempfile
+    import os
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with open(os.path.join(tmpdir, 'a.txt'), 'wb') as f:
+            f.write(b'data')
+
+        client = fake_listing_client({None: [MagicMock(contents=[])]})
+        with patch('alibaba_cloud_ops_mcp_server.tools.oss_tools.create_client', return_value=client):
+            func = get_tool_func("OSS_SyncDirectory")
+            result = func(LocalDirectory=tmpdir, BucketName='bucket', Prefix='', RegionId='cn-test',
+                          Parallel=1, DryRun=True)
+            assert result['uploaded_count'] == 0
+            assert result['bytes_uploaded'] == 0
+            assert result['bytes_per_second'] == 0
+            assert result['uploaded_files'] == []
+            assert result['would_upload_count'] == 1
+            assert result['bytes_to_upload'] == 4
+            assert result['would_upload_files'] == ['a.txt']
+            client.put_object.assert_not_called()
+
+            client.put_object.side_effect = Exception('AccessDenied')
+            result = func(LocalDirectory=tmpdir, BucketName='bucket', Prefix='', RegionId='cn-test',
+                          Parallel=1, DryRun=False)
+            assert result['failed_count'] == 1
+            assert result['failed_files'][0]['key'] == 'a.txt'
+
+
+def test_OSS_SyncDirectory_bounds_pending_files():
+    import tempfile
+    import threading
+    from alibaba_cloud_ops_mcp_server.tools import oss_tools
+
+    lock = threading.Lock()
+    state = {'walked': 0, 'synced': 0, 'max_ahead': 0}
+
+    def walk(root):
+        for i in range(200):
+            with lock:
+                state['walked'] += 1
+                state['max_ahead'] = max(state['max_ahead'], state['walked'] - state['synced'])
+            yield f'f{i}.txt', f'{root}/f{i}.txt', 1
+
+    def up_to_date(*args):
+        with lock:
+            state['synced'] += 1
+        return True
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        client = fake_listing_client({None: [MagicMock(contents=[])]})
+        with patch('alibaba_cloud_ops_mcp_server.tools.oss_tools.create_client', return_value=client), \
+             patch('alibaba_cloud_ops_mcp_server.tools.oss_tools._walk_local_files', side_effect=walk), \
+             patch('alibaba_cloud_ops_mcp_server.tools.oss_tools._is_remote_up_to_date', side_effect=up_to_date):
+            func = get_tool_func("OSS_SyncDirectory")
+            result = func(LocalDirectory=tmpdir, BucketName='bucket', Prefix='', RegionId='cn-test',
+                          Parallel=2, DryRun=False)
+
+    assert result['skipped_count'] == 200
+    # The walk is consumed lazily: at most one window of files is ahead of the finished uploads
+    assert state['max_ahead'] <= 2 * oss_tools.SYNC_PENDING_FACTOR + 1
+
+
+@patch('alibaba_cloud_ops_mcp_server.tools.oss_tools.create_client')
+def test_OSS_GetObject_tail(mock_create_client):
+    mock_client = MagicMock()
+    mock_result = MagicMock()
+    mock_result.content_range = 'bytes 90-99/100'
+    mock_result.body.read.return_value = b'last line\n'
+    mock_client.get_object.return_value = mock_result
+    mock_create_client.return_value = mock_client
+
+    func = get_tool_func("OSS_GetObject")
+    result = func(BucketName='bucket', ObjectKey='logs/app.log', RegionId='cn-test', Mode='tail',
+                  FilePath=None, Bytes=10)
+
+    assert result['content'] == 'last line\n'
+    assert result['bytes_returned'] == 10
+    request = mock_client.get_object.call_args[0][0]
+    assert request.range_header == 'bytes=-10'
+    mock_result.body.close.assert_called_once()
+
+
+@patch('alibaba_cloud_ops_mcp_server.tools.oss_tools.create_client')
+def test_OSS_GetObject_download(mock_create_client):
+    import tempfile
+    import os
+
+    mock_client = MagicMock()
+    mock_client.downloader.return_value.download_file.return_value = MagicMock(written=2048)
+    mock_create_client.return_value = mock_client
+
+    with tempfile.TemporaryDirectory() as tmpdir, \
+         patch.object(oss_tools.settings, 'oss_checkpoint_dir', None):
+        target = os.path.join(tmpdir, 'out', 'build.tar.gz')
+        func = get_tool_func("OSS_GetObject")
+        result = func(BucketName='bucket', ObjectKey='build.tar.gz', RegionId='cn-test', Mode='download',
+                      FilePath=target, Bytes=4096)
+
+        assert result['file_size'] == 2048
+        assert os.path.isdir(os.path.dirname(target))
+        _, kwargs = mock_client.downloader.call_args
+        assert kwargs['enable_checkpoint'] is True
+        assert kwargs['verify_data'] is True
+        mock_client.downloader.return_value.download_file.assert_called_once()
+
+
+@patch('alibaba_cloud_ops_mcp_server.tools.oss_tools.create_client')
+def test_OSS_GetObject_invalid_arguments(mock_create_client):
+    func = get_tool_func("OSS_GetObject")
+    with pytest.raises(ValueError, match="Unsupported mode"):
+        func(BucketName='bucket', ObjectKey='key', RegionId='cn-test', Mode='middle', FilePath=None, Bytes=10)
+    with pytest.raises(ValueError, match="File path is required"):
+        func(BucketName='bucket', ObjectKey='key', RegionId='cn-test', Mode='download', FilePath=None, Bytes=10)